@@ -0,0 +1,213 @@
+"""
+Micro-benchmarks for the CTF publisher's hot paths.
+Run locally: python scripts/benchmarks.py [name ...]
+"""
+
+import sys
+import time
+import random
+
+# ─────────────────────────────────────────────
+# HELPERS
+# ─────────────────────────────────────────────
+
+def best_of(func, repeat: int = 5) -> float:
+    """Best wall time in seconds over `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def generated_writeup(sections: int, seed: int = 1337) -> str:
+    """A large synthetic writeup exercising every construct the converter handles."""
+    rng = random.Random(seed)
+    out = [
+        '<p align="right">', "  <sub>", "    <b>Platform:</b> TryHackMe<br>", "  </sub>", "</p>", "", "---", "",
+    ]
+    for s in range(sections):
+        out += [
+            f"## ⚙️ Section {s}",
+            "",
+            f"I ran **nmap** against `10.10.{s % 255}.1` and found [the docs](https://example.com/{s}). "
+            + " ".join(rng.choice(["enumeration", "*payload*", "shell", "SUID", "`sudo -l`"]) for _ in range(60)),
+            "",
+            "- Port 22 open",
+            "  - OpenSSH 8.2",
+            "    - no known CVE",
+            "- Port 80 open",
+            "1. Upload shell",
+            "2. Trigger it",
+            "",
+            "| Port | Service | Version |",
+            "|------|---------|---------|",
+            *[f"| {p} | svc-{p} | `v{p % 9}.{p % 7}` |" for p in range(20)],
+            "",
+            "```bash",
+            *[f"kie@kiepc:~/THM/Room$ gobuster dir -u http://10.10.10.{i} -w common.txt  # {'x' * 40}" for i in range(60)],
+            "```",
+            "",
+            f"![Screenshot {s}](screenshot_{s % 100:02d}.png)",
+            "",
+            "> **Key Finding:** the upload filter only checked the extension.",
+            "",
+        ]
+    return "\n".join(out)
+
+
+# ─────────────────────────────────────────────
+# BENCHMARKS
+# ─────────────────────────────────────────────
+
+def bench_markdown():
+    """markdown_to_notion_blocks throughput and Notion-limit compliance on large writeups."""
+    from notion_blocks import markdown_to_notion_blocks, count_blocks, chunk_for_append, RICH_TEXT_LIMIT, RICH_TEXT_ITEMS
+
+    def check(blocks):
+        for block in blocks:
+            inner = block[block["type"]]
+            rich  = inner.get("rich_text", [])
+            assert len(rich) <= RICH_TEXT_ITEMS, "too many rich_text items"
+            assert all(len(r["text"]["content"]) <= RICH_TEXT_LIMIT for r in rich), "rich_text over limit"
+            for row in inner.get("cells", []):
+                assert all(len(r["text"]["content"]) <= RICH_TEXT_LIMIT for r in row)
+            check(inner.get("children", []))
+
+    print("markdown_to_notion_blocks")
+    print(f"  {'sections':>8} {'chars':>10} {'blocks':>7} {'appends':>7} {'time':>9} {'MB/s':>7}")
+    for sections in (10, 100, 1000):
+        md     = generated_writeup(sections)
+        blocks = markdown_to_notion_blocks(md)
+        check(blocks)
+        t = best_of(lambda: markdown_to_notion_blocks(md), repeat=3)
+        print(f"  {sections:>8} {len(md):>10,} {count_blocks(blocks):>7,} {len(chunk_for_append(blocks)):>7} "
+              f"{t * 1000:>7.1f}ms {len(md) / t / 1e6:>7.2f}")
+
+
+def bench_notes():
+    """Original-notes packing: blocks and append calls vs one paragraph per line."""
+    from notion_blocks import pack_notes_blocks, chunk_for_append
+
+    print("pack_notes_blocks")
+    print(f"  {'lines':>7} {'old blocks':>10} {'old calls':>9} {'new blocks':>10} {'new calls':>9} {'time':>9}")
+    for lines in (200, 2000, 20000):
+        rng   = random.Random(lines)
+        parts = []
+        for i in range(lines // 50):
+            parts.append("\n".join(f"/admin{rng.randint(0, 9999)} (Status: 301) [Size: {rng.randint(100, 999)}]" for _ in range(40)))
+            parts.append("```bash\n" + "\n".join(f"{p}/tcp open  http" for p in range(10)) + "\n```")
+        notes     = "\n\n".join(parts)
+        old_count = sum(1 for line in notes.split("\n") if line.strip())
+        blocks    = pack_notes_blocks(notes)
+        t         = best_of(lambda: pack_notes_blocks(notes), repeat=3)
+        print(f"  {lines:>7,} {old_count:>10,} {-(-old_count // 100):>9,} {len(blocks):>10,} "
+              f"{len(chunk_for_append(blocks)):>9,} {t * 1000:>7.1f}ms")
+
+
+def legacy_regex_text(text: str) -> str:
+    """The pre-streaming fetch_room_description body: three regex passes over the whole page."""
+    import re
+    clean = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.DOTALL)
+    clean = re.sub(r'<style[^>]*>.*?</style>',  '', clean, flags=re.DOTALL)
+    clean = re.sub(r'<[^>]+>', ' ', clean)
+    clean = re.sub(r'\s+', ' ', clean).strip()
+    return clean[:3000]
+
+
+def generated_spa_page(script_kb: int, body_paragraphs: int = 200) -> bytes:
+    """An SPA-style page: meta tags, a huge inline bundle, then the visible room text."""
+    bundle = "window.__STATE__=[" + ("{\"k\":\"<div>" + "a" * 100 + "</div>\"}," * 4) * (script_kb * 2) + "];"
+    return (
+        "<!doctype html><html><head><title>RootMe | TryHackMe</title>"
+        '<meta name="description" content="A ctf for beginners, can you root me?">'
+        '<meta property="og:image" content="https://tryhackme-images.s3.amazonaws.com/room-icons/abc.png">'
+        f"<style>{'.x{color:red}' * 2000}</style><script>{bundle}</script></head><body>"
+        + "".join(f"<p>Task {i}: deploy the machine and enumerate the services running on it.</p>" for i in range(body_paragraphs))
+        + f"<script>{bundle}</script></body></html>"
+    ).encode("utf-8")
+
+
+def bench_html():
+    """Streaming room-description extraction vs the old full-download regex path."""
+    from html_extract import extract_text_stream, CHUNK_SIZE
+
+    print("fetch_room_description text extraction")
+    print(f"  {'page':>8} {'regex':>9} {'stream':>9} {'bytes read':>11}")
+    for script_kb in (100, 1000, 4000):
+        page   = generated_spa_page(script_kb)
+        chunks = [page[i:i + CHUNK_SIZE] for i in range(0, len(page), CHUNK_SIZE)]
+        t_old  = best_of(lambda: legacy_regex_text(page.decode("utf-8")), repeat=3)
+        t_new  = best_of(lambda: extract_text_stream(iter(chunks)), repeat=3)
+        _, read = extract_text_stream(iter(chunks))
+        print(f"  {len(page) / 1024:>6.0f}KB {t_old * 1000:>7.1f}ms {t_new * 1000:>7.1f}ms {read / 1024:>9.0f}KB")
+
+
+def bench_compress():
+    """Notes pre-compression: size reduction and speed on scanner-heavy notes."""
+    from notes_compress import compress_notes
+
+    print("compress_notes")
+    print(f"  {'lines':>7} {'chars in':>10} {'chars out':>10} {'tokens in':>10} {'tokens out':>10} {'time':>9}")
+    for lines in (200, 2000, 20000):
+        rng   = random.Random(lines)
+        parts = ["## Enumeration", "Gobuster found /uploads and a backup of the site."]
+        for i in range(lines // 50):
+            hits = [f"/w{rng.randint(0, 99999)} (Status: {rng.choice((301, 403))}) [Size: {rng.randint(100, 999)}]" for _ in range(40)]
+            parts.append("```\n" + "\n".join(hits) + "\n```")
+            parts.append("```\n" + "\n".join(f"{p}/tcp open  http" for p in range(10)) + "\n```")
+        parts.append("".join(rng.choice("ABCdef0123+/") for _ in range(4000)))
+        notes    = "\n\n".join(parts)
+        out, st  = compress_notes(notes)
+        t        = best_of(lambda: compress_notes(notes), repeat=3)
+        print(f"  {lines:>7,} {st['chars_in']:>10,} {st['chars_out']:>10,} {st['tokens_in']:>10,} "
+              f"{st['tokens_out']:>10,} {t * 1000:>7.1f}ms")
+
+
+def bench_links():
+    """Link validation over a synthetic writeups tree: cold (every file parsed) vs warm (mtime cache)."""
+    import tempfile
+    from pathlib import Path
+    import validate_links
+
+    print("validate_links")
+    print(f"  {'writeups':>9} {'links':>8} {'cold':>9} {'warm':>9}")
+    for count in (500, 3000):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            for i in range(count):
+                folder = root / "writeups" / f"P{i % 5}" / "Easy" / f"Box{i}"
+                folder.mkdir(parents=True)
+                shots = "".join(f"![s](screenshot_{j:02d}.png)\n" for j in range(1, 6))
+                (folder / f"Box{i}.md").write_text("# Box\n" + "Some text.\n" * 80 + shots, encoding="utf-8")
+                for j in range(1, 6):
+                    (folder / f"screenshot_{j:02d}.png").touch()
+            cache = root / "links.json"
+            start = time.perf_counter()
+            result = validate_links.validate(root, cache, summary_ref="")
+            cold = time.perf_counter() - start
+            warm = best_of(lambda: validate_links.validate(root, cache, summary_ref=""), repeat=3)
+            print(f"  {count:>9,} {result['links']:>8,} {cold * 1000:>7.0f}ms {warm * 1000:>7.0f}ms")
+
+
+BENCHMARKS = {
+    "markdown": bench_markdown,
+    "notes":    bench_notes,
+    "html":     bench_html,
+    "compress": bench_compress,
+    "links":    bench_links,
+}
+
+
+def main(names: list = None):
+    for name in names or list(BENCHMARKS):
+        if name not in BENCHMARKS:
+            print(f"⚠️  Unknown benchmark '{name}' — choose from: {', '.join(BENCHMARKS)}")
+            continue
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
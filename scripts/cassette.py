@@ -0,0 +1,246 @@
+"""
+Record / replay layer for Notion, Anthropic and HTTP traffic.
+
+  CTF_CASSETTE=run.cassette.gz CTF_CASSETTE_MODE=record python scripts/ctf_auto.py
+  CTF_CASSETTE=run.cassette.gz CTF_CASSETTE_MODE=replay python scripts/ctf_auto.py
+
+Record mode passes every call through to the real client and appends the
+request + response to a gzipped JSON-lines cassette. Replay mode serves the
+same responses back in order with zero network, so a bad publish can be
+reproduced, regression-tested or profiled on identical inputs.
+
+Both modes run against a fresh, empty state folder instead of .ctf-cache,
+and a replay needs none of the publish secrets. The writeups repo is still
+the real one: a replay rewrites files, commits locally and checks out the
+gitbook branch. Run it in a scratch clone checked out at the commit the
+recorded run started from, or it will find its own writeup already there.
+"""
+
+import io
+import os
+import gzip
+import json
+import base64
+import hashlib
+import importlib
+from pathlib import Path
+from datetime import datetime
+from types import SimpleNamespace
+
+CASSETTE_VERSION = 2
+
+# Transport settings, not part of the request — a changed deadline must not turn a replay into a miss
+UNKEYED_KWARGS = ("timeout",)
+
+
+class CassetteMiss(LookupError):
+    """Replay mode saw a call that was never recorded."""
+
+
+class ReplayedError(RuntimeError):
+    """A recorded exception whose class could not be imported on replay."""
+
+
+# ─────────────────────────────────────────────
+# SERIALISATION
+# ─────────────────────────────────────────────
+
+def _request_key(op: str, args: tuple, kwargs: dict) -> str:
+    kwargs  = {k: v for k, v in kwargs.items() if k not in UNKEYED_KWARGS}
+    payload = json.dumps({"args": args, "kwargs": kwargs}, sort_keys=True, default=str)
+    return f"{op} {hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _dump_response(svc: str, resp):
+    if svc == "http":
+        return {
+            "status":  resp.status_code,
+            "url":     resp.url,
+            "headers": dict(resp.headers),
+            "body":    base64.b64encode(resp.content).decode("ascii"),
+        }
+    if hasattr(resp, "model_dump"):  # anthropic / pydantic models
+        return resp.model_dump(mode="json")
+    return resp
+
+
+def _dump_error(key: str, error: Exception) -> dict:
+    """Enough of an exception to raise the same class on replay — retry and rate-limit handling
+    branch on the class name, status_code (Anthropic / requests) and status / code (Notion)."""
+    code = getattr(error, "code", None)
+    return {
+        "key":         key,
+        "error":       type(error).__name__,
+        "module":      type(error).__module__,
+        "message":     str(error),
+        "status_code": getattr(error, "status_code", None),
+        "status":      getattr(error, "status", None) if isinstance(getattr(error, "status", None), int) else None,
+        "code":        code if code is None or isinstance(code, (str, int)) else str(code),
+    }
+
+
+def _load_error(entry: dict) -> Exception:
+    """An instance of the recorded exception class, built without its constructor (SDK errors want
+    live request/response objects) and carrying the recorded message, status codes and code."""
+    cls = None
+    try:
+        cls = getattr(importlib.import_module(entry.get("module", "")), entry["error"])
+    except (ImportError, AttributeError, ValueError):
+        pass
+    if not (isinstance(cls, type) and issubclass(cls, Exception)):
+        error = ReplayedError(f"{entry['error']}: {entry['message']}")
+    else:
+        error = cls.__new__(cls)
+        error.args = (entry["message"],)
+        error.message = entry["message"]
+    for attr in ("status_code", "status", "code"):
+        if entry.get(attr) is not None:
+            setattr(error, attr, entry[attr])
+    return error
+
+
+def _to_namespace(value):
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _to_namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_to_namespace(v) for v in value]
+    return value
+
+
+def _build_http_response(data: dict):
+    import requests
+    from requests.structures import CaseInsensitiveDict
+
+    body = base64.b64decode(data["body"])
+    resp = requests.Response()
+    resp.status_code       = data["status"]
+    resp.url               = data["url"]
+    resp.headers           = CaseInsensitiveDict(data["headers"])
+    resp.raw               = io.BytesIO(body)
+    resp._content          = body
+    resp._content_consumed = True
+    return resp
+
+
+def _load_response(svc: str, data):
+    if svc == "http":
+        return _build_http_response(data)
+    if svc == "claude":
+        return _to_namespace(data)
+    return data
+
+
+# ─────────────────────────────────────────────
+# CASSETTE
+# ─────────────────────────────────────────────
+
+class Cassette:
+    def __init__(self, path: Path, mode: str):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{mode}' — use record or replay")
+        self.path     = Path(path)
+        self.mode     = mode
+        self.entries  = []
+        self.queues   = {}   # request key → list of entries, replayed in order
+        self.cursor   = {}
+        self.context  = {}   # run settings a replay needs but the request keys depend on
+        self.recorded_at = datetime.now()
+
+        if mode == "replay":
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version {header.get('version')}")
+            self.recorded_at = datetime.fromisoformat(header["recorded_at"])
+            self.context     = header.get("context", {})
+            for line in f:
+                entry = json.loads(line)
+                self.entries.append(entry)
+                self.queues.setdefault(entry["key"], []).append(entry)
+        self.cursor = {key: 0 for key in self.queues}
+        print(f"📼 Replaying {len(self.entries)} interaction(s) from {self.path}")
+
+    def now(self) -> datetime:
+        """Wall clock of the run — frozen to the recording time on replay so dates match."""
+        return self.recorded_at if self.replaying else datetime.now()
+
+    def save(self):
+        if self.mode != "record":
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(self.path, "wt", encoding="utf-8", compresslevel=9) as f:
+            f.write(json.dumps({"version": CASSETTE_VERSION, "recorded_at": self.recorded_at.isoformat(),
+                                "context": self.context}) + "\n")
+            for entry in self.entries:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        print(f"📼 Recorded {len(self.entries)} interaction(s) to {self.path}")
+
+    # ── call handling ──
+
+    def call(self, svc: str, op: str, target, args: tuple, kwargs: dict):
+        key = _request_key(f"{svc}:{op}", args, kwargs)
+        if self.replaying:
+            return self._replay(svc, key)
+
+        try:
+            resp = target(*args, **kwargs)
+        except Exception as e:
+            self.entries.append(_dump_error(key, e))
+            raise
+        data = _dump_response(svc, resp)
+        self.entries.append({"key": key, "response": data})
+        # A streamed HTTP body has been read in full for the cassette — hand back a rebuilt response
+        return _build_http_response(data) if svc == "http" else resp
+
+    def _replay(self, svc: str, key: str):
+        queue = self.queues.get(key)
+        if not queue:
+            raise CassetteMiss(f"No recorded interaction for {key}")
+        idx   = self.cursor[key]
+        entry = queue[min(idx, len(queue) - 1)]  # polling loops repeat the last answer
+        self.cursor[key] = idx + 1
+        if "error" in entry:
+            raise _load_error(entry)
+        return _load_response(svc, entry["response"])
+
+    def wrap(self, client, svc: str):
+        return _Proxy(self, client, svc, ())
+
+
+class _Proxy:
+    """Stands in for a client object; attribute chains are resolved lazily so
+    `notion.blocks.children.list(...)` records as op `blocks.children.list`."""
+
+    __slots__ = ("_cassette", "_client", "_svc", "_path")
+
+    def __init__(self, cassette: Cassette, client, svc: str, path: tuple):
+        self._cassette = cassette
+        self._client   = client
+        self._svc      = svc
+        self._path     = path
+
+    def __getattr__(self, name: str):
+        return _Proxy(self._cassette, self._client, self._svc, self._path + (name,))
+
+    def __call__(self, *args, **kwargs):
+        target = None
+        if not self._cassette.replaying:
+            target = self._client
+            for part in self._path:
+                target = getattr(target, part)
+        return self._cassette.call(self._svc, ".".join(self._path), target, args, kwargs)
+
+
+def from_env():
+    """Build a Cassette from CTF_CASSETTE / CTF_CASSETTE_MODE, or None when unset."""
+    path = os.environ.get("CTF_CASSETTE")
+    if not path:
+        return None
+    return Cassette(Path(path), os.environ.get("CTF_CASSETTE_MODE", "replay").lower())
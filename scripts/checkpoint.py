@@ -0,0 +1,123 @@
+"""
+Per-page checkpoints for the CTF publisher.
+Each numbered stage of process_page stores its outputs here so a failed run
+resumes at the first incomplete stage instead of re-reading Notion,
+re-downloading screenshots and re-calling Claude.
+
+A checkpoint whose prepare stages are all complete is a ready-to-publish
+bundle: the daily run only has to write files, commit and update Notion.
+Downloaded assets are staged in the checkpoint's assets/ folder until then.
+"""
+
+import json
+import shutil
+import hashlib
+from pathlib import Path
+from datetime import datetime
+
+# Stages that only read Notion / the web / Claude — safe to run days ahead of publishing
+PREPARE_STAGES = ("notes", "room_info", "category", "os", "icon", "screenshots", "tags", "format")
+
+
+def file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Checkpoint:
+    def __init__(self, root: Path, page_id: str):
+        self.page_id = page_id
+        self.dir     = root / page_id.replace("-", "")
+        self.file    = self.dir / "state.json"
+        self.assets  = self.dir / "assets"
+        self.state   = {"page_id": page_id, "stages": {}}
+        if self.file.exists():
+            try:
+                self.state = json.loads(self.file.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                print(f"   ⚠️  Ignoring unreadable checkpoint: {e}")
+
+    @property
+    def stages(self) -> dict:
+        return self.state["stages"]
+
+    @property
+    def resuming(self) -> bool:
+        return bool(self.stages)
+
+    @property
+    def prepared(self) -> bool:
+        return all(stage in self.stages for stage in PREPARE_STAGES)
+
+    @property
+    def publishing(self) -> bool:
+        """True once any publish stage has run — from then on Notion edits are our own."""
+        return any(stage not in PREPARE_STAGES for stage in self.stages)
+
+    def check_edited(self, last_edited: str) -> bool:
+        """Discard prepared work if the Notion page was edited after it was recorded.
+        Returns True when the checkpoint was invalidated."""
+        recorded = self.state.get("last_edited")
+        stale    = bool(recorded and last_edited and recorded != last_edited and not self.publishing)
+        if stale:
+            self.clear()
+        if last_edited and not self.publishing:
+            self.state["last_edited"] = last_edited
+        return stale
+
+    def done(self, stage: str) -> bool:
+        return stage in self.stages
+
+    def get(self, stage: str) -> dict:
+        return self.stages.get(stage, {}).get("data", {})
+
+    def save(self, stage: str, **data):
+        """Mark a stage complete with its outputs. Written atomically."""
+        self.stages[stage] = {"done_at": datetime.now().isoformat(timespec="seconds"), "data": data}
+        self._write()
+
+    def invalidate(self, *stages: str):
+        for stage in stages:
+            self.stages.pop(stage, None)
+        self._write()
+
+    def _write(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, indent=1, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.file)
+
+    # ── assets ──
+
+    @staticmethod
+    def hash_assets(folder: Path, filenames: list) -> dict:
+        return {name: file_hash(folder / name) for name in filenames if (folder / name).exists()}
+
+    @staticmethod
+    def assets_intact(folder: Path, hashes: dict) -> bool:
+        """True when every recorded asset is still on disk with the same content."""
+        for name, digest in hashes.items():
+            path = folder / name
+            if not path.exists() or file_hash(path) != digest:
+                return False
+        return True
+
+    def clear(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+        self.state = {"page_id": self.page_id, "stages": {}}
+
+
+def prune_checkpoints(root: Path, keep_page_ids: set) -> int:
+    """Remove checkpoints for pages no longer queued (published or un-completed elsewhere)."""
+    if not root.exists():
+        return 0
+    keep    = {pid.replace("-", "") for pid in keep_page_ids}
+    removed = 0
+    for child in root.iterdir():
+        if child.is_dir() and child.name not in keep:
+            shutil.rmtree(child, ignore_errors=True)
+            removed += 1
+    return removed
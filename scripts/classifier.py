@@ -0,0 +1,320 @@
+"""
+Local classifier for room category, OS and topic tags.
+Each label is scored from the keyword cues the Claude prompts already list
+(SMB/WinRM → Windows, SUID → Linux …) plus token weights learned from the
+labels of already-published writeups. The publisher only asks Claude when
+the best label's confidence is under the threshold.
+
+Every decision is appended to decisions.jsonl — what the classifier guessed,
+how sure it was and what was used — so hit rate and accuracy can be measured.
+A deterministic sample of confident decisions is still sent to Claude
+(`CTF_CLASSIFIER_AUDIT`) to keep measuring accuracy on the ones it skips.
+"""
+
+import os
+import re
+import json
+import math
+import hashlib
+from pathlib import Path
+from datetime import datetime
+
+from generate_readmes import TYPE_FOLDERS, read_metadata
+
+THRESHOLD = float(os.environ.get("CTF_CLASSIFIER_THRESHOLD", "0.85"))
+AUDIT     = float(os.environ.get("CTF_CLASSIFIER_AUDIT", "0.1"))
+
+RULE_WEIGHT    = 1.0    # score per matched rule phrase
+LEARNED_WEIGHT = 0.25   # scale of per-token log-odds learned from published writeups
+LEARNED_CLIP   = 1.5    # max |log-odds| of a single token
+LEARNED_CAP    = 3.0    # max |learned contribution| to one label's score
+MIN_DOC_FREQ   = 2      # tokens seen in fewer training writeups are ignored
+TAG_BIAS       = 1.5    # a tag needs more than this much evidence to lean "yes"
+
+CATEGORIES = ("Machine", "Sherlock", "Challenge", "Walkthrough", "CTF", "Lab", "Dojo")
+OS_LABELS  = ("Linux", "Windows", "Other")
+
+RULES = {
+    "os": {
+        "Windows": ("windows", "active directory", "smb", "rdp", "winrm", "evil-winrm", "powershell", ".net",
+                    "iis", "kerberos", "ntlm", "mimikatz", "bloodhound", "domain controller", "mssql", "winpeas"),
+        "Linux":   ("linux", "ubuntu", "debian", "apache", "ssh", "bash", "sudo", "suid", "cron", "/etc/passwd",
+                    "linpeas", "nginx", "gtfobins"),
+        "Other":   ("forensics", "crypto", "cryptography", "osint", "steganography", "reversing",
+                    "prompt injection", "llm", "no machine"),
+    },
+    "category": {
+        "Machine":     ("user.txt", "root.txt", "user flag", "root flag", "privilege escalation", "reverse shell",
+                        "foothold", "boot2root", "nmap"),
+        "Sherlock":    ("sherlock", "dfir", "investigation", "incident", "artifacts", "evtx", "timeline", "triage"),
+        "Walkthrough": ("walkthrough", "in this room", "task 1", "learning objectives", "answer the questions",
+                        "introduction to", "theory"),
+        "Challenge":   ("challenge", "crypto", "pwn", "reversing", "ciphertext", "decode"),
+        "CTF":         ("ctf event", "competition", "scoreboard"),
+        "Lab":         ("lab", "cloud", "aws", "azure"),
+        "Dojo":        ("dojo", "belt"),
+    },
+    "tags": {
+        "sqli":                 ("sql injection", "sqlmap", "union select", "sqli"),
+        "file-upload":          ("file upload", "upload filter", "webshell", "web shell"),
+        "privilege-escalation": ("privilege escalation", "privesc", "sudo -l", "linpeas", "winpeas"),
+        "suid":                 ("suid", "-perm -4000", "-perm -u=s"),
+        "lfi":                  ("lfi", "local file inclusion", "php://filter", "../../"),
+        "rce":                  ("rce", "remote code execution", "command injection"),
+        "active-directory":     ("active directory", "kerberos", "bloodhound", "domain controller", "ldap"),
+        "web":                  ("burp", "gobuster", "ffuf", "web application", "http"),
+        "forensics":            ("forensics", "volatility", "autopsy", "memory dump"),
+        "crypto":               ("cipher", "rsa", "decrypt", "cryptography"),
+        "osint":                ("osint", "exif", "google dork"),
+        "reversing":            ("ghidra", "reverse engineering", "disassembl", "decompil"),
+        "steganography":        ("steganography", "steghide", "stegseek", "binwalk"),
+        "dfir":                 ("dfir", "incident response", "evtx", "sysmon", "triage"),
+        "malware":              ("malware", "ransomware", "virustotal", "sandbox"),
+        "phishing":             ("phishing", "spoofed", "lure"),
+        "email-analysis":       ("email header", ".eml", "spf", "dkim"),
+        "prompt-injection":     ("prompt injection", "jailbreak", "system prompt"),
+        "buffer-overflow":      ("buffer overflow", "eip", "shellcode"),
+        "network-forensics":    ("pcap", "wireshark", "tshark", "network traffic"),
+    },
+}
+
+# Tags that describe where a room lives rather than what it's about
+NON_TOPIC_TAGS = {c.lower() for c in CATEGORIES} | {
+    "tryhackme", "thm", "hackthebox", "htb", "letsdefend", "vulnhub", "provinggrounds", "offsec", "pwn.college",
+    "picoctf", "rootme", "ctftime", "sansholidayhack", "pwnedlabs", "beginner", "easy", "medium", "hard", "insane",
+    "walkthrough", "misc",
+}
+
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9+#_-]{2,}")
+_SKIP_DIRS = {"Templates", "Cheatsheets", ".search"}
+
+
+def _phrase_re(phrase: str):
+    """Whole-word match for a rule phrase, including ones that start or end with punctuation."""
+    return re.compile(r"(?<!\w)" + re.escape(phrase) + (r"(?!\w)" if phrase[-1].isalnum() else ""))
+
+
+_PHRASES = {task: {label: [_phrase_re(p) for p in phrases] for label, phrases in rules.items()}
+            for task, rules in RULES.items()}
+
+
+def tokens(text: str) -> set:
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+def _sigmoid(x: float) -> float:
+    return 1 / (1 + math.exp(-x))
+
+
+def _softmax(scores: dict) -> dict:
+    top = max(scores.values())
+    exp = {label: math.exp(s - top) for label, s in scores.items()}
+    total = sum(exp.values())
+    return {label: e / total for label, e in exp.items()}
+
+
+# ─────────────────────────────────────────────
+# TRAINING DATA
+# ─────────────────────────────────────────────
+
+def training_examples(root: Path) -> list:
+    """(tokens, {"category", "os", "tags"}) for every published writeup under root."""
+    examples = []
+    for md in sorted(root.rglob("*.md")):
+        rel = md.relative_to(root).parts
+        if md.stem != md.parent.name or len(rel) < 3 or rel[0] in _SKIP_DIRS:
+            continue
+        meta = read_metadata(md)
+        tags = [t.lstrip("#").lower() for t in meta.get("tags", "").split() if t.startswith("#")]
+        category = next((TYPE_FOLDERS[p] for p in rel[1:-1] if p in TYPE_FOLDERS), "")
+        category = category or next((t.title() for t in tags if t.title() in CATEGORIES), "")
+        os_label = meta.get("os") or next((p for p in rel[1:-1] if p in OS_LABELS), "")
+        body     = md.read_text(encoding="utf-8", errors="replace").split("</p>", 1)[-1]
+        examples.append((tokens(f"{meta.get('name', '')} {body}"), {
+            "category": category,
+            "os":       os_label,
+            "tags":     [t for t in tags if t not in NON_TOPIC_TAGS],
+        }))
+    return examples
+
+
+def learn_weights(docs: list, labels: list) -> dict:
+    """Per-label token log-odds (label vs the rest). docs: token sets; labels: a set of labels per doc."""
+    df, per_label, n_label = {}, {}, {}
+    for toks, doc_labels in zip(docs, labels):
+        for t in toks:
+            df[t] = df.get(t, 0) + 1
+        for label in doc_labels:
+            n_label[label] = n_label.get(label, 0) + 1
+            counts = per_label.setdefault(label, {})
+            for t in toks:
+                counts[t] = counts.get(t, 0) + 1
+
+    vocab, total, weights = {t for t, n in df.items() if n >= MIN_DOC_FREQ}, len(docs), {}
+    for label, counts in per_label.items():
+        n_in, n_out = n_label[label], total - n_label[label]
+        w = {}
+        for t in vocab:
+            k_in = counts.get(t, 0)
+            odds = math.log((k_in + 1) / (n_in + 2)) - math.log((df[t] - k_in + 1) / (n_out + 2))
+            if abs(odds) > 0.1:
+                w[t] = round(max(-LEARNED_CLIP, min(LEARNED_CLIP, odds)), 3)
+        weights[label] = w
+    return weights
+
+
+# ─────────────────────────────────────────────
+# CLASSIFIER
+# ─────────────────────────────────────────────
+
+class Classifier:
+    def __init__(self, root: Path, state: Path, threshold: float = THRESHOLD, audit: float = AUDIT):
+        self.root      = root
+        self.state     = state
+        self.log_file  = state / "decisions.jsonl"
+        self.threshold = threshold
+        self.audit     = audit
+        self._model    = None
+
+    # ── model ──
+
+    def _signature(self) -> str:
+        h = hashlib.sha1()
+        for md in sorted(self.root.rglob("*.md")):
+            st = md.stat()
+            h.update(f"{md.relative_to(self.root)}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    @property
+    def model(self) -> dict:
+        """Learned weights, retrained only when the set of published writeups changes."""
+        if self._model is not None:
+            return self._model
+        cache = self.state / "model.json"
+        sig   = self._signature()
+        try:
+            model = json.loads(cache.read_text(encoding="utf-8"))
+            if model.get("signature") == sig:
+                self._model = model
+                return model
+        except (OSError, ValueError):
+            pass
+
+        examples = training_examples(self.root)
+        model    = {"signature": sig, "examples": len(examples)}
+        for task in ("category", "os"):
+            rows = [(toks, {labels[task]}) for toks, labels in examples if labels[task]]
+            model[task] = learn_weights([r[0] for r in rows], [r[1] for r in rows])
+        model["tags"] = learn_weights([e[0] for e in examples], [set(e[1]["tags"]) for e in examples])
+
+        self.state.mkdir(parents=True, exist_ok=True)
+        cache.write_text(json.dumps(model), encoding="utf-8")
+        self._model = model
+        return model
+
+    # ── scoring ──
+
+    def scores(self, task: str, text: str) -> dict:
+        """Rule score plus capped learned score for every known label of a task."""
+        lowered, toks = text.lower(), tokens(text)
+        learned = self.model.get(task, {})
+        labels  = set(RULES[task]) | set(learned)
+        out = {}
+        for label in labels:
+            rule  = sum(RULE_WEIGHT for rx in _PHRASES[task].get(label, ()) if rx.search(lowered))
+            learn = sum(w for t, w in learned.get(label, {}).items() if t in toks) * LEARNED_WEIGHT
+            out[label] = rule + max(-LEARNED_CAP, min(LEARNED_CAP, learn))
+        return out
+
+    def predict(self, task: str, text: str) -> tuple:
+        """(label, confidence) for category / os; ([3 tags], confidence of the weakest) for tags."""
+        scores = self.scores(task, text)
+        if task == "tags":
+            ranked = sorted(scores, key=lambda t: (-scores[t], t))[:3]
+            probs  = [_sigmoid(scores[t] - TAG_BIAS) for t in ranked]
+            return ranked, round(min(probs), 3) if len(ranked) == 3 else 0.0
+        labels = CATEGORIES if task == "category" else OS_LABELS
+        probs  = _softmax({label: scores.get(label, 0.0) for label in labels})
+        best   = max(labels, key=lambda label: (probs[label], -labels.index(label)))
+        return best, round(probs[best], 3)
+
+    # ── decisions ──
+
+    def audited(self, key: str, task: str) -> bool:
+        """Deterministic sample of confident decisions that are still checked against Claude."""
+        digest = hashlib.sha1(f"{key}:{task}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:4], "big") / 2 ** 32 < self.audit
+
+    def decide(self, task: str, key: str, text: str, ask):
+        """The local label when confident, else (or when audited) whatever `ask()` returns from Claude."""
+        guess, confidence = self.predict(task, text)
+        audit = confidence >= self.threshold and self.audited(key, task)
+        if confidence >= self.threshold and not audit:
+            print(f"   ✅ Local {task}: {guess} ({confidence:.0%} confident — Claude skipped)")
+            self.record(task, key, guess, confidence, "local", guess)
+            return guess
+        final = ask()
+        self.record(task, key, guess, confidence, "audit" if audit else "claude", final)
+        return final
+
+    def record(self, task: str, key: str, guess, confidence: float, source: str, final):
+        entry = {"at": datetime.now().isoformat(timespec="seconds"), "task": task, "key": key,
+                 "guess": guess, "confidence": confidence, "source": source, "final": final}
+        try:
+            self.state.mkdir(parents=True, exist_ok=True)
+            with open(self.log_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"   ⚠️  Could not log classifier decision: {e}")
+
+
+# ─────────────────────────────────────────────
+# REPORTING
+# ─────────────────────────────────────────────
+
+def _agrees(guess, final) -> bool:
+    if isinstance(guess, list):
+        return sorted(guess) == sorted(final)
+    return guess == final
+
+
+def decision_stats(log_file: Path) -> dict:
+    """Per task: decisions, local hit rate, and how often the guess matched Claude —
+    on audited confident decisions (accuracy of skipped calls) and on low-confidence ones."""
+    stats = {}
+    if not log_file.exists():
+        return stats
+    for line in log_file.read_text(encoding="utf-8").splitlines():
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        s = stats.setdefault(entry["task"], {"decisions": 0, "local": 0, "audited": 0, "audit_agree": 0,
+                                             "asked": 0, "asked_agree": 0})
+        s["decisions"] += 1
+        agree = _agrees(entry["guess"], entry["final"])
+        if entry["source"] == "local":
+            s["local"] += 1
+        elif entry["source"] == "audit":
+            s["audited"]     += 1
+            s["audit_agree"] += agree
+        else:
+            s["asked"]       += 1
+            s["asked_agree"] += agree
+    return stats
+
+
+def _pct(part: int, whole: int) -> str:
+    return f"{part / whole:.0%}" if whole else "—"
+
+
+def report(log_file: Path) -> str:
+    """Hit rate counts every confident decision (audited ones too); calls saved counts only local ones."""
+    stats = decision_stats(log_file)
+    if not stats:
+        return "No classifier decisions logged yet."
+    lines = [f"{'task':<9} {'decisions':>9} {'saved':>6} {'hit rate':>8} {'audit acc':>10} {'low-conf acc':>12}"]
+    for task, s in sorted(stats.items()):
+        lines.append(f"{task:<9} {s['decisions']:>9} {s['local']:>6} {_pct(s['local'] + s['audited'], s['decisions']):>8} "
+                     f"{_pct(s['audit_agree'], s['audited']):>10} {_pct(s['asked_agree'], s['asked']):>12}")
+    return "\n".join(lines)
@@ -0,0 +1,177 @@
+"""
+Deadlines, hedging and a global concurrency limit for Claude calls.
+Every messages.create goes through one Governor:
+
+  - a shared in-flight limit, so pages and map-reduce parts formatting
+    concurrently never exceed CTF_CLAUDE_CONCURRENCY requests at once
+  - a per-call deadline, also passed to the SDK as its request timeout, so a
+    hung response fails the call instead of stalling the whole publish
+  - hedging for tiny calls (classification, tags): if the first request hasn't
+    answered after the p95 latency of past tiny calls, an identical second
+    request is sent and whichever answers first wins
+
+Latency samples, hedges, deadline misses and rate-limit errors are recorded and
+kept in the run-state folder, so the p95 carries over between daily runs.
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+CONCURRENCY       = int(os.environ.get("CTF_CLAUDE_CONCURRENCY", "4"))
+DEADLINE_SHORT    = float(os.environ.get("CTF_CLAUDE_DEADLINE_SHORT", "30"))
+DEADLINE_LONG     = float(os.environ.get("CTF_CLAUDE_DEADLINE", "300"))
+SHORT_MAX_TOKENS  = 64      # calls up to this output size are "short" and may be hedged
+HEDGE_DEFAULT     = 4.0     # hedge delay (s) until enough samples exist for a p95
+HEDGE_MIN_DELAY   = 0.5
+MIN_SAMPLES       = 10
+KEEP_SAMPLES      = 200
+
+
+class DeadlineExceeded(TimeoutError):
+    """No answer from Claude before the call's deadline."""
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(pct * (len(ordered) - 1) + 0.5))]
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) in (429, 529) or type(error).__name__ in ("RateLimitError", "OverloadedError")
+
+
+class Governor:
+    def __init__(self, stats_path: Path, limit: int = CONCURRENCY, hedging: bool = True):
+        self.stats_path = stats_path
+        self.limit      = limit
+        self.hedging    = hedging
+        self.slots      = threading.BoundedSemaphore(limit)
+        self.lock       = threading.Lock()
+        self.pool       = ThreadPoolExecutor(max_workers=limit * 2, thread_name_prefix="claude")
+        self.in_flight  = 0
+        self.samples    = {"short": [], "long": []}
+        self.run        = {"calls": 0, "requests": 0, "hedged": 0, "hedge_wins": 0, "deadline": 0,
+                           "rate_limited": 0, "errors": 0, "peak_in_flight": 0, "slot_wait": 0.0}
+        self.latencies  = []
+        self._loaded    = False
+
+    # ── persisted latency history ──
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            saved = json.loads(self.stats_path.read_text(encoding="utf-8"))
+            for kind in self.samples:
+                self.samples[kind] = saved.get(kind, [])[-KEEP_SAMPLES:] + self.samples[kind]
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        self._load()
+        try:
+            self.stats_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.lock:
+                data = {kind: samples[-KEEP_SAMPLES:] for kind, samples in self.samples.items()}
+            self.stats_path.write_text(json.dumps(data), encoding="utf-8")
+        except OSError as e:
+            print(f"   ⚠️  Could not save Claude latency stats: {e}")
+
+    def hedge_delay(self) -> float:
+        self._load()
+        with self.lock:
+            samples = list(self.samples["short"])
+        if len(samples) < MIN_SAMPLES:
+            return HEDGE_DEFAULT
+        return max(HEDGE_MIN_DELAY, percentile(samples, 0.95))
+
+    # ── requests ──
+
+    def _request(self, client, kind: str, deadline: float, expires: float, kwargs: dict):
+        """One HTTP request, holding an in-flight slot. Gives up without sending if the
+        call's deadline passed while it was queued for a slot."""
+        queued    = time.monotonic()
+        remaining = expires - queued
+        if remaining <= 0 or not self.slots.acquire(timeout=remaining):
+            raise DeadlineExceeded("no free Claude slot before the deadline")
+        with self.lock:
+            self.run["slot_wait"] += time.monotonic() - queued
+            self.run["requests"]  += 1
+            self.in_flight        += 1
+            self.run["peak_in_flight"] = max(self.run["peak_in_flight"], self.in_flight)
+        start = time.monotonic()
+        try:
+            # The SDK timeout bounds a request we have stopped waiting for (a lost hedge, a missed deadline)
+            response = client.messages.create(timeout=deadline, **kwargs)
+        except Exception as e:
+            with self.lock:
+                self.run["rate_limited" if _is_rate_limited(e) else "errors"] += 1
+            raise
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+            self.slots.release()
+        elapsed = time.monotonic() - start
+        with self.lock:
+            self.samples[kind].append(round(elapsed, 3))
+            self.latencies.append(elapsed)
+        return response
+
+    def create(self, client, deadline: float = None, **kwargs):
+        """claude.messages.create with a deadline, the shared in-flight limit and, for short calls, a hedge."""
+        self._load()
+        kind     = "short" if kwargs.get("max_tokens", 0) <= SHORT_MAX_TOKENS else "long"
+        deadline = deadline or (DEADLINE_SHORT if kind == "short" else DEADLINE_LONG)
+        expires  = time.monotonic() + deadline
+        with self.lock:
+            self.run["calls"] += 1
+
+        first   = self.pool.submit(self._request, client, kind, deadline, expires, kwargs)
+        pending = {first}
+        if kind == "short" and self.hedging:
+            done, _ = wait(pending, timeout=min(self.hedge_delay(), deadline))
+            # Only hedge with a spare slot — a hedge must never queue behind real work
+            with self.lock:
+                hedge = not done and self.in_flight < self.limit
+                if hedge:
+                    self.run["hedged"] += 1
+            if hedge:
+                pending.add(self.pool.submit(self._request, client, kind, deadline, expires, kwargs))
+
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, expires - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        with self.lock:
+                            self.run["hedge_wins"] += 1
+                    return future.result()
+                error = future.exception()
+        if error is not None and not pending:
+            raise error
+        with self.lock:
+            self.run["deadline"] += 1
+        raise DeadlineExceeded(f"Claude did not answer within {deadline:g}s")
+
+    # ── reporting ──
+
+    def summary(self) -> str:
+        """One line for the end of a run — empty when nothing was called."""
+        run = self.run
+        if not run["calls"]:
+            return ""
+        with self.lock:
+            latencies = list(self.latencies)
+        tail = (f"p50 {percentile(latencies, 0.5):.1f}s, p95 {percentile(latencies, 0.95):.1f}s, "
+                f"max {max(latencies):.1f}s") if latencies else "no completed requests"
+        return (f"Claude: {run['calls']} call(s), {run['requests']} request(s) — {tail}; "
+                f"{run['hedged']} hedged ({run['hedge_wins']} won), {run['deadline']} past deadline, "
+                f"{run['rate_limited']} rate-limited, peak {run['peak_in_flight']}/{self.limit} in flight")
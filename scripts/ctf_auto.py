@@ -1,32 +1,200 @@
 """
 CTF Auto Publisher — Full Pipeline
 CTF-Hub
+
+  python scripts/ctf_auto.py [publish]               publish the next queued writeup (needs secrets)
+  python scripts/ctf_auto.py watch [--interval S] [--port P]
+  python scripts/ctf_auto.py restats                 recount writeups into the main README
+  python scripts/ctf_auto.py rebuild-readmes [--dry-run]
+  python scripts/ctf_auto.py sync-gitbook [--dry-run]
+  python scripts/ctf_auto.py check-links [--no-cache]
+  python scripts/ctf_auto.py reformat [--dry-run] [--limit N] [--batch N]
+  python scripts/ctf_auto.py classifier              local classifier hit rate / accuracy
+  python scripts/ctf_auto.py bench [name ...]
+
+Only `publish` / `watch` need NOTION_TOKEN / NOTION_DATABASE_ID / ANTHROPIC_API_KEY (`reformat` just the last) —
+the SDK clients are imported and built on first use.
 """
 
 import os
 import re
 import sys
+import json
 import time
+import signal
 import shutil
-import requests
+import argparse
+import tempfile
+import threading
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
-from notion_client import Client
-import anthropic
+from datetime import datetime, timezone
+
+import tracing
+import cassette
+import classifier
+import gitbook_sync
+import writeup_check
+import validate_links
+from tracing import span, traced
+from notion_blocks import markdown_to_notion_blocks, pack_notes_blocks, chunk_for_append
+from html_extract import CHUNK_SIZE, extract_text_stream, response_encoding
+from icons import IconIndex, scan_head_for_icon
+from checkpoint import Checkpoint, prune_checkpoints
+from search_index import SearchIndex, readme_tags
+from ledger import Ledger, content_hash
+from token_budget import estimate_tokens, split_notes, stitch_sections, outline, join_continuation
+from notes_compress import compress_notes, describe as describe_compression
+from classifier import Classifier
+from page_updates import PageUpdate, run_summary as page_update_summary
+from claude_governor import Governor
+from screenshots import ScreenshotDownloads
+from prompt_versions import PromptIndex, prompt_version
+from watch import NotionWatcher, WebhookServer
+from notes_cache import NotesCache, urls_fresh
 
 
 # ─────────────────────────────────────────────
 # CONFIG
 # ─────────────────────────────────────────────
-NOTION_TOKEN       = os.environ["NOTION_TOKEN"]
-NOTION_DATABASE_ID = os.environ["NOTION_DATABASE_ID"]
-ANTHROPIC_API_KEY  = os.environ["ANTHROPIC_API_KEY"]
+NOTION_DATABASE_ID = os.environ.get("NOTION_DATABASE_ID", "")
 CTFHUB_REPO_PATH   = os.environ.get("CTFHUB_REPO_PATH", ".")
 WRITEUPS_PATH      = Path(CTFHUB_REPO_PATH) / "writeups"
+# Local run state (trace reports, caches) — self-ignored so `git add .` never picks it up
+STATE_PATH         = Path(os.environ.get("CTF_STATE_PATH", Path(CTFHUB_REPO_PATH) / ".ctf-cache"))
+# How many queued pages to prepare ahead of their publish day (0 disables)
+PREPARE_AHEAD      = int(os.environ.get("CTF_PREPARE_AHEAD", "3"))
+
+# Record / replay external traffic (CTF_CASSETTE + CTF_CASSETTE_MODE). A cassette run starts from empty
+# local state, so the cassette alone holds what the run read and a replay never sees the live ledger,
+# notes cache, checkpoints or classifier
+CASSETTE = cassette.from_env()
+if CASSETTE:
+    STATE_PATH = Path(tempfile.mkdtemp(prefix="ctf-cassette-"))
+    if CASSETTE.replaying:
+        NOTION_DATABASE_ID = NOTION_DATABASE_ID or CASSETTE.context.get("database_id", "")
+    else:
+        CASSETTE.context["database_id"] = NOTION_DATABASE_ID
+
+PUBLISH_SECRETS = ("NOTION_TOKEN", "NOTION_DATABASE_ID", "ANTHROPIC_API_KEY")
+
+
+def require_env(name: str) -> str:
+    value = os.environ.get(name)
+    if not value:
+        raise RuntimeError(f"{name} is not set — it is required for this command")
+    return value
+
+
+class _LazyClient:
+    """Builds the wrapped client on first attribute access, so commands that never
+    talk to Notion or Claude neither import the SDKs nor need their secrets."""
+
+    __slots__ = ("_factory", "_client")
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client  = None
+
+    def __getattr__(self, name: str):
+        if self._client is None:
+            self._client = self._factory()
+        return getattr(self._client, name)
+
+
+def build_notion():
+    from notion_client import Client
+    return Client(auth=require_env("NOTION_TOKEN"))
+
+
+def build_claude():
+    import anthropic
+    return anthropic.Anthropic(api_key=require_env("ANTHROPIC_API_KEY"))
+
+
+def build_http():
+    import requests
+    return requests.Session()
+
+
+notion = _LazyClient(build_notion)
+claude = _LazyClient(build_claude)
+http   = _LazyClient(build_http)
+
+# Room URL → icon URL, committed with the writeups so re-publishes never refetch the page
+ICON_INDEX = IconIndex(Path(CTFHUB_REPO_PATH) / "scripts" / "icon_index.json")
+
+# Writeup path → name@hash of the system prompt that formatted it, committed with the writeups
+PROMPT_INDEX = PromptIndex(Path(CTFHUB_REPO_PATH) / "scripts" / "prompt_versions.json")
+
+# What was published, when, with which content hash and at which commit
+LEDGER = Ledger(STATE_PATH / "ledger.sqlite3")
 
-notion = Client(auth=NOTION_TOKEN)
-claude = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+# Page ID + last_edited_time → extracted notes, so an unchanged page is never re-read from Notion
+NOTES_CACHE      = NotesCache(STATE_PATH / "notes")
+NOTES_CACHE_DAYS = float(os.environ.get("CTF_NOTES_CACHE_DAYS", "14"))   # unused days before a published page's entry goes
+
+# Keyword + learned scorer that answers category / OS / tags locally when it is confident
+CLASSIFIER = Classifier(WRITEUPS_PATH, STATE_PATH / "classifier")
+
+# Inverted index over all writeups + static shards for client-side search on GitBook
+SEARCH_INDEX = _LazyClient(lambda: SearchIndex(Path(CTFHUB_REPO_PATH) / "scripts" / "search_index.json.gz",
+                                               Path(CTFHUB_REPO_PATH)))
+
+if CASSETTE:
+    notion = CASSETTE.wrap(notion, "notion")
+    claude = CASSETTE.wrap(claude, "claude")
+    http   = CASSETTE.wrap(http, "http")
+
+# Deadlines, hedged short calls and one in-flight limit for every Claude request.
+# Hedging is off under a cassette — duplicate requests would desync the recording.
+CLAUDE_GOVERNOR = Governor(STATE_PATH / "claude_latency.json", hedging=not CASSETTE)
+
+
+def claude_create(**kwargs):
+    """claude.messages.create through the governor."""
+    return CLAUDE_GOVERNOR.create(claude, **kwargs)
+
+
+def now() -> datetime:
+    """Run clock — frozen to the recording time when replaying a cassette."""
+    return CASSETTE.now() if CASSETTE else datetime.now()
+
+
+def pause(seconds: float):
+    """Rate-limit sleep between Notion calls; skipped on replay."""
+    if not (CASSETTE and CASSETTE.replaying):
+        time.sleep(seconds)
+
+
+def git_remote_enabled() -> bool:
+    """Replays must never touch the network — git pull/push/fetch are skipped."""
+    if CASSETTE and CASSETTE.replaying:
+        print("   ℹ️  Replay mode — skipping git remote operation")
+        return False
+    return True
+
+
+def state_dir(*parts: str) -> Path:
+    """Return (and create) a folder under STATE_PATH.
+    The state root carries its own `*` .gitignore so it stays out of commits on every branch."""
+    STATE_PATH.mkdir(parents=True, exist_ok=True)
+    ignore = STATE_PATH / ".gitignore"
+    if not ignore.exists():
+        ignore.write_text("*\n", encoding="utf-8")
+    path = STATE_PATH.joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """Write only when the bytes differ — an identical rewrite would still bump the mtime
+    (re-parsed by the link/search caches) for no change in git. Returns True if written."""
+    if path.exists() and path.read_text(encoding="utf-8") == content:
+        return False
+    path.write_text(content, encoding="utf-8")
+    return True
 
 # ─────────────────────────────────────────────
 # MAPPINGS
@@ -82,20 +250,6 @@ TYPE_SECTIONS = {
 
 IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
 
-NOTION_CODE_LANGUAGES = {
-    "abap","abc","agda","arduino","ascii art","assembly","bash","basic","bnf",
-    "c","c#","c++","clojure","coffeescript","coq","css","dart","dhall","diff",
-    "docker","ebnf","elixir","elm","erlang","f#","flow","fortran","gherkin",
-    "glsl","go","graphql","groovy","haskell","hcl","html","idris","java",
-    "javascript","json","julia","kotlin","latex","less","lisp","livescript",
-    "llvm ir","lua","makefile","markdown","markup","matlab","mathematica",
-    "mermaid","nix","notion formula","objective-c","ocaml","pascal","perl",
-    "php","plain text","powershell","prolog","protobuf","purescript","python",
-    "r","racket","reason","ruby","rust","sass","scala","scheme","scss","shell",
-    "smalltalk","solidity","sql","swift","toml","typescript","vb.net","verilog",
-    "vhdl","visual basic","webassembly","xml","yaml","java/c/c++/c#"
-}
-
 PLATFORM_INFO = {
     "TryHackMe":       {"emoji": "🔴", "desc": "TryHackMe rooms organised by difficulty."},
     "HackTheBox":      {"emoji": "🟢", "desc": "HackTheBox machine and challenge writeups."},
@@ -150,18 +304,27 @@ def build_tags_cell(meta: dict, topic_tags: list) -> str:
 # NOTION HELPERS
 # ─────────────────────────────────────────────
 
+@traced("notion")
+def query_database(filter: dict) -> list:
+    """Every page of the database matching a Notion filter, following pagination."""
+    pages, cursor = [], None
+    while True:
+        kwargs   = {"start_cursor": cursor} if cursor else {}
+        response = notion.databases.query(database_id=NOTION_DATABASE_ID, filter=filter, **kwargs)
+        pages   += response.get("results", [])
+        cursor   = response.get("next_cursor")
+        if not (response.get("has_more") and cursor):
+            return pages
+
+
 def query_completed_unpublished():
     print("🔍 Querying Notion for completed unpublished writeups...")
-    response = notion.databases.query(
-        database_id=NOTION_DATABASE_ID,
-        filter={
-            "and": [
-                {"property": "Completed", "checkbox": {"equals": True}},
-                {"property": "Published", "checkbox": {"equals": False}},
-            ]
-        }
-    )
-    pages = response.get("results", [])
+    pages = query_database({
+        "and": [
+            {"property": "Completed", "checkbox": {"equals": True}},
+            {"property": "Published", "checkbox": {"equals": False}},
+        ]
+    })
     print(f"   Found {len(pages)} page(s) to process")
     return pages
 
@@ -178,7 +341,7 @@ def get_page_properties(page: dict) -> dict:
         "tags":       [],
         "room_type":  "",
         "os":         "",      # NEW: Linux / Windows / Other
-        "date":       datetime.now().strftime("%b %d, %Y"),
+        "date":       now().strftime("%b %d, %Y"),
     }
 
     for title_key in ("Note Title", "Name", "Title", "Room", "Task"):
@@ -245,10 +408,47 @@ def get_page_properties(page: dict) -> dict:
     return meta
 
 
-def extract_blocks_as_text(page_id: str):
+# Heads the original notes in a published page body — everything above it is the formatted writeup
+ORIGINAL_NOTES_CALLOUT = "📝 Original Notes — Your raw notes as written"
+
+
+def _plain_text(texts: list) -> str:
+    """Rich text as read from Notion (plain_text) or as written by us (text.content)."""
+    return "".join(t.get("plain_text", t.get("text", {}).get("content", "")) for t in texts)
+
+
+def block_text(block: dict) -> str:
+    """One non-image block as markdown-ish text, "" for blocks that carry none."""
+    btype = block.get("type", "")
+    data  = block.get(btype, {})
+    line  = _plain_text(data.get("rich_text", []))
+    if btype == "code":
+        return f"```{data.get('language', '')}\n{line}\n```"
+    if btype == "divider":
+        return "---"
+    if not line.strip():
+        return ""
+    prefix = {"heading_1": "# ", "heading_2": "## ", "heading_3": "### ", "bulleted_list_item": "- ",
+              "numbered_list_item": "1. ", "quote": "> ", "paragraph": ""}.get(btype)
+    return "" if prefix is None else prefix + line
+
+
+def archived_notes(notes: str) -> str:
+    """The notes as a republish will read them back from the page body written at step 14 — the same
+    for the notes first read from Notion and for every later read of the archived copy."""
+    return "\n\n".join(filter(None, map(block_text, pack_notes_blocks(notes))))
+
+
+@traced("notion")
+def extract_blocks_as_text(page_id: str, on_image=None, on_archive=None):
+    """Page body as markdown-ish text plus its image URLs. `on_image(index, url)` is called the moment
+    an image block is seen, so its (expiring) signed URL can be downloaded while pagination continues.
+    A published page only yields its original notes: at the 📝 callout everything read so far (the
+    formatted writeup) is dropped and `on_archive()` is called so its image downloads can be discarded."""
     blocks_text = []
     image_urls  = []
     cursor      = None
+    archive     = False   # just passed the callout — the divider under it is not part of the notes
 
     while True:
         if cursor:
@@ -259,44 +459,18 @@ def extract_blocks_as_text(page_id: str):
         blocks = response.get("results", [])
 
         for block in blocks:
-            btype = block.get("type", "")
+            btype   = block.get("type", "")
+            skip    = archive and btype == "divider"
+            archive = False
 
-            if btype == "paragraph":
-                texts = block["paragraph"].get("rich_text", [])
-                line  = "".join(t.get("plain_text", "") for t in texts)
-                if line.strip():
-                    blocks_text.append(line)
+            if skip:
+                continue
 
-            elif btype in ("heading_1", "heading_2", "heading_3"):
-                texts = block[btype].get("rich_text", [])
-                level = {"heading_1": "#", "heading_2": "##", "heading_3": "###"}[btype]
-                line  = "".join(t.get("plain_text", "") for t in texts)
-                if line.strip():
-                    blocks_text.append(f"{level} {line}")
-
-            elif btype == "bulleted_list_item":
-                texts = block["bulleted_list_item"].get("rich_text", [])
-                line  = "".join(t.get("plain_text", "") for t in texts)
-                if line.strip():
-                    blocks_text.append(f"- {line}")
-
-            elif btype == "numbered_list_item":
-                texts = block["numbered_list_item"].get("rich_text", [])
-                line  = "".join(t.get("plain_text", "") for t in texts)
-                if line.strip():
-                    blocks_text.append(f"1. {line}")
-
-            elif btype == "code":
-                texts    = block["code"].get("rich_text", [])
-                language = block["code"].get("language", "")
-                code     = "".join(t.get("plain_text", "") for t in texts)
-                blocks_text.append(f"```{language}\n{code}\n```")
-
-            elif btype == "quote":
-                texts = block["quote"].get("rich_text", [])
-                line  = "".join(t.get("plain_text", "") for t in texts)
-                if line.strip():
-                    blocks_text.append(f"> {line}")
+            if btype == "callout" and _plain_text(block["callout"].get("rich_text", [])) == ORIGINAL_NOTES_CALLOUT:
+                blocks_text, image_urls = [], []
+                archive = True
+                if on_archive:
+                    on_archive()
 
             elif btype == "image":
                 img = block["image"]
@@ -309,10 +483,14 @@ def extract_blocks_as_text(page_id: str):
                 if img_url:
                     image_urls.append(img_url)
                     idx = len(image_urls)
+                    if on_image:
+                        on_image(idx, img_url)
                     blocks_text.append(f"![Screenshot {idx}](screenshot_{idx:02d}.png)")
 
-            elif btype == "divider":
-                blocks_text.append("---")
+            else:
+                line = block_text(block)
+                if line:
+                    blocks_text.append(line)
 
         if not response.get("has_more"):
             break
@@ -321,34 +499,68 @@ def extract_blocks_as_text(page_id: str):
     return "\n\n".join(blocks_text), image_urls
 
 
+def read_notes(page: dict, downloads: ScreenshotDownloads = None) -> tuple:
+    """extract_blocks_as_text through NOTES_CACHE. A cached entry whose signed image URLs have expired
+    is only used when there are no screenshots left to download."""
+    edited = page.get("last_edited_time", "")
+    cached = NOTES_CACHE.get(page["id"], edited)
+    if cached and (downloads is None or urls_fresh(cached[1])):
+        raw_notes, image_urls = cached
+        print(f"   ♻️  Notes from cache ({len(raw_notes)} chars, {len(image_urls)} image(s)) — page unchanged")
+        for i, url in enumerate(image_urls if downloads else [], start=1):
+            downloads.submit(i, url)
+        return raw_notes, image_urls
+    if cached:
+        print("   ⏭️  Cached image links have expired — re-reading the page")
+
+    print("   → Reading notes from Notion...")
+    started = datetime.now(timezone.utc)
+    raw_notes, image_urls = extract_blocks_as_text(page["id"], on_image=downloads.submit if downloads else None,
+                                                   on_archive=downloads.restart if downloads else None)
+    print(f"   ✅ Got {len(raw_notes)} chars of notes, {len(image_urls)} image(s)")
+    NOTES_CACHE.put(page["id"], edited, raw_notes, image_urls, read_at=started)
+    return raw_notes, image_urls
+
+
+def evict_notes_cache():
+    evicted = NOTES_CACHE.evict(lambda page_id: LEDGER.exists(page_id=page_id), NOTES_CACHE_DAYS)
+    if evicted:
+        print(f"   🧹 Evicted {evicted} cached page(s) published and untouched for {NOTES_CACHE_DAYS:g} day(s)")
+
+
+@traced("http")
 def fetch_room_description(url: str) -> str:
     if not url:
         return ""
     print(f"   → Fetching room info from: {url}")
     try:
         headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-        resp = requests.get(url, headers=headers, timeout=10)
-        if resp.status_code != 200:
-            return ""
-        text  = resp.text
-        clean = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.DOTALL)
-        clean = re.sub(r'<style[^>]*>.*?</style>',  '', clean, flags=re.DOTALL)
-        clean = re.sub(r'<[^>]+>', ' ', clean)
-        clean = re.sub(r'\s+', ' ', clean).strip()
-        return clean[:3000]
+        resp = http.get(url, headers=headers, timeout=10, stream=True)
+        try:
+            if resp.status_code != 200:
+                return ""
+            # Stream the body and stop as soon as 3000 chars of meta + visible text are in hand
+            text, bytes_read = extract_text_stream(
+                resp.iter_content(chunk_size=CHUNK_SIZE), limit=3000, encoding=response_encoding(resp)
+            )
+        finally:
+            resp.close()
+        print(f"   ✅ Room info: {len(text)} chars from {bytes_read / 1024:.0f} KB of page")
+        return text
     except Exception as e:
         print(f"   ⚠️  Could not fetch room page: {e}")
         return ""
 
 
-def fetch_room_icon(direct_url: str, page_url: str, dest_folder: Path, room_name: str) -> str:
+@traced("http")
+def fetch_room_icon(direct_url: str, page_url: str, dest_folder: Path, room_name: str, platform: str = "") -> str:
     room_clean = re.sub(r'[^\w\-]', '', room_name.replace(" ", ""))
     filename   = f"{room_clean}.png"
 
     if direct_url:
         try:
             print(f"   → Downloading icon from Notion Files property...")
-            resp = requests.get(direct_url, timeout=15)
+            resp = http.get(direct_url, timeout=15)
             if resp.status_code == 200:
                 icon_path = dest_folder / filename
                 icon_path.write_bytes(resp.content)
@@ -360,27 +572,34 @@ def fetch_room_icon(direct_url: str, page_url: str, dest_folder: Path, room_name
     url = page_url
     if not url:
         return ""
-    print(f"   → Fetching room icon from: {url}")
     try:
-        headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-        resp = requests.get(url, headers=headers, timeout=10)
-        if resp.status_code != 200:
-            return ""
-
-        og_match = re.search(r'<meta[^>]+property=["\']og:image["\'][^>]+content=["\']([^"\']+)["\']', resp.text)
-        if not og_match:
-            og_match = re.search(r'<meta[^>]+content=["\']([^"\']+)["\'][^>]+property=["\']og:image["\']', resp.text)
-
-        if not og_match:
-            s3_match = re.search(r'https://tryhackme-images\.s3\.amazonaws\.com/room-icons/[^\s"\']+', resp.text)
-            if s3_match:
-                icon_url = s3_match.group(0)
-            else:
+        headers  = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+        icon_url = ICON_INDEX.get(url)
+        if icon_url is not None:
+            if not icon_url:
+                print("   ℹ️  Room page has no icon (from icon index)")
                 return ""
+            print("   → Icon URL from icon index — skipping page fetch")
         else:
-            icon_url = og_match.group(1)
+            icon_url = ICON_INDEX.template_url(platform, url)
+            source   = "template"
+            if not icon_url:
+                # Only <head> is needed — stream until </head> and close the connection
+                print(f"   → Fetching room icon from: {url}")
+                resp = http.get(url, headers=headers, timeout=10, stream=True)
+                try:
+                    if resp.status_code != 200:
+                        return ""
+                    icon_url = scan_head_for_icon(resp)
+                finally:
+                    resp.close()
+                source = "page"
+            ICON_INDEX.put(url, icon_url, platform, source)
+            ICON_INDEX.save()
+            if not icon_url:
+                return ""
 
-        icon_resp = requests.get(icon_url, headers=headers, timeout=15)
+        icon_resp = http.get(icon_url, headers=headers, timeout=15)
         if icon_resp.status_code == 200:
             icon_path = dest_folder / filename
             icon_path.write_bytes(icon_resp.content)
@@ -393,32 +612,14 @@ def fetch_room_icon(direct_url: str, page_url: str, dest_folder: Path, room_name
         return ""
 
 
-def set_notion_page_icon(page_id: str, icon_url: str):
-    try:
-        notion.pages.update(
-            page_id=page_id,
-            icon={"type": "external", "external": {"url": icon_url}}
-        )
-        print("   ✅ Notion page icon updated")
-    except Exception as e:
-        print(f"   ⚠️  Could not set Notion icon: {e}")
+@traced("http")
+def fetch_screenshot(url: str):
+    return http.get(url, timeout=15)
 
 
-def download_screenshots(image_urls: list, dest_folder: Path) -> list:
-    saved = []
-    for i, url in enumerate(image_urls, start=1):
-        filename = f"screenshot_{i:02d}.png"
-        dest     = dest_folder / filename
-        try:
-            print(f"   → Downloading screenshot {i}/{len(image_urls)}...")
-            resp = requests.get(url, timeout=15)
-            if resp.status_code == 200:
-                dest.write_bytes(resp.content)
-                saved.append(filename)
-                print(f"   ✅ {filename}")
-        except Exception as e:
-            print(f"   ⚠️  Could not download screenshot {i}: {e}")
-    return saved
+def download_screenshots(downloads: ScreenshotDownloads) -> list:
+    """Screenshots saved by downloads started during block extraction, in image order."""
+    return downloads.wait()
 
 
 # ─────────────────────────────────────────────
@@ -574,7 +775,49 @@ def get_system_prompt(platform: str, room_type: str) -> str:
 
 SYSTEM_PROMPT = SYSTEM_PROMPT_REDTEAM  # fallback
 
+# Name + hash of each prompt's text — writeups formatted under an older hash are stale for `reformat`
+PROMPT_VERSIONS = {
+    SYSTEM_PROMPT_REDTEAM:   prompt_version("redteam",   SYSTEM_PROMPT_REDTEAM),
+    SYSTEM_PROMPT_BLUETEAM:  prompt_version("blueteam",  SYSTEM_PROMPT_BLUETEAM),
+    SYSTEM_PROMPT_CHALLENGE: prompt_version("challenge", SYSTEM_PROMPT_CHALLENGE),
+}
+
+
+def system_prompt_version(platform: str, room_type: str) -> str:
+    return PROMPT_VERSIONS[get_system_prompt(platform, room_type)]
+
+# Sections written from the rest of the writeup rather than from the notes — never where screenshots go
+SUMMARY_SECTIONS = {
+    SYSTEM_PROMPT_REDTEAM:   ("🧠 Overview", "🎯 Objectives", "🧩 Key Takeaways", "⛓️ Attack Chain Summary",
+                              "🔎 Detection Strategies", "🛠️ Tools & References"),
+    SYSTEM_PROMPT_BLUETEAM:  ("🧠 Overview", "🎯 Objectives", "🗺️ MITRE ATT&CK Mapping", "🧩 Key Takeaways",
+                              "🛡️ Defensive Recommendations", "🛠️ Tools & References"),
+    SYSTEM_PROMPT_CHALLENGE: ("🧠 Overview", "🎯 Objective", "🧩 Key Concepts", "🛠️ Tools & References"),
+}
 
+# Sections every writeup must have. The prompts tell Claude to omit any other section with no content, so
+# only these are regenerated when missing; the rest are only repaired when present but empty or cut off.
+REQUIRED_SECTIONS = {
+    SYSTEM_PROMPT_REDTEAM:   ("🧠 Overview", "🎯 Objectives", "🛠️ Tools & References"),
+    SYSTEM_PROMPT_BLUETEAM:  ("🧠 Overview", "🎯 Objectives", "🛠️ Tools & References"),
+    SYSTEM_PROMPT_CHALLENGE: ("🧠 Overview", "🎯 Objective", "🛠️ Tools & References"),
+}
+
+FORMAT_MODEL          = "claude-sonnet-4-6"
+FORMAT_MAX_TOKENS     = 8000     # per call — longer replies are continued, not truncated
+FORMAT_CONTINUATIONS  = 3
+FORMAT_PARALLEL       = 4        # concurrent part calls when notes are formatted in parts
+NOTES_TOKEN_BUDGET    = 30000    # notes (+ room info) above this are formatted part by part
+NOTES_PART_TOKENS     = 12000
+BODY_MARKER           = "<!-- body -->"
+GIF_FOOTER            = "\n\n---\n\n<p align=\"center\"><img src=\"https://media2.giphy.com/media/v1.Y2lkPTc5MGI3NjExaDdhdmt6N2dhazFqbTdsdmk0ZThkdTBrYjBoOGdobWF2NzRmbXBjeCZlcD12MV9pbnRlcm5hbF9naWZfYnlfaWQmY3Q9Zw/8kDPdrfdBUP8k/giphy.gif\" width=\"300\"></p>\n"
+SECTION_MAX_TOKENS    = 2000     # one regenerated section
+SECTION_CONTEXT       = 3000     # tokens of writeup outline a regenerated section is written from
+CONTINUE_PROMPT       = ("Your reply was cut off by the output limit. Continue exactly where it stopped — "
+                         "do not repeat anything already written and do not add any preamble.")
+
+
+@traced("claude")
 def format_with_claude(raw_notes: str, room_info: str, meta: dict, saved_screenshots: list, icon_filename: str) -> str:
     url_line = (
         f'    <b>URL:</b> <a href="{meta["url"]}">{meta["room_name"]}</a><br>\n'
@@ -608,6 +851,14 @@ def format_with_claude(raw_notes: str, room_info: str, meta: dict, saved_screens
     if saved_screenshots:
         screenshots_note = f"\n\nScreenshots available: {', '.join(saved_screenshots)}"
 
+    # Select system prompt based on platform and room type
+    system_prompt = get_system_prompt(meta.get("platform", ""), meta.get("room_type", ""))
+
+    notes_tokens = estimate_tokens(raw_notes) + estimate_tokens(room_info)
+    if notes_tokens > NOTES_TOKEN_BUDGET:
+        formatted = format_in_parts(raw_notes, room_info, meta, metadata_block, saved_screenshots, system_prompt, notes_tokens)
+        return repair_writeup(formatted, raw_notes, meta, metadata_block, saved_screenshots, system_prompt)
+
     user_message = f"""Format a cybersecurity writeup for: "{meta["room_name"]}"
 
 Use this metadata block exactly at the top:
@@ -627,21 +878,184 @@ ROUGH NOTES FROM KIERAN:
 
 Return ONLY the formatted markdown. Nothing else."""
 
-    # Select system prompt based on platform and room type
-    system_prompt = get_system_prompt(meta.get("platform", ""), meta.get("room_type", ""))
-
-    print("   → Sending to Claude...")
-    message = claude.messages.create(
-        model="claude-sonnet-4-6",
-        max_tokens=4000,
-        system=system_prompt,
-        messages=[{"role": "user", "content": user_message}]
-    )
+    print(f"   → Sending to Claude (~{notes_tokens:,} tokens of notes)...")
+    formatted = claude_complete(system_prompt, user_message)
     print("   ✅ Claude formatting complete")
-    return message.content[0].text
+    return repair_writeup(formatted, raw_notes, meta, metadata_block, saved_screenshots, system_prompt)
+
+
+def format_in_parts(raw_notes: str, room_info: str, meta: dict, metadata_block: str, saved_screenshots: list,
+                    system_prompt: str, notes_tokens: int) -> str:
+    """Map-reduce formatting for notes over budget: each part becomes the technical sections it
+    covers (in parallel), the parts are stitched by heading, then one call writes the opening and
+    closing summary sections from the stitched body."""
+    parts = split_notes(raw_notes, NOTES_PART_TOKENS)
+    print(f"   → Notes are ~{notes_tokens:,} tokens — formatting in {len(parts)} part(s)")
+
+    def format_part(index: int, part: str) -> str:
+        shots = [s for s in saved_screenshots if s in part]
+        note  = f"\n\nScreenshots referenced in this part: {', '.join(shots)}" if shots else ""
+        user  = f"""Format part {index + 1} of {len(parts)} of the notes for the cybersecurity writeup "{meta["room_name"]}".
+
+Write ONLY the technical walkthrough sections this part covers, using the section headings from the
+system prompt. Do NOT write the metadata block, the opening overview/objectives sections or the closing
+takeaways/summary/detection sections — those are written separately for the whole writeup.
+
+---
+ROOM DESCRIPTION (from platform):
+{room_info[:1500] if room_info else "Not available — use notes only"}
+
+---
+ROUGH NOTES FROM KIERAN (part {index + 1}/{len(parts)}):
+{part}
+{note}
+---
+
+Return ONLY the formatted markdown. Nothing else."""
+        return claude_complete(system_prompt, user)
+
+    with ThreadPoolExecutor(max_workers=min(FORMAT_PARALLEL, len(parts))) as pool:
+        bodies = list(pool.map(format_part, range(len(parts)), parts))
+    body = stitch_sections(bodies)
+
+    digest = body if estimate_tokens(body) <= NOTES_TOKEN_BUDGET else outline(body, NOTES_TOKEN_BUDGET)
+    user   = f"""Below is the formatted technical walkthrough for the cybersecurity writeup "{meta["room_name"]}".
+
+Write ONLY the sections of the system prompt's structure that come BEFORE the technical walkthrough
+(e.g. overview, objectives), then a line containing exactly {BODY_MARKER}, then the sections that come
+AFTER it (e.g. key takeaways, attack chain summary, detection strategies). Base them on the walkthrough.
+
+---
+ROOM DESCRIPTION (from platform):
+{room_info if room_info else "Not available"}
+
+---
+WALKTHROUGH{" OUTLINE" if digest is not body else ""}:
+{digest}
+---
+
+Return ONLY the formatted markdown. Nothing else."""
+    summary = claude_complete(system_prompt, user)
+    intro, _, outro = summary.partition(BODY_MARKER)
+    print(f"   ✅ Claude formatting complete ({len(parts)} part(s) stitched)")
+    return "\n\n".join(block.strip() for block in (metadata_block, intro, body, outro) if block.strip()) + "\n"
+
+
+SECTION_PROMPT = """Write ONLY the "## {heading}" section of the cybersecurity writeup "{room_name}", following the
+system prompt's rules for that section. Start with the heading line.
+
+{task}
+
+---
+WRITEUP OUTLINE:
+{context}
+---
+
+Return ONLY the markdown for that one section. Nothing else."""
+
+
+def repair_writeup(formatted: str, notes: str, meta: dict, metadata_block: str, saved_screenshots: list,
+                   system_prompt: str) -> str:
+    """Check a formatted writeup against its prompt's structure and fix what is broken: the metadata
+    block is put back locally, and each missing / empty / cut-off section or section that lost its
+    screenshots is regenerated alone with a small prompt and spliced in."""
+    structure = writeup_check.prompt_sections(system_prompt)
+    required  = REQUIRED_SECTIONS.get(system_prompt, ())
+    problems  = writeup_check.check(formatted, structure, required, metadata_block, saved_screenshots)
+    if not problems:
+        return formatted
+    print(f"   🩺 {len(problems)} structural problem(s): "
+          + "; ".join(f"{p['section'] or p['kind']} — {p['detail']}" for p in problems))
+
+    if any(p["kind"] == "metadata" for p in problems):
+        formatted = writeup_check.fix_metadata(formatted, metadata_block)
+
+    _, sections = writeup_check.split_sections(formatted)
+    bodies = dict((h, body) for h, body in sections)
+    tasks  = {}
+    for problem in problems:
+        heading = problem["section"]
+        if problem["kind"] == "missing":
+            tasks.setdefault(heading, []).append("The section is missing from the writeup — write it from the outline below.")
+        elif problem["kind"] == "empty":
+            tasks.setdefault(heading, []).append("The section has a heading but no content — write it from the outline below.")
+        elif problem["kind"] == "fence":
+            tasks.setdefault(heading, []).append(
+                f"The current version was cut off inside a code block — rewrite it complete:\n\n{bodies[heading]}")
+        elif problem["kind"] == "images":
+            walkthrough = [h for h, _ in sections if h not in SUMMARY_SECTIONS.get(system_prompt, ())]
+            homes = writeup_check.image_homes(notes, problem["images"], sections, walkthrough)
+            for home, images in homes.items():
+                excerpts = "\n\n".join(writeup_check.notes_excerpt(notes, image) for image in images)
+                tasks.setdefault(home, []).append(
+                    f"The current version dropped these image references — keep everything else and put each one "
+                    f"back as ![Screenshot N](screenshot_NN.png) where the notes show it: {', '.join(images)}\n\n"
+                    f"Current section:\n{bodies[home]}\n\nNotes around the images:\n{excerpts}")
+    if not tasks:
+        return formatted
+
+    context = outline(formatted, SECTION_CONTEXT)
+
+    def regenerate(heading: str) -> str:
+        user = SECTION_PROMPT.format(heading=heading, room_name=meta["room_name"],
+                                     task="\n\n".join(tasks[heading]), context=context)
+        return claude_complete(system_prompt, user, max_tokens=SECTION_MAX_TOKENS)
+
+    with ThreadPoolExecutor(max_workers=min(FORMAT_PARALLEL, len(tasks))) as pool:
+        futures = {heading: pool.submit(regenerate, heading) for heading in tasks}
+    for heading, future in futures.items():
+        try:
+            formatted = writeup_check.splice(formatted, heading, future.result(), structure)
+        except Exception as e:
+            print(f"   ⚠️  Could not regenerate {heading}: {e}")
+
+    left = writeup_check.check(formatted, structure, required, metadata_block, saved_screenshots)
+    print(f"   🩺 Regenerated {len(tasks)} section(s) — "
+          + ("structure OK" if not left else f"{len(left)} problem(s) left: " + "; ".join(p["detail"] for p in left)))
+    return formatted
+
+
+@traced("claude")
+def claude_complete(system_prompt: str, user_message: str, max_tokens: int = FORMAT_MAX_TOKENS) -> str:
+    """One formatting call that keeps going while the reply stops at max_tokens, up to
+    FORMAT_CONTINUATIONS follow-ups. Each follow-up replays the text so far and asks Claude to continue."""
+    messages = [{"role": "user", "content": user_message}]
+    text     = ""
+    for attempt in range(FORMAT_CONTINUATIONS + 1):
+        message = claude_create(
+            model=FORMAT_MODEL,
+            max_tokens=max_tokens,
+            system=system_prompt,
+            messages=messages,
+        )
+        text = join_continuation(text, message.content[0].text)
+        if message.stop_reason != "max_tokens":
+            return text
+        if attempt == FORMAT_CONTINUATIONS:
+            break
+        print(f"   ↪ Reply hit max_tokens — continuing ({attempt + 1}/{FORMAT_CONTINUATIONS})")
+        messages = [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": text.rstrip()},
+            {"role": "user", "content": CONTINUE_PROMPT},
+        ]
+    print(f"   ⚠️  Reply still truncated after {FORMAT_CONTINUATIONS} continuation(s)")
+    return text
 
 
-def suggest_topic_tags(raw_notes: str, room_info: str, room_name: str) -> list:
+def classifier_text(room_name: str, room_info: str, notes: str) -> str:
+    """What the local classifier scores: the same room name and description Claude sees, plus the notes."""
+    return f"{room_name}\n{room_info or ''}\n{notes or ''}"
+
+
+def suggest_topic_tags(raw_notes: str, room_info: str, room_name: str, key: str = "") -> list:
+    """Three topic tags — from the local classifier when it is confident, otherwise from Claude."""
+    return CLASSIFIER.decide("tags", key or room_name, classifier_text(room_name, room_info, raw_notes),
+                             lambda: claude_topic_tags(raw_notes, room_info, room_name))
+
+
+@traced("claude")
+def claude_topic_tags(raw_notes: str, room_info: str, room_name: str) -> list:
     prompt = f"""You are tagging a CTF room for a portfolio. Based on the room name, description and notes below, suggest exactly 3 short topic tags that describe what the room is about technically.
 
 Rules:
@@ -654,10 +1068,10 @@ Rules:
 
 Room: {room_name}
 Description: {room_info[:500] if room_info else "Not available"}
-Notes summary: {raw_notes[:500]}"""
+Notes summary: {raw_notes[:1500]}"""
 
     try:
-        message = claude.messages.create(
+        message = claude_create(
             model="claude-sonnet-4-6",
             max_tokens=50,
             messages=[{"role": "user", "content": prompt}]
@@ -680,10 +1094,15 @@ Notes summary: {raw_notes[:500]}"""
 # AUTO-DETECT OS — NEW
 # ─────────────────────────────────────────────
 
-def auto_detect_os(platform: str, room_info: str, room_name: str, url: str) -> str:
+def auto_detect_os(platform: str, room_info: str, room_name: str, url: str, notes: str = "", key: str = "") -> str:
     """Detect OS (Linux/Windows/Other) for platforms that use the OS split.
-    Only called for TryHackMe and HackTheBox."""
+    Only called for TryHackMe and HackTheBox. Claude is asked only when the local classifier isn't sure."""
+    return CLASSIFIER.decide("os", key or room_name, classifier_text(room_name, room_info, notes),
+                             lambda: claude_detect_os(platform, room_info, room_name, url))
+
 
+@traced("claude")
+def claude_detect_os(platform: str, room_info: str, room_name: str, url: str) -> str:
     prompt = f"""You are detecting the operating system of a CTF machine for a portfolio tracker.
 
 Based on the platform, room name, URL and description below, determine the OS.
@@ -703,7 +1122,7 @@ Description: {room_info[:800] if room_info else "Not available"}
 Reply with ONLY: Linux, Windows, or Other"""
 
     try:
-        message = claude.messages.create(
+        message = claude_create(
             model="claude-sonnet-4-6",
             max_tokens=10,
             messages=[{"role": "user", "content": prompt}]
@@ -721,20 +1140,6 @@ Reply with ONLY: Linux, Windows, or Other"""
         return "Linux"
 
 
-def write_os_to_notion(page_id: str, os_value: str):
-    """Write the auto-detected OS back to the Notion OS property."""
-    try:
-        notion.pages.update(
-            page_id=page_id,
-            properties={
-                "OS": {"select": {"name": os_value}}
-            }
-        )
-        print(f"   ✅ Notion OS set to: {os_value}")
-    except Exception as e:
-        print(f"   ⚠️  Could not set Notion OS: {e}")
-
-
 # ─────────────────────────────────────────────
 # README MANAGEMENT
 # ─────────────────────────────────────────────
@@ -752,7 +1157,7 @@ def ensure_platform_readme(platform_dir: Path, platform: str):
 
 > Writeups drafted in Notion and auto-published via a custom Python pipeline using Claude.
 """
-    readme.write_text(content, encoding="utf-8")
+    write_if_changed(readme, content)
     print(f"   ✅ Created {platform}/README.md")
 
 
@@ -777,7 +1182,7 @@ def ensure_difficulty_readme(diff_dir: Path, platform: str, difficulty: str):
 
 > Writeups drafted in Notion and auto-published via a custom Python pipeline using Claude.
 """
-    readme.write_text(content, encoding="utf-8")
+    write_if_changed(readme, content)
     print(f"   ✅ Created {platform}/{difficulty}/README.md")
 
 
@@ -802,7 +1207,7 @@ def ensure_os_readme(os_dir: Path, platform: str, difficulty: str, os_name: str)
 
 > Writeups drafted in Notion and auto-published via a custom Python pipeline using Claude.
 """
-    readme.write_text(content, encoding="utf-8")
+    write_if_changed(readme, content)
     print(f"   ✅ Created {platform}/{difficulty}/{os_name}/README.md")
 
 
@@ -921,7 +1326,7 @@ def update_platform_readme(platform_dir: Path, platform: str, meta: dict, icon_f
 
     if frontmatter:
         content = frontmatter + "\n" + content.lstrip("\n")
-    readme.write_text(content, encoding="utf-8")
+    write_if_changed(readme, content)
     print(f"   ✅ Updated {platform}/README.md — All Writeups table updated")
 
 
@@ -983,7 +1388,7 @@ def update_difficulty_readme(diff_dir: Path, platform: str, difficulty: str, met
         content
     )
 
-    readme.write_text(content, encoding="utf-8")
+    write_if_changed(readme, content)
     print(f"   ✅ Added {meta['room_name']} to {platform}/{difficulty}/README.md")
 
 
@@ -1028,7 +1433,7 @@ def update_os_readme(os_dir: Path, platform: str, difficulty: str, os_name: str,
         else:
             content += f"\n{new_row}\n"
 
-    readme.write_text(content, encoding="utf-8")
+    write_if_changed(readme, content)
     print(f"   ✅ Added {meta['room_name']} to {platform}/{difficulty}/{os_name}/README.md")
 
 
@@ -1036,74 +1441,7 @@ def update_os_readme(os_dir: Path, platform: str, difficulty: str, os_name: str,
 # NOTION WRITE-BACK
 # ─────────────────────────────────────────────
 
-def markdown_to_notion_blocks(markdown: str) -> list:
-    blocks = []
-    lines  = markdown.split("\n")
-    i      = 0
-
-    while i < len(lines):
-        line = lines[i]
-
-        if line.startswith("```"):
-            lang       = line[3:].strip()
-            code_lines = []
-            i += 1
-            while i < len(lines) and not lines[i].startswith("```"):
-                code_lines.append(lines[i])
-                i += 1
-            blocks.append({
-                "object": "block", "type": "code",
-                "code": {
-                    "rich_text": [{"type": "text", "text": {"content": "\n".join(code_lines)}}],
-                    "language":  lang if lang in NOTION_CODE_LANGUAGES else "plain text"
-                }
-            })
-        elif line.startswith("### "):
-            blocks.append({"object": "block", "type": "heading_3",
-                "heading_3": {"rich_text": [{"type": "text", "text": {"content": line[4:]}}]}})
-        elif line.startswith("## "):
-            blocks.append({"object": "block", "type": "heading_2",
-                "heading_2": {"rich_text": [{"type": "text", "text": {"content": line[3:]}}]}})
-        elif line.startswith("# "):
-            blocks.append({"object": "block", "type": "heading_1",
-                "heading_1": {"rich_text": [{"type": "text", "text": {"content": line[2:]}}]}})
-        elif line.startswith("- ") or line.startswith("* "):
-            blocks.append({"object": "block", "type": "bulleted_list_item",
-                "bulleted_list_item": {"rich_text": [{"type": "text", "text": {"content": line[2:]}}]}})
-        elif re.match(r'^\d+\. ', line):
-            content = re.sub(r'^\d+\. ', '', line)
-            blocks.append({"object": "block", "type": "numbered_list_item",
-                "numbered_list_item": {"rich_text": [{"type": "text", "text": {"content": content}}]}})
-        elif line.strip() == "---":
-            blocks.append({"object": "block", "type": "divider", "divider": {}})
-        elif line.startswith("> "):
-            blocks.append({"object": "block", "type": "quote",
-                "quote": {"rich_text": [{"type": "text", "text": {"content": line[2:]}}]}})
-        elif line.startswith("!["):
-            match = re.match(r'!\[([^\]]*)\]\(([^\)]+)\)', line)
-            if match:
-                blocks.append({"object": "block", "type": "paragraph",
-                    "paragraph": {"rich_text": [{"type": "text",
-                        "text": {"content": f"📸 {match.group(1)} ({match.group(2)})"},
-                        "annotations": {"italic": True, "color": "gray"}}]}})
-        elif line.strip().startswith("<p align") or line.strip().startswith("<sub>"):
-            blocks.append({"object": "block", "type": "callout",
-                "callout": {
-                    "rich_text": [{"type": "text", "text": {"content": "Writeup auto-generated by CTF Publisher ✅"}}],
-                    "icon":      {"type": "emoji", "emoji": "🤖"},
-                    "color":     "gray_background"
-                }})
-            while i < len(lines) and lines[i].strip() != "---":
-                i += 1
-        elif line.strip():
-            blocks.append({"object": "block", "type": "paragraph",
-                "paragraph": {"rich_text": [{"type": "text", "text": {"content": line[:2000]}}]}})
-
-        i += 1
-
-    return blocks
-
-
+@traced("notion")
 def clear_page_content(page_id: str):
     print("   → Clearing Notion page content...")
     for attempt in range(5):
@@ -1127,21 +1465,17 @@ def clear_page_content(page_id: str):
         for block in all_blocks:
             try:
                 notion.blocks.delete(block_id=block["id"])
-                time.sleep(0.15)
+                pause(0.15)
             except Exception:
                 pass
 
-        time.sleep(2)
+        pause(2)
 
     print("   ⚠️  Could not fully clear page after 5 attempts — proceeding anyway")
 
 
-def write_back_to_notion(page_id: str, formatted_content: str, original_notes: str):
-    print("   → Clearing old Notion content...")
-    clear_page_content(page_id)
-    time.sleep(3)
-
-    print("   → Writing formatted writeup to Notion...")
+def notion_body_blocks(formatted_content: str, original_notes: str) -> list:
+    """The page body written back to Notion: formatted writeup, a separator, then the raw notes."""
     formatted_blocks = markdown_to_notion_blocks(formatted_content)
 
     separator_blocks = [
@@ -1149,7 +1483,7 @@ def write_back_to_notion(page_id: str, formatted_content: str, original_notes: s
         {
             "object": "block", "type": "callout",
             "callout": {
-                "rich_text": [{"type": "text", "text": {"content": "📝 Original Notes — Your raw notes as written"}}],
+                "rich_text": [{"type": "text", "text": {"content": ORIGINAL_NOTES_CALLOUT}}],
                 "icon":      {"type": "emoji", "emoji": "📝"},
                 "color":     "yellow_background"
             }
@@ -1157,30 +1491,48 @@ def write_back_to_notion(page_id: str, formatted_content: str, original_notes: s
         {"object": "block", "type": "divider", "divider": {}},
     ]
 
-    original_blocks = []
-    for line in original_notes.split("\n"):
-        if not line.strip():
-            continue
-        original_blocks.append({
-            "object": "block", "type": "paragraph",
-            "paragraph": {"rich_text": [{"type": "text", "text": {"content": line[:2000]}}]}
-        })
-
-    all_blocks = formatted_blocks + separator_blocks + original_blocks
-    for i in range(0, len(all_blocks), 100):
-        chunk = all_blocks[i:i + 100]
+    original_blocks = pack_notes_blocks(original_notes)
+    note_lines      = sum(1 for line in original_notes.split("\n") if line.strip())
+    print(f"   → Original notes: {note_lines} line(s) packed into {len(original_blocks)} block(s)")
+    return formatted_blocks + separator_blocks + original_blocks
+
+
+@traced("notion")
+def write_back_to_notion(page_id: str, all_blocks: list):
+    print("   → Clearing old Notion content...")
+    clear_page_content(page_id)
+    pause(3)
+
+    print("   → Writing formatted writeup to Notion...")
+    chunks = chunk_for_append(all_blocks)
+    for chunk in chunks:
         notion.blocks.children.append(block_id=page_id, children=chunk)
-        time.sleep(0.5)
+        pause(0.5)
+    print(f"   ✅ {len(all_blocks)} block(s) appended in {len(chunks)} request(s)")
 
     print("   ✅ Notion page updated (formatted writeup + original notes preserved)")
 
 
-def mark_as_published(page_id: str):
-    notion.pages.update(
-        page_id=page_id,
-        properties={"Published": {"checkbox": True}}
-    )
-    print("   ✅ Marked as Published in Notion")
+@traced("notion")
+def commit_page_update(page: dict, pending: PageUpdate) -> bool:
+    """The publish commit point: queued Category / OS / icon changes and the Published tick go
+    out as one pages.update. Returns True once the page is marked Published."""
+    pending.set_checkbox("Published")
+    for name in pending.drop_conflicts(page.get("properties", {})):
+        print(f"   ℹ️  {name} was changed in Notion since it was detected — keeping Notion's value")
+    changes = pending.changes
+    result  = pending.flush(notion, sleep=pause)
+    for name, error in result["failed"].items():
+        print(f"   ⚠️  Could not set Notion {name}: {error}")
+    applied = [c for c in changes if c not in result["failed"]]
+    if applied:
+        print(f"   ✅ Notion updated ({', '.join(applied)}) in {result['calls']} request(s)")
+    return "Published" not in result["failed"]
+
+
+def pending_update(page_id: str, ckpt: Checkpoint) -> PageUpdate:
+    """Page changes queued by an earlier run's publish stage, if it got that far."""
+    return PageUpdate.from_dict(page_id, ckpt.get("publish").get("pending", {}))
 
 
 # ─────────────────────────────────────────────
@@ -1227,8 +1579,10 @@ def get_destination_folder(meta: dict) -> Path:
             return diff_dir / room_clean
 
 
-def update_gitbook_branch(meta: dict):
-    """Checkout gitbook branch, copy new writeup files, update SUMMARY.md and README tables, push."""
+@traced("git")
+def update_gitbook_branch(meta: dict) -> bool:
+    """Checkout gitbook branch, copy new writeup files, update SUMMARY.md and README tables, push.
+    Returns False if the branch could not be updated."""
     platform   = PLATFORM_FOLDERS.get(meta["platform"].lower().replace(" ", ""), meta["platform"])
     difficulty = DIFFICULTY_FOLDERS.get(meta["difficulty"].lower(), meta["difficulty"])
     room_clean = re.sub(r'[^\w\-]', '', meta["room_name"].replace(" ", "-"))
@@ -1262,10 +1616,11 @@ def update_gitbook_branch(meta: dict):
         subprocess.run(["git", "stash"], cwd=CTFHUB_REPO_PATH, capture_output=True)
 
         # Fetch gitbook branch (not fetched by default in Actions runner)
-        subprocess.run(
-            ["git", "fetch", "origin", "gitbook"],
-            cwd=CTFHUB_REPO_PATH, capture_output=True
-        )
+        if git_remote_enabled():
+            subprocess.run(
+                ["git", "fetch", "origin", "gitbook"],
+                cwd=CTFHUB_REPO_PATH, capture_output=True
+            )
 
         # Switch to gitbook branch
         subprocess.run(
@@ -1278,7 +1633,7 @@ def update_gitbook_branch(meta: dict):
             print("   ⚠️  SUMMARY.md not found on gitbook branch — skipping")
             subprocess.run(["git", "checkout", "main"], cwd=CTFHUB_REPO_PATH, capture_output=True)
             subprocess.run(["git", "stash", "pop"], cwd=CTFHUB_REPO_PATH, capture_output=True)
-            return
+            return False
 
         content = summary_path.read_text(encoding="utf-8")
 
@@ -1352,19 +1707,38 @@ def update_gitbook_branch(meta: dict):
             ["git", "commit", "-m", f"sync: Add {platform} - {meta['room_name']}"],
             cwd=CTFHUB_REPO_PATH, capture_output=True, text=True
         )
-        if "nothing to commit" not in result.stdout:
+        if "nothing to commit" not in result.stdout and git_remote_enabled():
             subprocess.run(["git", "push", "--force", "origin", "gitbook"], cwd=CTFHUB_REPO_PATH, check=True, capture_output=True)
             print("   ✅ Gitbook branch updated")
+        return True
 
     except subprocess.CalledProcessError as e:
         print(f"   ⚠️  SUMMARY update error: {e.stderr}")
+        return False
     finally:
         # Always return to main and restore stash
         subprocess.run(["git", "checkout", "main"], cwd=CTFHUB_REPO_PATH, capture_output=True)
         subprocess.run(["git", "stash", "pop"], cwd=CTFHUB_REPO_PATH, capture_output=True)
 
 
-def git_commit_push(room_name: str, platform: str):
+def update_search_index():
+    try:
+        reindexed, removed = SEARCH_INDEX.sync(readme_tags(Path(CTFHUB_REPO_PATH)))
+        SEARCH_INDEX.save()
+        shards = SEARCH_INDEX.write_shards(WRITEUPS_PATH / ".search")
+        print(f"   ✅ Search index: {len(SEARCH_INDEX.docs)} writeup(s), {reindexed} reindexed, "
+              f"{removed} removed, {shards} shard file(s) updated")
+    except Exception as e:
+        print(f"   ⚠️  Could not update search index: {e}")
+
+
+def git_head() -> str:
+    result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=CTFHUB_REPO_PATH, capture_output=True, text=True)
+    return result.stdout.strip()
+
+
+@traced("git")
+def git_commit_push(room_name: str, platform: str) -> bool:
     print("   → Committing to GitHub...")
     try:
         subprocess.run(["git", "add", "."], cwd=CTFHUB_REPO_PATH, check=True, capture_output=True)
@@ -1375,15 +1749,19 @@ def git_commit_push(room_name: str, platform: str):
         )
         if "nothing to commit" in result.stdout:
             print("   ℹ️  Nothing new to commit")
-            return
+            return True
+        if not git_remote_enabled():
+            return True
         subprocess.run(
             ["git", "pull", "--rebase", "origin", "main"],
             cwd=CTFHUB_REPO_PATH, check=True, capture_output=True
         )
         subprocess.run(["git", "push"], cwd=CTFHUB_REPO_PATH, check=True, capture_output=True)
         print(f"   ✅ Pushed: {commit_msg}")
+        return True
     except subprocess.CalledProcessError as e:
         print(f"   ⚠️  Git error: {e.stderr}")
+        return False
 
 
 # ─────────────────────────────────────────────
@@ -1455,8 +1833,8 @@ def update_main_readme_stats():
     match   = re.search(pattern, content, re.DOTALL)
     if match:
         content = content[:match.start()] + new_table + content[match.end():]
-        readme_path.write_text(content, encoding="utf-8")
-        print(f"   ✅ Stats updated: {grand_total} total writeup(s)")
+        if write_if_changed(readme_path, content):
+            print(f"   ✅ Stats updated: {grand_total} total writeup(s)")
     else:
         print("   ⚠️  Could not find stats table in README to update")
 
@@ -1465,7 +1843,7 @@ def update_main_readme_stats():
 # AUTO-CATEGORISE
 # ─────────────────────────────────────────────
 
-def auto_categorise(platform: str, room_info: str, room_name: str) -> str:
+def auto_categorise(platform: str, room_info: str, room_name: str, notes: str = "", key: str = "") -> str:
     platform_defaults = {
         "VulnHub":         "Machine",
         "ProvingGrounds":  "Machine",
@@ -1480,7 +1858,12 @@ def auto_categorise(platform: str, room_info: str, room_name: str) -> str:
     }
     if platform in platform_defaults:
         return platform_defaults[platform]
+    return CLASSIFIER.decide("category", key or room_name, classifier_text(room_name, room_info, notes),
+                             lambda: claude_categorise(platform, room_info, room_name))
 
+
+@traced("claude")
+def claude_categorise(platform: str, room_info: str, room_name: str) -> str:
     prompt = f"""You are categorising a CTF room for a portfolio tracker.
 
 Based on the platform, room name and description below, pick exactly ONE category from this list:
@@ -1499,7 +1882,7 @@ Description: {room_info[:800] if room_info else "Not available"}
 Reply with ONLY the single category word from the list above. Nothing else."""
 
     try:
-        message = claude.messages.create(
+        message = claude_create(
             model="claude-sonnet-4-6",
             max_tokens=10,
             messages=[{"role": "user", "content": prompt}]
@@ -1517,56 +1900,263 @@ Reply with ONLY the single category word from the list above. Nothing else."""
         return "Challenge"
 
 
-def write_category_to_notion(page_id: str, category: str):
-    try:
-        notion.pages.update(
-            page_id=page_id,
-            properties={"Category": {"select": {"name": category}}}
-        )
-        print(f"   ✅ Notion Category set to: {category}")
-    except Exception as e:
-        print(f"   ⚠️  Could not set Notion Category: {e}")
-
-
 # ─────────────────────────────────────────────
 # MAIN PIPELINE
 # ─────────────────────────────────────────────
 
-def process_page(page: dict):
+def open_checkpoint(page: dict) -> Checkpoint:
+    """The page's checkpoint, discarded first if the Notion page was edited since it was recorded."""
+    ckpt = Checkpoint(state_dir("checkpoints"), page["id"])
+    if ckpt.check_edited(page.get("last_edited_time", "")):
+        print("   ♻️  Notion page edited since it was prepared — starting over")
+    return ckpt
+
+
+PUBLISHED_DATE_RE = re.compile(r"<b>Date:</b> (.+?)<br>")
+PUBLISHED_TAGS_RE = re.compile(r"<b>Tags:</b> (.+)")
+
+
+def format_inputs(meta: dict, raw_notes: str, room_info: str, prompt: str) -> str:
+    """Everything the formatted writeup is made from except the publish date and topic tags. Recorded
+    with each publish; a match means Claude would be asked to format exactly what it formatted last time.
+    The notes count in the form step 14 archives them, which is what a republish reads back."""
+    fields = [meta.get(k) or "" for k in ("room_name", "platform", "difficulty", "room_type", "os", "url",
+                                         "icon_filename")]
+    return "\n".join([content_hash(archived_notes(raw_notes)), content_hash(room_info or ""), prompt, *fields])
+
+
+def published_topic_tags(formatted: str, meta: dict) -> list:
+    """The topic tags in a published writeup's metadata block, so a reused writeup keeps its tags cell."""
+    found = PUBLISHED_TAGS_RE.search(formatted)
+    fixed = {f"#{meta['platform'].lower().replace(' ', '')}", f"#{meta['difficulty'].lower()}",
+             f"#{meta.get('room_type', '').lower()}"}
+    return [tag[1:] for tag in (found.group(1).split() if found else []) if tag not in fixed]
+
+
+def published_writeup(page_id: str, inputs: str) -> str:
+    """The page's published writeup (without the footer) if it was formatted from these same inputs and
+    the file in the repo is still what was published, else "" — the writeup has to be formatted again."""
+    if not LEDGER.output_unchanged(page_id, "format_inputs", inputs):
+        return ""
+    row  = LEDGER.latest(page_id=page_id)
+    path = Path(CTFHUB_REPO_PATH) / row["path"] if row else None
+    if path is None or not path.exists():
+        return ""
+    content = path.read_text(encoding="utf-8")
+    if content_hash(content) != row["content_hash"] or not content.endswith(GIF_FOOTER):
+        return ""
+    return content[:-len(GIF_FOOTER)]
+
+
+def prepare_page(page: dict, ckpt: Checkpoint = None) -> dict:
+    """Stages 1–9: read Notion, fetch room info, classify, download assets and format with Claude.
+    Writes nothing to Notion or the repo — outputs go to the checkpoint, assets to its staging folder."""
     meta = get_page_properties(page)
-    print(f"\n{'='*50}")
-    print(f"📝 Processing: {meta['room_name']}")
-    print(f"   Platform: {meta['platform']} | Difficulty: {meta['difficulty']} | Type: {meta['room_type'] or 'Not set'} | OS: {meta['os'] or 'Not set'}")
+    ckpt = ckpt or open_checkpoint(page)
+    ckpt.assets.mkdir(parents=True, exist_ok=True)
+
+    # Screenshots download in the background from the moment their blocks are read (step 6 waits)
+    saved     = ckpt.get("screenshots")
+    downloads = None
+    if not (ckpt.done("screenshots") and Checkpoint.assets_intact(ckpt.assets, saved["assets"])):
+        downloads = ScreenshotDownloads(fetch_screenshot, ckpt.assets)
 
     # 1. Read rough notes
-    print("   → Reading notes from Notion...")
-    raw_notes, image_urls = extract_blocks_as_text(meta["page_id"])
-    print(f"   ✅ Got {len(raw_notes)} chars of notes, {len(image_urls)} image(s)")
+    with span("01 Read notes"):
+        if ckpt.done("notes"):
+            saved = ckpt.get("notes")
+            raw_notes, image_urls = saved["raw_notes"], saved["image_urls"]
+            meta["date"] = saved["date"]
+            print(f"   ♻️  Notes from checkpoint ({len(raw_notes)} chars, {len(image_urls)} image(s))")
+            for i, url in enumerate(image_urls if downloads else [], start=1):
+                downloads.submit(i, url)
+        else:
+            raw_notes, image_urls = read_notes(page, downloads)
+            ckpt.save("notes", raw_notes=raw_notes, image_urls=image_urls, date=meta["date"])
+
+        # Claude (and every classifier) sees the compressed copy; raw_notes stays intact for the Notion archive
+        prompt_notes, compression = compress_notes(raw_notes)
+        print(f"   🗜️  Notes for Claude: {describe_compression(compression)}")
 
     # 2. Fetch room description early — needed for OS and category detection
-    room_info = fetch_room_description(meta["url"])
+    with span("02 Room description"):
+        if ckpt.done("room_info"):
+            room_info = ckpt.get("room_info")["room_info"]
+        else:
+            room_info = fetch_room_description(meta["url"])
+            ckpt.save("room_info", room_info=room_info)
 
-    # 3. Auto-categorise if not already set
+    # 3. Auto-categorise if not already set (written to Notion at publish time)
     platform = PLATFORM_FOLDERS.get(meta["platform"].lower().replace(" ", ""), meta["platform"])
-    if not meta.get("room_type"):
-        meta["room_type"] = auto_categorise(platform, room_info, meta["room_name"])
-        write_category_to_notion(meta["page_id"], meta["room_type"])
-    else:
-        print(f"   ℹ️  Category already set: {meta['room_type']}")
-
-    # 4. Auto-detect OS for HTB and THM — NEW
-    if platform in OS_SPLIT_PLATFORMS:
-        if not meta.get("os"):
-            meta["os"] = auto_detect_os(platform, room_info, meta["room_name"], meta["url"])
-            write_os_to_notion(meta["page_id"], meta["os"])
+    with span("03 Categorise"):
+        if ckpt.done("category"):
+            meta["room_type"] = ckpt.get("category")["room_type"]
+        elif not meta.get("room_type"):
+            meta["room_type"] = auto_categorise(platform, room_info, meta["room_name"], prompt_notes, meta["page_id"])
+            ckpt.save("category", room_type=meta["room_type"], detected=True)
+        else:
+            print(f"   ℹ️  Category already set: {meta['room_type']}")
+            ckpt.save("category", room_type=meta["room_type"], detected=False)
+
+    # 4. Auto-detect OS for HTB and THM (written to Notion at publish time)
+    with span("04 Detect OS"):
+        if ckpt.done("os"):
+            meta["os"] = ckpt.get("os")["os"]
+        elif platform not in OS_SPLIT_PLATFORMS:
+            meta["os"] = ""  # Not applicable for other platforms
+            ckpt.save("os", os="", detected=False)
+        elif not meta.get("os"):
+            meta["os"] = auto_detect_os(platform, room_info, meta["room_name"], meta["url"], prompt_notes, meta["page_id"])
+            ckpt.save("os", os=meta["os"], detected=True)
         else:
             print(f"   ℹ️  OS already set: {meta['os']}")
-    else:
-        meta["os"] = ""  # Not applicable for other platforms
+            ckpt.save("os", os=meta["os"], detected=False)
+
+    # 5. Fetch room icon into the staging folder
+    with span("05 Room icon"):
+        saved = ckpt.get("icon")
+        if ckpt.done("icon") and Checkpoint.assets_intact(ckpt.assets, saved["assets"]):
+            icon_filename = saved["icon_filename"]
+            print(f"   ♻️  Icon from checkpoint: {icon_filename or 'none'}")
+        else:
+            icon_filename = fetch_room_icon(meta.get("icon_url", ""), meta["url"], ckpt.assets, meta["room_name"], platform)
+            ckpt.save("icon", icon_filename=icon_filename,
+                      assets=Checkpoint.hash_assets(ckpt.assets, [icon_filename] if icon_filename else []))
+        meta["icon_filename"] = icon_filename  # store for gitbook branch update
+
+    # 6. Screenshots — downloads started in step 1 land in the staging folder
+    with span("06 Screenshots"):
+        saved = ckpt.get("screenshots")
+        if not downloads:
+            saved_screenshots = saved["saved"]
+            print(f"   ♻️  {len(saved_screenshots)} screenshot(s) from checkpoint")
+        else:
+            saved_screenshots = []
+            if image_urls:
+                print(f"   → Waiting for {len(image_urls)} screenshot download(s) started while reading notes...")
+                saved_screenshots = download_screenshots(downloads)
+            ckpt.save("screenshots", saved=saved_screenshots,
+                      assets=Checkpoint.hash_assets(ckpt.assets, saved_screenshots))
+
+    # Nothing the writeup is made from changed since the last publish → its writeup and tags are reused
+    prompt    = system_prompt_version(meta.get("platform", ""), meta.get("room_type", ""))
+    inputs    = format_inputs(meta, raw_notes, room_info, prompt)
+    published = "" if ckpt.done("format") else published_writeup(meta["page_id"], inputs)
+
+    # 7. Generate topic tags and build canonical tags cell (used everywhere)
+    with span("07 Topic tags"):
+        if ckpt.done("tags"):
+            topic_tags = ckpt.get("tags")["topic_tags"]
+        elif published:
+            topic_tags = published_topic_tags(published, meta)
+            ckpt.save("tags", topic_tags=topic_tags)
+        else:
+            topic_tags = suggest_topic_tags(prompt_notes, room_info, meta["room_name"], meta["page_id"])
+            ckpt.save("tags", topic_tags=topic_tags)
+        meta["topic_tags"] = topic_tags  # store for metadata block
+        meta["tags_cell"] = build_tags_cell(meta, topic_tags)  # canonical cell string
+        print(f"   ✅ Tags cell: {meta['tags_cell']}")
+
+    # 8. Format with Claude — or reuse the published writeup when nothing it was formatted from changed
+    with span("08 Format writeup"):
+        if ckpt.done("format"):
+            saved     = ckpt.get("format")
+            formatted = saved["formatted"]
+            prompt    = saved.get("prompt", "")
+            inputs    = saved.get("inputs", "")
+            reused    = saved.get("reused", False)
+            print("   ♻️  Formatted writeup from checkpoint")
+        else:
+            formatted = published
+            reused    = bool(published)
+            if reused:
+                print("   ♻️  Nothing changed since the last publish — reusing the published writeup")
+            else:
+                formatted = format_with_claude(prompt_notes, room_info, meta, saved_screenshots, icon_filename)
+            ckpt.save("format", formatted=formatted, prompt=prompt, inputs=inputs, reused=reused)
+
+    return {
+        "meta":        meta,
+        "checkpoint":  ckpt,
+        "platform":    platform,
+        "raw_notes":   raw_notes,
+        "screenshots": saved_screenshots,
+        "topic_tags":  topic_tags,
+        "formatted":   formatted,
+        "prompt":      prompt,
+        "inputs":      inputs,
+        "reused":      reused,
+    }
+
 
-    # 5. Create destination folder (now OS-aware)
+def prepare_queue(pages: list) -> list:
+    """Prepare upcoming pages ahead of their publish day so each daily run only has to publish.
+    Returns the pages that could not be prepared."""
+    pending = [(page, ckpt) for page in pages[:PREPARE_AHEAD]
+               for ckpt in [open_checkpoint(page)] if not ckpt.prepared]
+    failed  = []
+    if not pending:
+        return failed
+    print(f"\n📦 Preparing {len(pending)} queued writeup(s) ahead of publishing...")
+    for page, ckpt in pending:
+        with span(f"Prepare {page['id'][:8]}"):
+            try:
+                print(f"\n{'='*50}")
+                bundle = prepare_page(page, ckpt)
+                print(f"📦 Ready to publish: {bundle['meta']['room_name']}")
+            except Exception as e:
+                print(f"   ⚠️  Could not prepare page {page['id']}: {e}")
+                failed.append(page)
+    return failed
+
+
+def process_page(page: dict):
+    ckpt = open_checkpoint(page)
+    meta = get_page_properties(page)
+    print(f"\n{'='*50}")
+    print(f"📝 Processing: {meta['room_name']}")
+    print(f"   Platform: {meta['platform']} | Difficulty: {meta['difficulty']} | Type: {meta['room_type'] or 'Not set'} | OS: {meta['os'] or 'Not set'}")
+    if ckpt.prepared and not ckpt.publishing:
+        print("   📦 Publishing prepared bundle")
+    elif ckpt.resuming:
+        print(f"   ♻️  Resuming from checkpoint — {len(ckpt.stages)} stage(s) already complete")
+
+    bundle            = prepare_page(page, ckpt)
+    meta              = bundle["meta"]
+    platform          = bundle["platform"]
+    raw_notes         = bundle["raw_notes"]
+    saved_screenshots = bundle["screenshots"]
+    topic_tags        = bundle["topic_tags"]
+    formatted         = bundle["formatted"]
+    prompt            = bundle["prompt"]
+    icon_filename     = meta["icon_filename"]
+    # A reused writeup keeps the date it was published with, so every output comes out unchanged
+    kept_date         = PUBLISHED_DATE_RE.search(formatted) if bundle["reused"] else None
+
+    # 9. Publish date; detected category and OS are queued for the single Notion write at step 18
+    with span("09 Notion properties"):
+        if ckpt.done("publish"):
+            meta["date"] = ckpt.get("publish")["date"]
+            pending      = pending_update(meta["page_id"], ckpt)
+        else:
+            meta["date"] = kept_date.group(1) if kept_date else now().strftime("%b %d, %Y")
+            pending      = PageUpdate(meta["page_id"])
+            if ckpt.get("category").get("detected"):
+                pending.set_select("Category", meta["room_type"])
+            if ckpt.get("os").get("detected"):
+                pending.set_select("OS", meta["os"])
+            ckpt.save("publish", date=meta["date"], pending=pending.to_dict())
+        # Bundles prepared on an earlier day carry that day's date in the metadata block
+        prepared_date = ckpt.get("notes")["date"]
+        if prepared_date != meta["date"] and not kept_date:
+            formatted = formatted.replace(f"<b>Date:</b> {prepared_date}<br>", f"<b>Date:</b> {meta['date']}<br>", 1)
+
+    # Create destination folder (now OS-aware) and move staged assets in
     dest_folder = get_destination_folder(meta)
     dest_folder.mkdir(parents=True, exist_ok=True)
+    for name in ([icon_filename] if icon_filename else []) + saved_screenshots:
+        if (ckpt.assets / name).exists():
+            shutil.copy2(ckpt.assets / name, dest_folder / name)
 
     difficulty   = DIFFICULTY_FOLDERS.get(meta["difficulty"].lower(), meta["difficulty"])
     platform_dir = WRITEUPS_PATH / platform
@@ -1586,74 +2176,122 @@ def process_page(page: dict):
     else:
         os_dir = None
 
-    # 6. Fetch room icon
-    icon_filename = fetch_room_icon(meta.get("icon_url", ""), meta["url"], dest_folder, meta["room_name"])
-    meta["icon_filename"] = icon_filename  # store for gitbook branch update
-
-    # 7. Download screenshots
-    saved_screenshots = []
-    if image_urls:
-        print(f"   → Downloading {len(image_urls)} screenshot(s)...")
-        saved_screenshots = download_screenshots(image_urls, dest_folder)
-
-    # 8. Generate topic tags and build canonical tags cell (used everywhere)
-    topic_tags = suggest_topic_tags(raw_notes, room_info, meta["room_name"])
-    meta["topic_tags"] = topic_tags  # store for metadata block
-    meta["tags_cell"] = build_tags_cell(meta, topic_tags)  # canonical cell string
-    print(f"   ✅ Tags cell: {meta['tags_cell']}")
-
-    # 9. Format with Claude
-    formatted = format_with_claude(raw_notes, room_info, meta, saved_screenshots, icon_filename)
-
-    # 10. Save markdown to GitHub
-    room_clean  = re.sub(r'[^\w\-]', '', meta["room_name"].replace(" ", "-"))
-    output_file = dest_folder / f"{room_clean}.md"
-    gif_footer = "\n\n---\n\n<p align=\"center\"><img src=\"https://media2.giphy.com/media/v1.Y2lkPTc5MGI3NjExaDdhdmt6N2dhazFqbTdsdmk0ZThkdTBrYjBoOGdobWF2NzRmbXBjeCZlcD12MV9pbnRlcm5hbF9naWZfYnlfaWQmY3Q9Zw/8kDPdrfdBUP8k/giphy.gif\" width=\"300\"></p>\n"
-    output_file.write_text(formatted + gif_footer, encoding="utf-8")
-    print(f"   ✅ Writeup saved: {output_file}")
-
-    # 11. Update difficulty README table
-    update_difficulty_readme(diff_dir, platform, difficulty, meta, icon_filename, topic_tags)
-
-    # 12. Update OS README table (HTB/THM only)
-    if os_dir:
-        update_os_readme(os_dir, platform, difficulty, os_name, meta, icon_filename, topic_tags)
-
-    # 13. Update platform README with type section
-    update_platform_readme(platform_dir, platform, meta, icon_filename, topic_tags)
-
-    # 14. Write formatted content back to Notion
-    try:
-        write_back_to_notion(meta["page_id"], formatted, raw_notes)
-    except Exception as e:
-        print(f"   ⚠️  Notion write-back failed: {e}")
-
-    # 15. Set Notion page icon
+    # 10. Save markdown to GitHub — skipped when the file in the repo is already byte-identical
+    with span("10 Save markdown"):
+        room_clean  = re.sub(r'[^\w\-]', '', meta["room_name"].replace(" ", "-"))
+        output_file = dest_folder / f"{room_clean}.md"
+        writeup_changed = write_if_changed(output_file, formatted + GIF_FOOTER)
+        if writeup_changed:
+            print(f"   ✅ Writeup saved: {output_file}")
+        else:
+            print(f"   ⏭️  Writeup unchanged: {output_file}")
+        writeup_path = output_file.relative_to(CTFHUB_REPO_PATH).as_posix()
+        # Committed with the writeup at step 16 — `reformat` refreshes it when the prompt changes
+        if prompt and PROMPT_INDEX.get(writeup_path) != prompt:
+            PROMPT_INDEX.put(writeup_path, prompt)
+            PROMPT_INDEX.save()
+
+    # Everything the README rows are built from — same fingerprint, same rows
+    rows_fingerprint = "\n".join([writeup_path, meta["room_name"], meta["difficulty"], os_name, room_type,
+                                   meta["tags_cell"], meta["date"], icon_filename or ""])
+
+    # 11–13. README tables — rows are replaced in place, so re-running after a resume is harmless
+    if not ckpt.done("readmes"):
+        if LEDGER.output_unchanged(meta["page_id"], "readmes", rows_fingerprint) and not writeup_changed:
+            print("   ⏭️  README rows unchanged since the last publish")
+        else:
+            # 11. Update difficulty README table
+            with span("11 Difficulty README"):
+                update_difficulty_readme(diff_dir, platform, difficulty, meta, icon_filename, topic_tags)
+
+            # 12. Update OS README table (HTB/THM only)
+            with span("12 OS README"):
+                if os_dir:
+                    update_os_readme(os_dir, platform, difficulty, os_name, meta, icon_filename, topic_tags)
+
+            # 13. Update platform README with type section
+            with span("13 Platform README"):
+                update_platform_readme(platform_dir, platform, meta, icon_filename, topic_tags)
+            LEDGER.record_output(meta["page_id"], "readmes", rows_fingerprint, when=now())
+        ckpt.save("readmes")
+
+    # Refresh the search index — only writeups whose content hash changed are reindexed
+    with span("13 Search index"):
+        update_search_index()
+
+    # 14. Write formatted content back to Notion — unless the page already holds exactly these blocks
+    with span("14 Notion write-back"):
+        if not ckpt.done("notion_body"):
+            blocks      = notion_body_blocks(formatted, raw_notes)
+            fingerprint = json.dumps(blocks, sort_keys=True, ensure_ascii=False)
+            if LEDGER.output_unchanged(meta["page_id"], "notion_body", fingerprint):
+                print("   ⏭️  Notion body unchanged since the last publish — not rewritten")
+            else:
+                try:
+                    write_back_to_notion(meta["page_id"], blocks)
+                except Exception as e:
+                    raise RuntimeError(f"Notion write-back failed: {e} — next run resumes from this step") from e
+                LEDGER.record_output(meta["page_id"], "notion_body", fingerprint, when=now())
+            ckpt.save("notion_body")
+
+    # 15. Queue the Notion page icon
     if icon_filename and meta.get("icon_url"):
-        set_notion_page_icon(meta["page_id"], meta["icon_url"])
-
-    # 16. Update main README stats then commit + push
-    update_main_readme_stats()
-    git_commit_push(meta["room_name"], meta["platform"])
-
-    # 17. Update gitbook branch with new writeup files + SUMMARY + READMEs
-    update_gitbook_branch(meta)
-
-    # 18. Mark as published
-    try:
-        mark_as_published(meta["page_id"])
-    except Exception as e:
-        print(f"   ⚠️  Could not mark as Published: {e}")
+        pending.set_icon(meta["icon_url"])
+
+    # 16. Update main README stats then commit + push — a byte-identical writeup is not recorded again
+    with span("16 Commit and push"):
+        if not ckpt.done("push"):
+            update_main_readme_stats()
+            if not git_commit_push(meta["room_name"], meta["platform"]):
+                raise RuntimeError("Git push failed — next run resumes from this step")
+            content = output_file.read_text(encoding="utf-8")
+            if LEDGER.needs_republish(writeup_path, content):
+                LEDGER.record(
+                    room_name=meta["room_name"], platform=platform, difficulty=difficulty, page_id=meta["page_id"],
+                    path=writeup_path, content=content, commit_sha=git_head(), when=now(),
+                )
+            if bundle["inputs"]:
+                LEDGER.record_output(meta["page_id"], "format_inputs", bundle["inputs"], when=now())
+            ckpt.save("push")
+
+    # 17. Update gitbook branch with new writeup files + SUMMARY + READMEs — skipped if the
+    # SUMMARY entry, writeup and rows all match what was last synced
+    with span("17 GitBook branch"):
+        gitbook_fingerprint = rows_fingerprint + "\n" + formatted
+        if not ckpt.done("gitbook"):
+            if LEDGER.output_unchanged(meta["page_id"], "gitbook", gitbook_fingerprint):
+                print("   ⏭️  GitBook entry unchanged since the last publish")
+                ckpt.save("gitbook")
+            elif update_gitbook_branch(meta):
+                LEDGER.record_output(meta["page_id"], "gitbook", gitbook_fingerprint, when=now())
+                ckpt.save("gitbook")
+
+    # 18. One Notion write: queued properties + icon + Published — then the checkpoint has served its purpose
+    with span("18 Mark published"):
+        if commit_page_update(page, pending):
+            ckpt.clear()
 
     print(f"🎉 Done: {meta['room_name']}\n")
 
 
-LAST_PUBLISHED_FILE = Path(CTFHUB_REPO_PATH) / "scripts" / ".last_published"
-
-
 def already_published_today() -> bool:
-    """Check Notion for any writeup published today — survives fresh CI checkouts."""
-    today = datetime.now().strftime("%Y-%m-%d")
+    """Ledger lookup. A runner without a ledger rebuilds it from git history first and,
+    since a shallow checkout may hide today's commit, confirms with Notion that one time.
+    A cassette run only asks Notion — git history is not part of the recording."""
+    today   = now().strftime("%Y-%m-%d")
+    rebuilt = LEDGER.empty
+    if rebuilt and not CASSETTE:
+        added = LEDGER.backfill_from_git(Path(CTFHUB_REPO_PATH))
+        print(f"   📒 Publish ledger rebuilt from git history — {added} publish(es)")
+    count = LEDGER.published_on(today)
+    if count:
+        print(f"   📅 Ledger: {count} writeup(s) already published today")
+        return True
+    return rebuilt and notion_published_today(today)
+
+
+@traced("notion")
+def notion_published_today(today: str) -> bool:
     try:
         response = notion.databases.query(
             database_id=NOTION_DATABASE_ID,
@@ -1670,46 +2308,434 @@ def already_published_today() -> bool:
             return True
     except Exception as e:
         print(f"   ⚠️  Could not check Notion for today's publishes: {e}")
-        # Fall back to local file
-        if LAST_PUBLISHED_FILE.exists():
-            last = LAST_PUBLISHED_FILE.read_text(encoding="utf-8").strip()
-            return last == today
     return False
 
 
-def mark_published_today():
-    LAST_PUBLISHED_FILE.write_text(datetime.now().strftime("%Y-%m-%d"), encoding="utf-8")
+def published_unmarked(page: dict):
+    """Ledger row for a page that was pushed but never marked Published in Notion, else None.
+    A page edited after its publish (e.g. Published unticked to republish) is not a duplicate."""
+    row = LEDGER.latest(page_id=page["id"])
+    if row is None:
+        return None
+    edited = page.get("last_edited_time", "")
+    if edited:
+        edited_local = datetime.fromisoformat(edited.replace("Z", "+00:00")).astimezone().replace(tzinfo=None)
+        if edited_local > datetime.fromisoformat(row["published_at"]):
+            return None
+    return row
+
+
+def publish_next(pages: list) -> tuple:
+    """Publish the first queued page. One that was already pushed but never marked Published is
+    marked instead and the next page published. Returns (page attempted or None, whether it published)."""
+    page = pages[0]
+    duplicate = published_unmarked(page)
+    if duplicate:
+        print(f"   📒 {duplicate['room_name']} was already published at {duplicate['commit_sha'][:7]} "
+              f"on {duplicate['published_on']} — marking Published instead of republishing")
+        ckpt = open_checkpoint(page)
+        if commit_page_update(page, pending_update(page["id"], ckpt)):
+            ckpt.clear()
+        if len(pages) == 1:
+            return None, False
+        page = pages[1]
+    try:
+        process_page(page)
+        return page, True
+    except Exception as e:
+        print(f"❌ Error processing page: {e}")
+        import traceback
+        traceback.print_exc()
+        return page, False
 
 
 def main():
     print("\n🚀 CTF Auto Publisher starting...")
     pages = query_completed_unpublished()
 
+    # Checkpoints only matter for pages still waiting to publish
+    pruned = prune_checkpoints(state_dir("checkpoints"), {p["id"] for p in pages})
+    if pruned:
+        print(f"   🧹 Removed {pruned} stale checkpoint(s)")
+    evict_notes_cache()
+
     if not pages:
         print("✅ Nothing to process — all caught up!")
         return
 
     if already_published_today():
         print(f"📅 Already published a writeup today — {len(pages)} writeup(s) queued for tomorrow onwards")
+        prepare_queue(pages)
         return
 
     if len(pages) > 1:
         print(f"   📬 {len(pages)} writeups queued — publishing 1 today, rest will drip out one per day")
 
-    page = pages[0]
-    try:
-        process_page(page)
-        mark_published_today()
-    except Exception as e:
-        print(f"❌ Error processing page: {e}")
-        import traceback
-        traceback.print_exc()
+    page, _ = publish_next(pages)
+    if page is None:
+        return
+    pages = pages[pages.index(page):]
 
     if len(pages) > 1:
         print(f"\n📅 {len(pages) - 1} writeup(s) remaining — next one publishes tomorrow")
+        prepare_queue(pages[1:])
 
+    for summary in (page_update_summary(), CLAUDE_GOVERNOR.summary()):
+        if summary:
+            print(f"\n🔗 {summary}")
     print("\n✅ All done!")
 
 
+# ─────────────────────────────────────────────
+# WATCH MODE
+# ─────────────────────────────────────────────
+
+WATCH_INTERVAL = int(os.environ.get("CTF_WATCH_INTERVAL", "60"))   # seconds between polls
+
+
+def watch_tick(watcher: NotionWatcher, status: dict) -> bool:
+    """One poll: publish the head of the queue if today's slot is still free, then prepare whatever
+    changed. Returns True if there was anything to do."""
+    changed = watcher.poll()
+    today   = now().strftime("%Y-%m-%d")
+    queue   = [p for p in watcher.pages() if status["failed"].get(p["id"]) != p.get("last_edited_time")]
+    status["last_poll"] = now().isoformat(timespec="seconds")
+    status["queue"]     = [get_page_properties(p)["room_name"] for p in watcher.pages()]
+    if changed:
+        print(f"\n🔔 {len(changed)} page(s) changed — {len(queue)} writeup(s) queued")
+        pruned = prune_checkpoints(state_dir("checkpoints"), {p["id"] for p in watcher.pages()})
+        if pruned:
+            print(f"   🧹 Removed {pruned} stale checkpoint(s)")
+        evict_notes_cache()
+    if not queue:
+        return bool(changed)
+
+    published = False
+    if status["published_on"] != today:
+        if already_published_today():
+            status["published_on"] = today
+        else:
+            page, ok = publish_next(queue)
+            published = page is not None
+            if ok:
+                status["published_on"] = today
+                watcher.drop(page["id"])
+            elif page is not None:
+                # Retried once the page is edited again, not on every poll
+                status["failed"][page["id"]] = page.get("last_edited_time", "")
+            queue = [p for p in queue if p is not page]
+
+    # A page marked Completed is prepared straight away, not only when it reaches the head of the queue.
+    # One that failed is retried once the page is edited again — each attempt may be a paid format call
+    ready = [p for p in changed if p in queue] + [p for p in queue if p not in changed]
+    ready = [p for p in ready if status["prepare_failed"].get(p["id"]) != p.get("last_edited_time")]
+    for page in prepare_queue(ready) if ready else []:
+        status["prepare_failed"][page["id"]] = page.get("last_edited_time", "")
+    return bool(changed) or published
+
+
+def watch(interval: int = WATCH_INTERVAL, port: int = 0):
+    """Long-running publisher: clients, indexes and the queue stay warm between polls, and a page
+    marked Completed is picked up within one interval (or at once via POST /notify)."""
+    print(f"\n👀 CTF Auto Publisher watching Notion every {interval}s — Ctrl+C to stop")
+    watcher = NotionWatcher(query_database)
+    wake    = threading.Event()
+    status  = {"queue": [], "published_on": "", "last_poll": "", "failed": {}, "prepare_failed": {}}
+    server  = None
+    if port:
+        server = WebhookServer(port, wake, lambda: {k: v for k, v in status.items() if k not in ("failed", "prepare_failed")})
+        server.start()
+        print(f"   🔔 Webhook listening on http://127.0.0.1:{server.port}/notify")
+    try:
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    except ValueError:  # not the main thread
+        pass
+
+    try:
+        while True:
+            tracing.start_run()
+            try:
+                busy = watch_tick(watcher, status)
+            except Exception as e:
+                busy = True
+                print(f"   ⚠️  Watch poll failed: {e}")
+            if busy:
+                CLAUDE_GOVERNOR.save()
+                trace_dir = os.environ.get("CTF_TRACE_DIR")
+                tracing.finish_run(Path(trace_dir) if trace_dir else state_dir("trace"))
+            wake.wait(interval)
+            wake.clear()
+    except KeyboardInterrupt:
+        print("\n👋 Watch stopped")
+    finally:
+        if server:
+            server.stop()
+        CLAUDE_GOVERNOR.save()
+
+
+# ─────────────────────────────────────────────
+# BULK RE-FORMAT
+# ─────────────────────────────────────────────
+
+REFORMAT_BATCH = 10      # writeups per commit
+
+RESTYLE_PROMPT = """Restyle this published writeup for: "{room_name}"
+
+It was formatted with an older version of your instructions. Rewrite it to follow the structure
+defined in the system prompt. Keep every fact, command, output, flag and image reference exactly —
+do not invent steps or drop any. Use this metadata block exactly at the top:
+{metadata_block}
+
+---
+PUBLISHED WRITEUP:
+{body}
+---
+
+Return ONLY the formatted markdown. Nothing else."""
+
+
+def split_metadata_block(text: str) -> tuple:
+    """(metadata block up to its closing ---, body) of a published writeup; ("", text) if it has none."""
+    close = text.find("</p>")
+    rule  = text.find("\n---", close) if close >= 0 else -1
+    if not text.startswith("<p align=\"right\">") or rule < 0:
+        return "", text
+    return text[:rule + 4], text[rule + 4:]
+
+
+def writeup_room_type(room: dict) -> str:
+    """Category of a writeup on disk: its HTB type folder, else the category tag in its metadata block."""
+    categories = {c.lower(): c for c in classifier.CATEGORIES}
+    tags = [t.lstrip("#").lower() for t in room["meta"].get("tags", "").split()]
+    return room["room_type"] or next((categories[t] for t in tags if t in categories), "")
+
+
+def stale_writeups() -> list:
+    """Every writeup whose recorded prompt version is not the current one for its platform and type."""
+    import generate_readmes
+    stale = []
+    for platform_dir in sorted(p for p in WRITEUPS_PATH.iterdir() if p.is_dir() and p.name in generate_readmes.PLATFORMS):
+        for room in generate_readmes.find_rooms(platform_dir):
+            md        = room["folder"] / f"{room['folder'].name}.md"
+            rel       = md.relative_to(CTFHUB_REPO_PATH).as_posix()
+            room_type = writeup_room_type(room)
+            current   = system_prompt_version(platform_dir.name, room_type)
+            if PROMPT_INDEX.stale(rel, current):
+                stale.append({"md": md, "path": rel, "platform": platform_dir.name, "room_type": room_type,
+                              "name": room["meta"]["name"] or room["folder"].name.replace("-", " "),
+                              "version": current})
+    return stale
+
+
+@traced("claude")
+def restyle_writeup(writeup: dict) -> str:
+    """The writeup re-formatted under the current system prompt, metadata block kept verbatim.
+    Replies are cached by prompt version + source hash, so a rerun after a failed batch is free."""
+    text    = writeup["md"].read_text(encoding="utf-8")
+    version = writeup["version"]
+    metadata_block, body = split_metadata_block(text.removesuffix(GIF_FOOTER))
+    if not metadata_block:
+        raise ValueError("no metadata block")
+    cache = state_dir("reformat") / f"{content_hash(version + text)[:24]}.md"
+    if cache.exists():
+        return cache.read_text(encoding="utf-8")
+
+    reply = claude_complete(get_system_prompt(writeup["platform"], writeup["room_type"]),
+                            RESTYLE_PROMPT.format(room_name=writeup["name"], metadata_block=metadata_block,
+                                                  body=body.strip()))
+    # Whatever Claude made of the metadata block, the published one is put back unchanged
+    _, new_body = split_metadata_block(reply.strip())
+    missing = set(re.findall(r"screenshot_\d+\.\w+", body)) - set(re.findall(r"screenshot_\d+\.\w+", new_body))
+    if missing:
+        raise ValueError(f"dropped image reference(s): {', '.join(sorted(missing))}")
+    restyled = metadata_block + new_body.rstrip() + GIF_FOOTER
+    cache.write_text(restyled, encoding="utf-8")
+    # A batch that failed to commit leaves the restyled file on disk — retrying it must not call Claude again
+    (state_dir("reformat") / f"{content_hash(version + restyled)[:24]}.md").write_text(restyled, encoding="utf-8")
+    return restyled
+
+
+@traced("git")
+def git_commit_paths(paths: list, message: str) -> bool:
+    """Commit just these paths (not the whole tree) and push."""
+    try:
+        subprocess.run(["git", "add", "--", *paths], cwd=CTFHUB_REPO_PATH, check=True, capture_output=True)
+        result = subprocess.run(["git", "commit", "-m", message, "--", *paths],
+                                cwd=CTFHUB_REPO_PATH, capture_output=True, text=True)
+        if "nothing to commit" in result.stdout:
+            print("   ℹ️  Nothing new to commit")
+            return True
+        if result.returncode != 0:
+            print(f"   ⚠️  Git commit failed: {(result.stderr or result.stdout).strip()}")
+            return False
+        if git_remote_enabled():
+            subprocess.run(["git", "pull", "--rebase", "origin", "main"], cwd=CTFHUB_REPO_PATH, check=True, capture_output=True)
+            subprocess.run(["git", "push"], cwd=CTFHUB_REPO_PATH, check=True, capture_output=True)
+        print(f"   ✅ Committed: {message}")
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"   ⚠️  Git error: {e.stderr}")
+        return False
+
+
+def reformat_writeups(dry_run: bool = False, limit: int = 0, batch: int = REFORMAT_BATCH) -> int:
+    """Re-format every writeup whose system prompt changed since it was formatted, FORMAT_PARALLEL at a
+    time through the Claude governor, committing each batch. Returns the number of writeups refreshed."""
+    stale = stale_writeups()
+    print(f"🎨 {len(stale)} writeup(s) formatted with an older system prompt")
+    for writeup in stale:
+        print(f"   {writeup['path']}  {PROMPT_INDEX.get(writeup['path']) or 'unknown'} → {writeup['version']}")
+    if dry_run or not stale:
+        return 0
+    stale = stale[:limit] if limit else stale
+
+    refreshed = 0
+    with ThreadPoolExecutor(max_workers=FORMAT_PARALLEL) as pool:
+        for start in range(0, len(stale), batch):
+            chunk   = stale[start:start + batch]
+            before  = PROMPT_INDEX.snapshot([writeup["path"] for writeup in chunk])
+            futures = [pool.submit(restyle_writeup, writeup) for writeup in chunk]
+            done    = []
+            for writeup, future in zip(chunk, futures):
+                try:
+                    write_if_changed(writeup["md"], future.result())
+                except Exception as e:
+                    print(f"   ⚠️  {writeup['path']}: {e} — left as it was")
+                    continue
+                PROMPT_INDEX.put(writeup["path"], writeup["version"], source="reformat")
+                done.append(writeup["path"])
+            if not done:
+                continue
+            PROMPT_INDEX.save()
+            update_search_index()
+            paths = done + ["scripts/prompt_versions.json", "scripts/search_index.json.gz", "writeups/.search"]
+            if not git_commit_paths([p for p in paths if (Path(CTFHUB_REPO_PATH) / p).exists()],
+                                    f"reformat: Restyle {len(done)} writeup(s) with the current prompts"):
+                # The batch stays stale so the next run retries it
+                PROMPT_INDEX.restore(before)
+                PROMPT_INDEX.save()
+                sys.exit("❌ Could not commit the re-formatted batch — rerun to retry (replies are cached)")
+            refreshed += len(done)
+            print(f"   🎨 {refreshed}/{len(stale)} writeup(s) re-formatted")
+    return refreshed
+
+
+@traced("git")
+def sync_gitbook(dry_run: bool = False) -> int:
+    """Copy writeup files (not READMEs) that are new or changed on main onto the gitbook branch,
+    via a temporary index and commit-tree — neither branch is checked out."""
+    try:
+        synced = gitbook_sync.sync_writeups(Path(CTFHUB_REPO_PATH), push=git_remote_enabled(), dry_run=dry_run)
+    except gitbook_sync.SyncError as e:
+        sys.exit(f"❌ GitBook sync failed: {e}")
+    for path in synced:
+        print(f"   {'would sync' if dry_run else 'synced'}: {path}")
+    print(f"✅ {len(synced)} writeup file(s) {'to sync' if dry_run else 'synced'} to gitbook")
+    return len(synced)
+
+
+# ─────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────
+
+def cmd_publish(args):
+    # A replay never builds a real client
+    missing = [] if CASSETTE and CASSETTE.replaying else [name for name in PUBLISH_SECRETS if not os.environ.get(name)]
+    if missing:
+        sys.exit(f"❌ publish needs {', '.join(missing)}")
+    tracing.start_run()
+    try:
+        main()
+    finally:
+        if CASSETTE:
+            CASSETTE.save()
+        CLAUDE_GOVERNOR.save()
+        trace_dir = os.environ.get("CTF_TRACE_DIR")
+        tracing.finish_run(Path(trace_dir) if trace_dir else state_dir("trace"))
+
+
+def cmd_watch(args):
+    missing = [name for name in PUBLISH_SECRETS if not os.environ.get(name)]
+    if missing:
+        sys.exit(f"❌ watch needs {', '.join(missing)}")
+    watch(interval=args.interval, port=args.port)
+
+
+def cmd_restats(args):
+    update_main_readme_stats()
+
+
+def cmd_rebuild_readmes(args):
+    import generate_readmes
+    generate_readmes.rebuild_all(dry_run=args.dry_run, root=WRITEUPS_PATH)
+
+
+def cmd_sync_gitbook(args):
+    sync_gitbook(dry_run=args.dry_run)
+
+
+def cmd_reformat(args):
+    if not args.dry_run and not os.environ.get("ANTHROPIC_API_KEY"):
+        sys.exit("❌ reformat needs ANTHROPIC_API_KEY")
+    try:
+        reformat_writeups(dry_run=args.dry_run, limit=args.limit, batch=args.batch)
+    finally:
+        CLAUDE_GOVERNOR.save()
+        summary = CLAUDE_GOVERNOR.summary()
+        if summary:
+            print(f"\n🔗 {summary}")
+
+
+def cmd_check_links(args):
+    result = validate_links.validate(Path(CTFHUB_REPO_PATH), None if args.no_cache else state_dir() / "links.json")
+    print(validate_links.report(result))
+    if result["broken"]:
+        sys.exit(1)
+
+
+def cmd_classifier(args):
+    print(f"Local classifier — threshold {CLASSIFIER.threshold:.0%}, audit rate {CLASSIFIER.audit:.0%}\n")
+    print(classifier.report(CLASSIFIER.log_file))
+
+
+def cmd_bench(args):
+    import benchmarks
+    benchmarks.main(args.names)
+
+
+COMMANDS = {
+    "publish":         (cmd_publish,         "publish the next queued writeup (default)"),
+    "watch":           (cmd_watch,           "keep running: poll Notion for changes and publish one writeup per day"),
+    "restats":         (cmd_restats,         "recount writeups and refresh the main README stats table"),
+    "rebuild-readmes": (cmd_rebuild_readmes, "rebuild every README table from the writeup folders"),
+    "sync-gitbook":    (cmd_sync_gitbook,    "copy new/changed writeup files from main to the gitbook branch"),
+    "reformat":        (cmd_reformat,        "re-format writeups whose system prompt changed since they were formatted"),
+    "check-links":     (cmd_check_links,     "check relative links and images in writeups, READMEs and SUMMARY.md"),
+    "classifier":      (cmd_classifier,      "local classifier hit rate and accuracy from the decision log"),
+    "bench":           (cmd_bench,           "run the micro-benchmarks"),
+}
+
+
+def cli(argv: list = None):
+    parser = argparse.ArgumentParser(prog="ctf_auto.py", description="CTF-Hub writeup publisher")
+    sub    = parser.add_subparsers(dest="command")
+    for name, (_, help_text) in COMMANDS.items():
+        cmd = sub.add_parser(name, help=help_text)
+        if name in ("rebuild-readmes", "sync-gitbook", "reformat"):
+            cmd.add_argument("--dry-run", action="store_true", help="list changes without writing")
+        if name == "reformat":
+            cmd.add_argument("--limit", type=int, default=0, help="re-format at most this many writeups")
+            cmd.add_argument("--batch", type=int, default=REFORMAT_BATCH, help="writeups per commit")
+        elif name == "watch":
+            cmd.add_argument("--interval", type=int, default=WATCH_INTERVAL, help="seconds between Notion polls")
+            cmd.add_argument("--port", type=int, default=0, help="serve POST /notify and GET /status on this localhost port")
+        elif name == "check-links":
+            cmd.add_argument("--no-cache", action="store_true", help="re-parse every file")
+        elif name == "bench":
+            cmd.add_argument("names", nargs="*", help="benchmarks to run (default: all)")
+    args = parser.parse_args(argv)
+    COMMANDS[args.command or "publish"][0](args)
+
+
 if __name__ == "__main__":
-    main()
+    cli()
@@ -1,9 +1,20 @@
 """
 Generate README.md files for all platform and difficulty folders in CTF-Hub.
-Run once locally: python generate_readmes.py
+
+  python generate_readmes.py                     create any missing platform/difficulty READMEs
+  python generate_readmes.py --rebuild           rebuild every writeup table from the folders on disk
+  python generate_readmes.py --rebuild --dry-run list the READMEs a rebuild would change
+
+Rebuild keeps everything outside the writeup tables, reuses the tags/date cells of
+rows that already exist and only writes files whose content hash changed.
 """
 
+import re
+import sys
+import hashlib
 from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # ─────────────────────────────────────────────
 # PLATFORM CONFIGS
@@ -148,6 +159,7 @@ def difficulty_readme(platform: str, difficulty: str, config: dict) -> str:
 # ─────────────────────────────────────────────
 
 def generate_all():
+    """Scaffold platform/difficulty folders. Existing READMEs are left alone — use rebuild_all to refresh tables."""
     created = 0
 
     for platform, config in PLATFORMS.items():
@@ -158,9 +170,10 @@ def generate_all():
 
         # Platform README
         platform_readme_path = platform_dir / "README.md"
-        platform_readme_path.write_text(platform_readme(platform, config), encoding="utf-8")
-        print(f"✅ Created {platform}/README.md")
-        created += 1
+        if not platform_readme_path.exists():
+            platform_readme_path.write_text(platform_readme(platform, config), encoding="utf-8")
+            print(f"✅ Created {platform}/README.md")
+            created += 1
 
         # Difficulty folders + READMEs
         for difficulty in config["difficulties"]:
@@ -168,6 +181,8 @@ def generate_all():
             diff_dir.mkdir(exist_ok=True)
 
             diff_readme_path = diff_dir / "README.md"
+            if diff_readme_path.exists():
+                continue
             diff_readme_path.write_text(
                 difficulty_readme(platform, difficulty, config),
                 encoding="utf-8"
@@ -178,5 +193,321 @@ def generate_all():
     print(f"\n🎉 Done — {created} README(s) created")
 
 
+# ─────────────────────────────────────────────
+# REBUILD FROM DISK
+# ─────────────────────────────────────────────
+
+TYPE_FOLDERS     = {"Machines": "Machine", "Sherlocks": "Sherlock", "Challenges": "Challenge"}
+DIFFICULTY_NAMES = {d for config in PLATFORMS.values() for d in config["difficulties"]} | {"Beginner", "Insane"}
+
+PLACEHOLDER  = "*Auto-populated as writeups are added*"
+META_RE      = re.compile(r"<b>([\w ]+):</b>\s*(.*?)\s*(?:<br>|$)", re.MULTILINE)
+ANCHOR_RE    = re.compile(r'<a href="[^"]*">(.*?)</a>')
+IMG_SRC_RE   = re.compile(r'<img src="([^"]+)"')
+LINK_RE      = re.compile(r"\[(.*?)\]\(([^)]+\.md)\)")
+STATS_RE     = re.compile(r"\*\*\d+ (?:rooms? completed|challenges?|labs? completed)[^*]*\*\*")
+IMAGE_EXTS   = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def parse_date(value: str) -> datetime:
+    try:
+        return datetime.strptime(value.strip(), "%b %d, %Y")
+    except ValueError:
+        return datetime.min
+
+
+def read_metadata(md_path: Path) -> dict:
+    """The right-aligned metadata block at the top of a published writeup."""
+    with open(md_path, encoding="utf-8", errors="replace") as f:
+        head = f.read(4096)
+    meta = {key.lower(): value for key, value in META_RE.findall(head.split("</p>", 1)[0])}
+    anchor = ANCHOR_RE.search(meta.get("url", ""))
+    meta["name"] = anchor.group(1) if anchor else ""
+    icon = IMG_SRC_RE.search(meta.get("icon", ""))
+    meta["icon"] = icon.group(1) if icon else ""
+    if not meta["name"]:
+        heading = re.search(r"^# (.+)$", head, re.MULTILINE)
+        meta["name"] = heading.group(1).strip() if heading else ""
+    return meta
+
+
+SEPARATOR_RE = re.compile(r"^\|[\s:|-]+\|$")
+
+
+def split_row(line: str) -> list:
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def row_cells(columns: list, line: str) -> dict:
+    """Map a row's cells to column names. Rows written with the wrong column count
+    (an OS cell in a table without one) only keep the cells that can be recognised."""
+    cells = split_row(line)
+    if len(cells) == len(columns):
+        return dict(zip(columns, cells))
+    found = {"Icon": cells[0]}
+    tags  = [c for c in cells if "`#" in c]
+    if tags:
+        found["Tags"] = tags[0]
+    if parse_date(cells[-1]) != datetime.min:
+        found["Date"] = cells[-1]
+    return found
+
+
+def find_table(lines: list) -> tuple:
+    """(header index, end index) of the writeup table, preferring the All Writeups section."""
+    tables = [i for i, line in enumerate(lines) if line.startswith("| Icon | Room")]
+    if not tables:
+        return -1, -1
+    header = tables[0]
+    for section in ("## All Writeups", "## 🖥️ Machines", "## 📋 Writeups"):
+        start = next((i for i, line in enumerate(lines) if line.strip() == section), -1)
+        after = [i for i in tables if i > start]
+        if start >= 0 and after:
+            header = after[0]
+            break
+    end = header + 1
+    while end < len(lines) and lines[end].startswith("|"):
+        end += 1
+    return header, end
+
+
+def existing_rows(readme: Path) -> dict:
+    """Room folder name → {column: cell} for every row already in a README's writeup table."""
+    if not readme.exists():
+        return {}
+    lines = readme.read_text(encoding="utf-8").split("\n")
+    header, end = find_table(lines)
+    if header < 0:
+        return {}
+    columns = split_row(lines[header])
+    rows    = {}
+    for line in lines[header + 1:end]:
+        link = LINK_RE.search(line)
+        if link:
+            cells = row_cells(columns, line)
+            cells["_name"] = link.group(1)
+            rows[Path(link.group(2)).parent.name] = cells
+    return rows
+
+
+def find_rooms(platform_dir: Path) -> list:
+    """Every writeup folder under a platform: a folder holding <folder>.md."""
+    rooms = []
+    for md in sorted(platform_dir.rglob("*.md")):
+        folder = md.parent
+        if md.stem != folder.name or folder == platform_dir:
+            continue
+        parts      = folder.relative_to(platform_dir).parts[:-1]
+        room_type  = ""
+        if parts and parts[0] in TYPE_FOLDERS:
+            room_type, parts = TYPE_FOLDERS[parts[0]], parts[1:]
+        if not parts or len(parts) > 2:
+            print(f"   ⚠️  Skipping {folder.relative_to(platform_dir.parent)} — not under a difficulty folder")
+            continue
+        meta = read_metadata(md)
+        rooms.append({
+            "folder":     folder,
+            "difficulty": parts[0],
+            "os":         parts[1] if len(parts) > 1 else "",
+            "room_type":  room_type,
+            "meta":       meta,
+        })
+    return rooms
+
+
+def resolve_room(room: dict, known: dict):
+    """Fill name, icon, tags and date — existing README rows first, then the writeup's metadata block."""
+    folder = room["folder"]
+    meta   = room["meta"]
+    seen   = known.get(folder.name, {})
+    room["name"] = seen.get("_name") or meta["name"] or folder.name.replace("-", " ")
+    room["date"] = seen.get("Date") or meta.get("date", "")
+
+    tags = seen.get("Tags") or " ".join(f"`{t}`" for t in meta.get("tags", "").split() if t.startswith("#"))
+    room["tags"] = tags
+    if not room["room_type"]:
+        tag_names = [t.strip("`#") for t in tags.split()]
+        room["room_type"] = next((t.title() for t in tag_names if t.title() in ("Machine", "Sherlock", "Challenge",
+                                  "Walkthrough", "Lab", "Dojo")), "")
+
+    # Icon: the file an existing row / metadata points at, else the publisher's <RoomName>.png convention
+    candidates = [Path(seen.get("Icon", "")).name, Path(meta.get("icon", "")).name]
+    candidates = [c.split('"')[0] for c in candidates if c]
+    candidates += [f"{folder.name.replace('-', '')}{ext}" for ext in IMAGE_EXTS]
+    room["icon"] = next((c for c in candidates if (folder / c).is_file()), "")
+
+
+def render_row(room: dict, columns: list, base: Path, current: dict) -> str:
+    rel   = room["folder"].relative_to(base).as_posix()
+    name  = room["name"]
+    cells = []
+    for column in columns:
+        if column == "Icon":
+            cells.append(f'<img src="{rel}/{room["icon"]}" width="32" alt="{name}">' if room["icon"] else "")
+        elif column == "Room":
+            cells.append(f"[{name}]({rel}/{room['folder'].name}.md)")
+        elif column in current:
+            cells.append(current[column])   # keep hand-curated cells as they are
+        elif column == "Difficulty":
+            cells.append(room["difficulty"])
+        elif column == "OS":
+            cells.append(room["os"] or "N/A")
+        elif column == "Type":
+            cells.append(room["room_type"] or "Machine")
+        elif column == "Tags":
+            cells.append(room["tags"])
+        elif column == "Date":
+            cells.append(room["date"])
+        else:
+            cells.append("")
+    return "| " + " | ".join(cells) + " |"
+
+
+def rebuild_table(content: str, rooms: list, base: Path, default_header: str) -> str:
+    """Replace the writeup table's rows in `content` with rows for `rooms`, leaving everything else untouched."""
+    lines       = content.split("\n")
+    header, end = find_table(lines)
+    if header < 0:
+        if not rooms:
+            return content
+        # No table yet — add one before the footer, as the publisher does
+        footer  = next((i for i in range(len(lines) - 1, -1, -1) if lines[i].startswith("> ")), len(lines))
+        columns = ["Icon", "Room", "Difficulty", "Tags", "Date"]
+        block   = [default_header, "", "| " + " | ".join(columns) + " |",
+                   "|" + "|".join("-" * (len(c) + 2) for c in columns) + "|", "", "---", ""]
+        lines[footer:footer] = block
+        header, end = footer + 2, footer + 4
+
+    columns = split_row(lines[header])
+    current = {}
+    for line in lines[header + 1:end]:
+        link = LINK_RE.search(line)
+        if link:
+            current[Path(link.group(2)).parent.name] = row_cells(columns, line)
+
+    ordered = sorted(rooms, key=lambda r: (parse_date(r["date"]), r["name"].lower()))
+    rows    = [render_row(room, columns, base, current.get(room["folder"].name, {})) for room in ordered]
+    if not rows:
+        rows = ["| " + PLACEHOLDER + " |" + " |" * (len(columns) - 1)]
+    separator = next((l for l in lines[header + 1:end] if SEPARATOR_RE.match(l)),
+                     "|" + "|".join("-" * (len(c) + 2) for c in columns) + "|")
+    lines[header + 1:end] = [separator] + rows
+    return "\n".join(lines)
+
+
+def update_stats(content: str, rooms: list, platform: str) -> str:
+    match = STATS_RE.search(content)
+    if not match:
+        return content
+    total  = len(rooms)
+    latest = max((r["date"] for r in rooms), key=parse_date, default="")
+    latest = latest or match.group(0).rsplit("Last updated", 1)[-1].strip(" *")
+    if platform in ("LetsDefend", "PwnedLabs"):
+        stats = f"**{total} challenge{'s' if total != 1 else ''} completed · Last updated {latest}**"
+    else:
+        stats = (f"**{total} room{'s' if total != 1 else ''} completed · "
+                 f"{total} flag{'s' if total != 1 else ''} captured · Last updated {latest}**")
+    return content[:match.start()] + stats + content[match.end():]
+
+
+def os_readme(platform: str, difficulty: str, os_name: str) -> str:
+    return f"""# {platform} — {difficulty} — {os_name}
+
+{difficulty} difficulty {os_name} machines.
+
+---
+
+## Writeups
+
+| Icon | Room | Difficulty | Tags | Date |
+|------|------|------------|------|------|
+| {PLACEHOLDER} | | | | |
+
+---
+
+> Writeups authored in Notion, auto-published via CTF Publisher.
+"""
+
+
+def readme_targets(platform_dir: Path, platform: str, rooms: list) -> list:
+    """(readme path, rooms it lists, fallback content) for the platform, every difficulty and OS folder."""
+    config  = PLATFORMS.get(platform, {"emoji": "📁", "description": f"{platform} writeups.",
+                                       "difficulties": [], "diff_emoji": {}})
+    targets = {platform_dir: (platform_readme(platform, config), "## All Writeups")}
+    for room in rooms:
+        diff_dir = room["folder"].parent.parent if room["os"] else room["folder"].parent
+        targets.setdefault(diff_dir, (difficulty_readme(platform, room["difficulty"], config),
+                                      f"## {room['difficulty']} Writeups"))
+        if room["os"]:
+            targets.setdefault(room["folder"].parent, (os_readme(platform, room["difficulty"], room["os"]), "## Writeups"))
+    # Difficulty / OS READMEs with no rooms left still get their stale rows cleared
+    for readme in platform_dir.rglob("README.md"):
+        folder = readme.parent
+        if folder not in targets and not (folder / f"{folder.name}.md").exists() \
+                and not any((parent / f"{parent.name}.md").exists() for parent in folder.parents):
+            targets[folder] = (None, "## Writeups")
+    return [
+        (folder / "README.md", [r for r in rooms if folder == platform_dir or folder in r["folder"].parents], template, header)
+        for folder, (template, header) in targets.items()
+    ]
+
+
+def rebuild_readme(readme: Path, rooms: list, template: str, header: str, platform_dir: Path, dry_run: bool) -> bool:
+    """Regenerate one README; returns True if its content changed."""
+    old     = readme.read_text(encoding="utf-8") if readme.exists() else (template or "")
+    content = rebuild_table(old, rooms, readme.parent, header)
+    if readme.parent == platform_dir:
+        content = update_stats(content, rooms, platform_dir.name)
+    if readme.exists() and content_hash(content) == content_hash(old):
+        return False
+    if not dry_run:
+        readme.write_text(content, encoding="utf-8")
+    return True
+
+
+def rebuild_platform(platform_dir: Path, dry_run: bool, pool: ThreadPoolExecutor) -> list:
+    platform = platform_dir.name
+    rooms    = find_rooms(platform_dir)
+    if not rooms and not (platform_dir / "README.md").exists():
+        return []   # not a platform folder (e.g. Cheatsheets)
+    known    = {}
+    for readme in platform_dir.rglob("README.md"):
+        for folder, cells in existing_rows(readme).items():
+            # Difficulty tables carry the full six-tag cell — let them win
+            if folder not in known or readme.parent.name in DIFFICULTY_NAMES:
+                known[folder] = cells
+    for room in rooms:
+        resolve_room(room, known)
+
+    jobs = [
+        (readme, pool.submit(rebuild_readme, readme, listed, template, header, platform_dir, dry_run))
+        for readme, listed, template, header in readme_targets(platform_dir, platform, rooms)
+    ]
+    return [readme for readme, job in jobs if job.result()]
+
+
+def rebuild_all(dry_run: bool = False, workers: int = 8, root: Path = REPO_ROOT) -> list:
+    """Rebuild every writeup table from the folders on disk. Returns the READMEs that changed."""
+    platform_dirs = sorted(p for p in root.iterdir() if p.is_dir() and p.name not in ("Templates", ".search"))
+    changed       = []
+    with ThreadPoolExecutor(max_workers=workers) as pool, ThreadPoolExecutor(max_workers=len(platform_dirs) or 1) as outer:
+        for result in outer.map(lambda d: rebuild_platform(d, dry_run, pool), platform_dirs):
+            changed.extend(result)
+
+    verb = "Would update" if dry_run else "Updated"
+    for readme in sorted(changed):
+        print(f"✅ {verb} {readme.relative_to(root).as_posix()}")
+    print(f"\n🎉 Done — {len(changed)} README(s) {'would change' if dry_run else 'changed'}, "
+          f"everything else already up to date")
+    return changed
+
+
 if __name__ == "__main__":
-    generate_all()
+    if "--rebuild" in sys.argv[1:]:
+        rebuild_all(dry_run="--dry-run" in sys.argv[1:])
+    else:
+        generate_all()
@@ -0,0 +1,83 @@
+"""
+Incremental main → gitbook sync using git plumbing.
+One diff-tree finds the writeup files (not READMEs) that are new or changed on
+main, one update-index batch stages their blobs into a temporary index built
+from the gitbook tree, and commit-tree + update-ref move the gitbook branch.
+Neither branch is checked out and the working tree is never touched, so paths
+with spaces and thousands of files cost the same handful of git processes.
+
+READMEs are left alone so GitBook formatting, icons and banners on that branch
+survive; files deleted on main are not removed from gitbook.
+"""
+
+import os
+import tempfile
+import subprocess
+from pathlib import Path
+
+ZERO_OID = "0" * 40
+
+
+class SyncError(RuntimeError):
+    pass
+
+
+def _git(repo: Path, *args, stdin: bytes = None, env: dict = None) -> bytes:
+    result = subprocess.run(["git", *args], cwd=repo, input=stdin, capture_output=True,
+                            env={**os.environ, **env} if env else None)
+    if result.returncode != 0:
+        raise SyncError(f"git {args[0]} failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+    return result.stdout
+
+
+def resolve_branch(repo: Path, branch: str, remote: str = "origin") -> tuple:
+    """(ref, commit) for a local branch, falling back to the remote-tracking branch —
+    a CI checkout only has a local branch for the one it checked out."""
+    for ref in (f"refs/heads/{branch}", f"refs/remotes/{remote}/{branch}"):
+        result = subprocess.run(["git", "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}"],
+                                cwd=repo, capture_output=True, text=True)
+        if result.returncode == 0:
+            return ref, result.stdout.strip()
+    raise SyncError(f"branch '{branch}' not found locally or on {remote}")
+
+
+def changed_files(repo: Path, base: str, head: str, prefix: str = "writeups/") -> list:
+    """(mode, blob, path) for files under prefix that head adds or changes relative to base, READMEs excluded."""
+    out = _git(repo, "diff-tree", "-r", "-z", "--no-renames", "--diff-filter=AMT", base, head, "--", prefix)
+    fields  = out.split(b"\0")
+    changes = []
+    for meta, path in zip(fields[0::2], fields[1::2]):
+        if not meta.startswith(b":"):
+            continue
+        _, new_mode, _, new_blob, _ = meta[1:].decode("ascii").split(" ")
+        name = path.decode("utf-8", "surrogateescape")
+        if not name.endswith("README.md"):
+            changes.append((new_mode, new_blob, name))
+    return changes
+
+
+def sync_writeups(repo: Path, source: str = "main", target: str = "gitbook", push: bool = True,
+                  dry_run: bool = False, message: str = "sync: add new writeup files from main") -> list:
+    """Copy new/changed writeup files from source onto target in one commit. Returns the synced paths."""
+    _, source_commit          = resolve_branch(repo, source)
+    target_ref, target_commit = resolve_branch(repo, target)
+    changes = changed_files(repo, target_commit, source_commit)
+    if not changes or dry_run:
+        return [path for _, _, path in changes]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {"GIT_INDEX_FILE": str(Path(tmp) / "index")}
+        _git(repo, "read-tree", target_commit, env=env)
+        entries = b"".join(f"{mode} {blob}\t{path}\0".encode("utf-8", "surrogateescape")
+                           for mode, blob, path in changes)
+        _git(repo, "update-index", "-z", "--index-info", stdin=entries, env=env)
+        tree = _git(repo, "write-tree", env=env).decode("ascii").strip()
+
+    commit = _git(repo, "commit-tree", tree, "-p", target_commit, "-m", message).decode("ascii").strip()
+    # Compare-and-swap: fails instead of clobbering if the local branch moved meanwhile
+    local_ref = f"refs/heads/{target}"
+    expected  = target_commit if target_ref == local_ref else ZERO_OID
+    _git(repo, "update-ref", "-m", "gitbook sync", local_ref, commit, expected)
+    if push:
+        _git(repo, "push", "origin", f"{local_ref}:{local_ref}")
+    return [path for _, _, path in changes]
@@ -0,0 +1,224 @@
+"""
+Streaming HTML extraction for room pages.
+Scans the response body chunk by chunk, jumps straight over script/style
+content, collects meta description / og tags first and stops reading as soon
+as enough visible text has been gathered. Only the unparsed tail of the
+current chunk is ever held in memory.
+"""
+
+import re
+import html
+import codecs
+
+CHUNK_SIZE     = 16 * 1024
+MAX_PAGE_BYTES = 2 * 1024 * 1024   # never read more than this, however little text we found
+MAX_TEXT_TAIL  = 4096              # longest run of text held back waiting for a word boundary
+
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "canvas"}
+META_KEYS = ("description", "og:description", "twitter:description", "og:title")
+
+_WS_RE    = re.compile(r"\s+")
+_TAG_RE   = re.compile(r"(/?)([a-zA-Z][\w:-]*)")
+_ATTR_RE  = re.compile(r"""([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+_CLOSE_RE = {tag: re.compile(rf"</{tag}\s*>", re.IGNORECASE) for tag in SKIP_TAGS}
+
+
+def parse_attrs(tag_body: str) -> dict:
+    return {
+        m.group(1).lower(): html.unescape(next(g for g in m.groups()[1:] if g is not None))
+        for m in _ATTR_RE.finditer(tag_body)
+    }
+
+
+class StreamScanner:
+    """Minimal incremental tag scanner. Subclasses override on_tag / on_text and
+    return True from either to stop the scan."""
+
+    def __init__(self):
+        self.buf        = ""
+        self.skip_close = None   # compiled closing-tag regex while inside script/style
+        self.done       = False
+
+    def on_tag(self, name: str, closing: bool, body: str) -> bool:
+        return False
+
+    def on_text(self, text: str) -> bool:
+        return False
+
+    def feed(self, data: str) -> bool:
+        """Consume more text; returns True once the scanner wants no more input."""
+        if self.done:
+            return True
+        buf = self.buf + data
+        pos = 0
+        while not self.done:
+            if self.skip_close:
+                m = self.skip_close.search(buf, pos)
+                if not m:
+                    pos = max(pos, len(buf) - 16)  # a closing tag may straddle the chunk boundary
+                    break
+                pos, self.skip_close = m.end(), None
+                continue
+
+            lt = buf.find("<", pos)
+            if lt == -1:
+                # Hold back a partial word / entity until the next chunk, within bounds
+                cut = buf.rfind(" ", pos)
+                if cut == -1 and len(buf) - pos > MAX_TEXT_TAIL:
+                    cut = len(buf) - 1
+                if cut >= pos:
+                    self.done = self.on_text(buf[pos:cut + 1])
+                    pos = cut + 1
+                break
+            if lt > pos:
+                self.done = self.on_text(buf[pos:lt])
+                pos = lt
+                continue
+
+            if buf.startswith("<!--", lt):
+                end = buf.find("-->", lt + 4)
+                if end == -1:
+                    break
+                pos = end + 3
+                continue
+            gt = buf.find(">", lt)
+            if gt == -1:
+                break
+            body = buf[lt + 1:gt]
+            m    = _TAG_RE.match(body)
+            if not m:
+                if body.startswith(("!", "?")):   # doctype / processing instruction
+                    pos = gt + 1
+                else:                              # a literal "<" in text
+                    self.done = self.on_text("<")
+                    pos = lt + 1
+                continue
+            name    = m.group(2).lower()
+            closing = bool(m.group(1))
+            pos     = gt + 1
+            if not closing and name in SKIP_TAGS and not body.endswith("/"):
+                self.skip_close = _CLOSE_RE[name]
+            self.done = self.on_tag(name, closing, body)
+        self.buf = buf[pos:]
+        return self.done
+
+    def close(self):
+        if self.buf and not self.skip_close and not self.done:
+            self.on_text(self.buf)
+        self.buf = ""
+
+
+class TextExtractor(StreamScanner):
+    """Meta description/og text plus visible page text, up to `limit` chars."""
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit  = limit
+        self.meta   = {}
+        self.parts  = []
+        self.length = 0
+        self.space  = True   # last emitted char was whitespace
+
+    def on_tag(self, name, closing, body):
+        if name == "meta" and not closing:
+            attrs = parse_attrs(body)
+            key   = (attrs.get("property") or attrs.get("name") or "").lower()
+            if key in META_KEYS and attrs.get("content") and key not in self.meta:
+                self.meta[key] = _WS_RE.sub(" ", attrs["content"]).strip()
+        # Tags separate words, as the old `<[^>]+>` → " " substitution did
+        if not self.space:
+            self.parts.append(" ")
+            self.length += 1
+            self.space   = True
+        return self._full()
+
+    def on_text(self, text):
+        text = _WS_RE.sub(" ", html.unescape(text))
+        if self.space:
+            text = text.lstrip(" ")
+        if not text:
+            return False
+        self.parts.append(text)
+        self.length += len(text)
+        self.space   = text.endswith(" ")
+        return self._full()
+
+    def _full(self) -> bool:
+        return self.length + sum(len(v) + 1 for v in self.meta.values()) >= self.limit
+
+    def meta_text(self) -> str:
+        return " ".join(dict.fromkeys(self.meta[k] for k in META_KEYS if self.meta.get(k)))
+
+    def result(self) -> str:
+        text = "".join(self.parts).strip()
+        meta = self.meta_text()
+        return (f"{meta} {text}" if meta else text).strip()[:self.limit]
+
+
+class HeadMetaScanner(StreamScanner):
+    """Collects og:image-style icon candidates and stops at </head> / <body>."""
+
+    ICON_KEYS = ("og:image", "og:image:url", "og:image:secure_url", "twitter:image")
+
+    def __init__(self):
+        super().__init__()
+        self.images = {}
+
+    def on_tag(self, name, closing, body):
+        if name == "body" or (name == "head" and closing):
+            return True
+        if name == "meta" and not closing:
+            attrs = parse_attrs(body)
+            key   = (attrs.get("property") or attrs.get("name") or "").lower()
+            if key in self.ICON_KEYS and attrs.get("content"):
+                self.images.setdefault(key, attrs["content"].strip())
+        elif name == "link" and not closing:
+            attrs = parse_attrs(body)
+            if attrs.get("rel", "").lower() == "image_src" and attrs.get("href"):
+                self.images.setdefault("image_src", attrs["href"].strip())
+        return False
+
+    def best(self) -> str:
+        for key in self.ICON_KEYS + ("image_src",):
+            if self.images.get(key):
+                return self.images[key]
+        return ""
+
+
+def scan_stream(scanner: StreamScanner, chunks, encoding: str = "utf-8",
+                max_bytes: int = MAX_PAGE_BYTES) -> int:
+    """Feed byte chunks to a scanner until it is satisfied or max_bytes is reached.
+    Returns the number of bytes consumed."""
+    try:
+        decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    bytes_read = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        bytes_read += len(chunk)
+        if scanner.feed(decoder.decode(chunk)) or bytes_read >= max_bytes:
+            return bytes_read
+    scanner.feed(decoder.decode(b"", final=True))
+    scanner.close()
+    return bytes_read
+
+
+def extract_text_stream(chunks, limit: int = 3000, encoding: str = "utf-8",
+                        max_bytes: int = MAX_PAGE_BYTES):
+    """Extract up to `limit` chars of meta + visible text from an iterable of byte chunks.
+
+    Returns (text, bytes_read). Stops consuming `chunks` as soon as the limit is
+    reached, so the caller can close the connection without reading the rest."""
+    extractor  = TextExtractor(limit)
+    bytes_read = scan_stream(extractor, chunks, encoding, max_bytes)
+    return extractor.result(), bytes_read
+
+
+def response_encoding(resp) -> str:
+    """Charset from the Content-Type header, else UTF-8 (requests would guess ISO-8859-1)."""
+    content_type = resp.headers.get("content-type", "").lower()
+    if "charset=" in content_type and resp.encoding:
+        return resp.encoding
+    return "utf-8"
@@ -0,0 +1,121 @@
+"""
+Room icon URL resolution for the CTF publisher.
+
+Resolution order (cheapest first):
+  1. icon_index.json — room URL → icon URL recorded on a previous publish/backfill
+  2. per-platform templates — icon URL derived from the room URL, no page fetch
+  3. head-only page scan — stream the room page until </head> looking for og:image
+
+The index file is committed alongside the writeups so fresh CI checkouts
+never fetch the same room page twice.
+"""
+
+import re
+import json
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from html_extract import CHUNK_SIZE, HeadMetaScanner, scan_stream, response_encoding
+
+INDEX_PATH = Path(__file__).parent / "icon_index.json"
+
+# Fallback for TryHackMe pages that ship no og:image in <head>
+THM_S3_RE = re.compile(rb'https://tryhackme-images\.s3\.amazonaws\.com/room-icons/[^\s"\'<>\\]+')
+
+# Built-in platform templates: platform → {"match": room URL regex, "icon": URL template using its
+# named groups}. None of the supported platforms publishes icon URLs derivable from the room slug
+# today, so this ships empty; entries can also go under "templates" in icon_index.json.
+ICON_URL_TEMPLATES = {}
+
+# A "no icon" result may be a transient failure or a page that gains og:image later — retry after this
+NEGATIVE_TTL_DAYS = 7
+
+
+def normalise_room_url(url: str) -> str:
+    """Index key: scheme + lowercase host + path without trailing slash, no query/fragment."""
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), "", ""))
+
+
+class IconIndex:
+    def __init__(self, path: Path = INDEX_PATH):
+        self.path  = path
+        self.lock  = threading.Lock()
+        self.dirty = False
+        data = {}
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                print(f"   ⚠️  Could not read {path.name}: {e}")
+        self.rooms     = data.get("rooms", {})
+        self.templates = data.get("templates", {})
+
+    def get(self, room_url: str):
+        """Icon URL for a room, "" for a page recently found to have none, None if never resolved
+        (or its "no icon" entry is older than NEGATIVE_TTL_DAYS and should be retried)."""
+        entry = self.rooms.get(normalise_room_url(room_url))
+        if not entry:
+            return None
+        if not entry["icon_url"]:
+            try:
+                resolved = datetime.strptime(entry.get("resolved", ""), "%Y-%m-%d")
+            except ValueError:
+                return None
+            if datetime.now() - resolved > timedelta(days=NEGATIVE_TTL_DAYS):
+                return None
+        return entry["icon_url"]
+
+    def put(self, room_url: str, icon_url: str, platform: str = "", source: str = ""):
+        with self.lock:
+            self.rooms[normalise_room_url(room_url)] = {
+                "icon_url": icon_url,
+                "platform": platform,
+                "source":   source,
+                "resolved": datetime.now().strftime("%Y-%m-%d"),
+            }
+            self.dirty = True
+
+    def template_url(self, platform: str, room_url: str) -> str:
+        for spec in (self.templates.get(platform), ICON_URL_TEMPLATES.get(platform)):
+            if not spec:
+                continue
+            m = re.search(spec["match"], room_url)
+            if m:
+                return spec["icon"].format(**m.groupdict())
+        return ""
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {"templates": self.templates, "rooms": dict(sorted(self.rooms.items()))}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+            self.dirty = False
+
+
+def scan_head_for_icon(resp) -> str:
+    """Stream a room page only until </head> and return its og:image (absolute), or "".
+    Pages without one in <head> fall back to a raw scan for the TryHackMe S3 icon pattern."""
+    chunks  = resp.iter_content(chunk_size=CHUNK_SIZE)
+    scanner = HeadMetaScanner()
+    scan_stream(scanner, chunks, response_encoding(resp))
+    if scanner.best():
+        return urljoin(resp.url or "", scanner.best())
+
+    # Leftover unparsed text first, then keep reading the body raw (bounded)
+    tail, read = scanner.buf.encode("utf-8", "ignore"), 0
+    for chunk in chunks:
+        tail += chunk
+        m = THM_S3_RE.search(tail)
+        if m:
+            return m.group(0).decode("ascii", "ignore")
+        read += len(chunk)
+        if read > 2 * 1024 * 1024:
+            break
+        tail = tail[-256:]
+    m = THM_S3_RE.search(tail)
+    return m.group(0).decode("ascii", "ignore") if m else ""
@@ -0,0 +1,172 @@
+"""
+Local publish ledger for the CTF publisher.
+One SQLite row per publish: which page, which file, its content hash, the
+commit it went out in and when. "Published today?", "already published?"
+and "needs republish?" are indexed local queries instead of Notion calls.
+
+Alongside, the last fingerprint of every other output a page produces
+(README rows, Notion body, gitbook entry) and of the inputs its writeup was
+formatted from, so a republish of an unchanged page reuses the published
+writeup and skips the steps whose output would come out byte-identical.
+
+The database lives in the run-state folder. When it is missing (fresh CI
+runner, evicted cache) it is rebuilt from the `writeup: Add …` commits in
+git history before it is first queried.
+"""
+
+import re
+import sqlite3
+import hashlib
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS publishes (
+    id           INTEGER PRIMARY KEY,
+    page_id      TEXT,
+    room_name    TEXT NOT NULL,
+    platform     TEXT NOT NULL,
+    difficulty   TEXT,
+    path         TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    commit_sha   TEXT,
+    published_at TEXT NOT NULL,
+    published_on TEXT NOT NULL,
+    source       TEXT NOT NULL DEFAULT 'publish'
+);
+CREATE INDEX IF NOT EXISTS publishes_on   ON publishes (published_on);
+CREATE INDEX IF NOT EXISTS publishes_page ON publishes (page_id);
+CREATE INDEX IF NOT EXISTS publishes_path ON publishes (path, id);
+CREATE INDEX IF NOT EXISTS publishes_hash ON publishes (content_hash);
+CREATE TABLE IF NOT EXISTS outputs (
+    page_id      TEXT NOT NULL,
+    output       TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    written_at   TEXT NOT NULL,
+    PRIMARY KEY (page_id, output)
+);
+"""
+
+WRITEUP_COMMIT_RE = re.compile(r"^writeup: Add (.+?) - (.+)$")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class Ledger:
+    def __init__(self, path: Path):
+        self.path = path
+        self._db  = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """Opened on first use so importing the publisher never touches the disk."""
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path)
+            self._db.row_factory = sqlite3.Row
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    @property
+    def empty(self) -> bool:
+        return self.db.execute("SELECT 1 FROM publishes LIMIT 1").fetchone() is None
+
+    def record(self, room_name: str, platform: str, path: str, content: str, page_id: str = "",
+               difficulty: str = "", commit_sha: str = "", when: datetime = None, source: str = "publish"):
+        when = when or datetime.now()
+        with self.db:
+            self.db.execute(
+                "INSERT INTO publishes (page_id, room_name, platform, difficulty, path, content_hash, "
+                "commit_sha, published_at, published_on, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (page_id, room_name, platform, difficulty, path, content_hash(content), commit_sha,
+                 when.isoformat(timespec="seconds"), when.strftime("%Y-%m-%d"), source),
+            )
+
+    # ── lookups ──
+
+    def published_on(self, day: str) -> int:
+        """Number of publishes on a YYYY-MM-DD day."""
+        return self.db.execute("SELECT COUNT(*) FROM publishes WHERE published_on = ?", (day,)).fetchone()[0]
+
+    def latest(self, page_id: str = "", path: str = ""):
+        """Most recent publish of a Notion page or writeup path, or None."""
+        column, value = ("page_id", page_id) if page_id else ("path", path)
+        return self.db.execute(
+            f"SELECT * FROM publishes WHERE {column} = ? ORDER BY id DESC LIMIT 1", (value,)
+        ).fetchone()
+
+    def exists(self, page_id: str = "", path: str = "") -> bool:
+        return self.latest(page_id=page_id, path=path) is not None
+
+    def needs_republish(self, path: str, content: str) -> bool:
+        """True when the writeup was never published or its last published content differs."""
+        row = self.latest(path=path)
+        return row is None or row["content_hash"] != content_hash(content)
+
+    # ── output fingerprints ──
+
+    def output_unchanged(self, page_id: str, output: str, content: str) -> bool:
+        """True when `output` of the page was last written with exactly this content."""
+        row = self.db.execute("SELECT content_hash FROM outputs WHERE page_id = ? AND output = ?",
+                              (page_id, output)).fetchone()
+        return row is not None and row["content_hash"] == content_hash(content)
+
+    def record_output(self, page_id: str, output: str, content: str, when: datetime = None):
+        when = when or datetime.now()
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO outputs (page_id, output, content_hash, written_at) VALUES (?, ?, ?, ?)",
+                (page_id, output, content_hash(content), when.isoformat(timespec="seconds")),
+            )
+
+    def stats(self) -> dict:
+        rows = self.db.execute(
+            "SELECT platform, COUNT(DISTINCT path) AS rooms, MAX(published_on) AS last "
+            "FROM publishes GROUP BY platform ORDER BY rooms DESC"
+        ).fetchall()
+        return {r["platform"]: {"rooms": r["rooms"], "last": r["last"]} for r in rows}
+
+    # ── backfill ──
+
+    def backfill_from_git(self, repo: Path) -> int:
+        """Rebuild the ledger from publish commits. Returns the number of rows added."""
+        try:
+            log = subprocess.run(
+                ["git", "log", "--reverse", "--format=%H%x09%aI%x09%s", "--grep=^writeup: Add "],
+                cwd=repo, capture_output=True, text=True, check=True,
+            ).stdout
+        except (OSError, subprocess.CalledProcessError):
+            return 0
+
+        added = 0
+        for line in log.splitlines():
+            sha, date, subject = line.split("\t", 2)
+            m = WRITEUP_COMMIT_RE.match(subject)
+            if not m:
+                continue
+            files = subprocess.run(
+                ["git", "show", "--name-only", "--diff-filter=AM", "--format=", sha],
+                cwd=repo, capture_output=True, text=True,
+            ).stdout.split("\n")
+            for name in files:
+                p = Path(name)
+                if p.suffix != ".md" or p.stem != p.parent.name or not name.startswith("writeups/"):
+                    continue
+                blob = subprocess.run(["git", "show", f"{sha}:{name}"], cwd=repo, capture_output=True)
+                if blob.returncode != 0:
+                    continue
+                self.record(
+                    room_name=m.group(2), platform=m.group(1), path=name,
+                    content=blob.stdout.decode("utf-8", "replace"), commit_sha=sha,
+                    when=datetime.fromisoformat(date).astimezone().replace(tzinfo=None), source="backfill",
+                )
+                added += 1
+        return added
@@ -0,0 +1,119 @@
+"""
+Read-through cache of the notes extracted from Notion pages.
+Keyed by page ID and the page's last_edited_time: while a page is unchanged,
+re-processing it (a cleared checkpoint, a retry, a watch-mode re-prepare)
+loads its notes and image list from disk without a single Notion call.
+
+Notion rounds last_edited_time to the minute, so an edit made in the same
+minute as the read keeps the key the entry was stored under. An entry only
+counts once its read started SETTLE after the edit time; one read sooner
+is a miss and gets replaced by the next read.
+
+Notion-hosted image URLs are signed and expire about an hour after the read.
+An entry whose URLs have expired still serves the notes, but `urls_fresh`
+says so and the publisher re-reads the page when screenshots still have to
+be downloaded.
+
+Entries of published pages are evicted once they have not been read or
+written for a set number of days.
+"""
+
+import os
+import json
+import time
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, parse_qs
+
+VERSION    = 2   # 2: published pages yield only the notes below the 📝 callout
+URL_MARGIN = timedelta(minutes=5)   # treat a signed URL as expired this long before it actually is
+SETTLE     = timedelta(minutes=2)   # last_edited_time is minute-granular — a read this close may predate an edit
+
+
+def _parse_time(stamp: str):
+    try:
+        moment = datetime.fromisoformat(stamp.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def url_expiry(url: str):
+    """UTC expiry of an S3-style signed URL (X-Amz-Date + X-Amz-Expires), None if it never expires."""
+    query = parse_qs(urlsplit(url).query)
+    try:
+        signed  = datetime.strptime(query["X-Amz-Date"][0], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+        expires = int(query["X-Amz-Expires"][0])
+    except (KeyError, ValueError, IndexError):
+        return None
+    return signed + timedelta(seconds=expires)
+
+
+def urls_fresh(image_urls: list) -> bool:
+    """True if every image URL can still be downloaded (unsigned URLs always can)."""
+    cutoff = datetime.now(timezone.utc) + URL_MARGIN
+    return all(expiry is None or expiry > cutoff for expiry in map(url_expiry, image_urls))
+
+
+class NotesCache:
+    def __init__(self, root: Path):
+        self.root   = root
+        self.hits   = 0
+        self.misses = 0
+
+    def _file(self, page_id: str) -> Path:
+        return self.root / f"{page_id.replace('-', '')}.json"
+
+    def get(self, page_id: str, last_edited: str):
+        """(notes, image_urls) for this page at this edit, None if not cached."""
+        path = self._file(page_id)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            entry = None
+        if not last_edited or not entry or entry.get("version") != VERSION or entry.get("edited") != last_edited \
+                or not self._settled(entry):
+            self.misses += 1
+            return None
+        os.utime(path)    # last use — eviction counts from here
+        self.hits += 1
+        return entry["notes"], entry["image_urls"]
+
+    @staticmethod
+    def _settled(entry: dict) -> bool:
+        """True if the read started late enough after the edit that no same-minute edit can be missing."""
+        edited, read_at = _parse_time(entry.get("edited")), _parse_time(entry.get("read_at"))
+        return edited is not None and read_at is not None and read_at - edited >= SETTLE
+
+    def put(self, page_id: str, last_edited: str, notes: str, image_urls: list, read_at: datetime = None):
+        """Store a read; `read_at` is when the read started (defaults to now)."""
+        if not last_edited:
+            return
+        read_at = (read_at or datetime.now(timezone.utc)).astimezone(timezone.utc)
+        entry = {"version": VERSION, "page_id": page_id, "edited": last_edited,
+                 "read_at": read_at.isoformat(timespec="seconds"),
+                 "notes": notes, "image_urls": image_urls}
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._file(page_id).write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        except OSError as e:
+            print(f"   ⚠️  Could not cache notes: {e}")
+
+    def evict(self, published, max_age_days: float) -> int:
+        """Remove entries of pages for which published(page_id) is true that have not been used
+        for max_age_days. Returns how many were removed."""
+        if not self.root.exists():
+            return 0
+        cutoff  = time.time() - max_age_days * 86400
+        removed = 0
+        for path in self.root.glob("*.json"):
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                page_id = json.loads(path.read_text(encoding="utf-8")).get("page_id", "")
+            except (OSError, ValueError):
+                page_id = ""    # unreadable — nothing can hit it any more
+            if not page_id or published(page_id):
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
@@ -0,0 +1,291 @@
+"""
+Deterministic pre-compression of rough notes before they are sent to Claude.
+Pasted tool output dominates long notes: gobuster/ffuf hits, repeated scanner
+lines, base64 and hex dumps. This pass dedupes repeated lines, summarises long
+runs of similar lines with a count and elides binary-looking blobs, keeping
+headings, prose, screenshot references and the lines the prose talks about.
+
+Runs are only summarised inside code blocks or, for one-line Notion
+paragraphs, when the run clearly is pasted tool output (prompts, columns,
+port / status lines, a long shared prefix). Lines with a flag or a task
+answer are never dropped. The pass runs on all notes, however short: a few
+hundred lines of gobuster output cost Claude tokens long before the notes
+come near the formatting budget.
+
+The original notes are untouched — they are still what gets archived to Notion.
+"""
+
+import os
+import re
+import hashlib
+from collections import Counter
+
+from token_budget import estimate_tokens
+
+RUN_MIN      = 8     # similar consecutive lines before a run is summarised
+RUN_KEEP     = 3     # lines kept from the start of a summarised run (plus the last one)
+MENTION_KEEP = 20    # lines kept from inside a run because the prose mentions them
+DEDUPE_MIN   = 12    # non-space chars a line needs before exact repeats are dropped
+BLOCK_MIN    = 80    # chars a paragraph / code block needs before repeats are dropped
+
+_FENCE_RE  = re.compile(r"^\s*```")
+_BASE64_RE = re.compile(r"[A-Za-z0-9+/]{120,}={0,2}")
+_HEX_RE    = re.compile(r"\b(?:[0-9a-fA-F]{2}[ :]?){80,}\b")
+_WORD_RE   = re.compile(r"[A-Za-z_][\w.-]*")
+_NUM_RE    = re.compile(r"\d+")
+_TOKEN_RE  = re.compile(r"[\w./-]{4,}")
+_KEEP_RE   = re.compile(r"^(#{1,6}\s|!\[|[-*] |\d+\. |> |---$)")
+
+# Lines that must reach Claude whatever run they sit in: flags and task / question answers
+_PROTECT_RE = re.compile(r"\b[A-Za-z0-9_]+\{[^{}\n]{3,}\}|\b(?:flags?|answers?|tasks?|questions?)\b", re.IGNORECASE)
+
+# Signs a run of one-line paragraphs is pasted tool output rather than prose
+_OUTPUT_RE = re.compile(
+    r"^\s*(?:\$ |>>> |PS [A-Z]:\\|[\w.-]+@[\w.-]+[:~]|msf\d? |meterpreter|[A-Z]:\\\S*>|\[[+*!-]\] )"  # prompts
+    r"|\S(?:\t| {2,})\S"                                                                      # columns
+    r"|\|.*\|"                                                                                # table rows
+    r"|\b\d+/(?:tcp|udp)\b|\(Status: \d{3}\)|\[Status: \d{3}"                                 # ports, HTTP status
+)
+OUTPUT_SHARE = 0.5   # share of a prose run's lines that must look like tool output
+PREFIX_MIN   = 16    # or: chars every line of the run starts with (same URL, same log prefix)…
+_PREFIX_RE   = re.compile(r"[/\\:\[=]")   # …that looks like one — a shared sentence opening does not count
+
+
+# ─────────────────────────────────────────────
+# LINE HELPERS
+# ─────────────────────────────────────────────
+
+def _shape(line: str) -> str:
+    """Structure of a line with words and numbers abstracted: gobuster hits,
+    hydra attempts and port lines of one scan all share a shape."""
+    return " ".join(_NUM_RE.sub("#", _WORD_RE.sub("w", line)).split())
+
+
+def _looks_binary(blob: str) -> bool:
+    """Long base64 runs that are data, not a path or an identifier: mixed case plus digits."""
+    return any(c.isdigit() for c in blob) and any(c.islower() for c in blob) and any(c.isupper() for c in blob)
+
+
+def elide_blobs(line: str, stats: dict) -> str:
+    def base64(m):
+        blob = m.group(0)
+        if not _looks_binary(blob):
+            return blob
+        stats["blobs"] += 1
+        return f"{blob[:24]}…[base64 blob, {len(blob):,} chars elided]"
+
+    def hexdump(m):
+        stats["blobs"] += 1
+        return f"{m.group(0)[:24]}…[hex blob, {len(m.group(0)):,} chars elided]"
+
+    return _HEX_RE.sub(hexdump, _BASE64_RE.sub(base64, line))
+
+
+def dedupe_lines(lines: list, stats: dict) -> list:
+    """Collapse consecutive repeats to one line with a count and drop later exact repeats."""
+    out, seen = [], set()
+    for line in lines:
+        if out and line == out[-1][0] and line.strip():
+            out[-1][1] += 1
+            continue
+        if len(line.strip()) >= DEDUPE_MIN and line in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(line)
+        out.append([line, 1])
+    result = []
+    for line, count in out:
+        if count > 1:
+            stats["duplicates"] += count - 1
+            line = f"{line}  [×{count}]"
+        result.append(line)
+    return result
+
+
+def _tokens(line: str) -> set:
+    return {t.strip("./-").lower() for t in _TOKEN_RE.findall(line)} - {""}
+
+
+def _runs(lines: list):
+    """Yield (start, end) of consecutive lines sharing a shape."""
+    i = 0
+    while i < len(lines):
+        shape = _shape(lines[i])
+        j = i + 1
+        while j < len(lines) and lines[j].strip() and _shape(lines[j]) == shape:
+            j += 1
+        yield i, j, bool(shape)
+        i = j
+
+
+def _tool_output(run: list) -> bool:
+    """A run of one-line paragraphs is collapsed only when it looks pasted from a tool."""
+    if sum(1 for line in run if _OUTPUT_RE.search(line)) >= len(run) * OUTPUT_SHARE:
+        return True
+    prefix = os.path.commonprefix(run).strip()
+    return len(prefix) >= PREFIX_MIN and bool(_PREFIX_RE.search(prefix))
+
+
+def _collapsible(run: list, shaped: bool, prose: bool) -> bool:
+    return len(run) >= RUN_MIN and shaped and (not prose or _tool_output(run))
+
+
+def collapse_runs(lines: list, mentioned: set, stats: dict, prose: bool = False) -> list:
+    """Summarise runs of RUN_MIN+ lines sharing a shape: keep the first few, the last one,
+    any flag / answer line and any line with a token the prose mentions, and count the rest.
+    `prose` runs (one-line paragraphs) must also look like tool output."""
+    out = []
+    for i, j, shaped in _runs(lines):
+        run = lines[i:j]
+        if not _collapsible(run, shaped, prose):
+            out.extend(run)
+            continue
+
+        # Tokens shared by many lines of the run ("Status", "open", the URL) are its template,
+        # not evidence — only a rarer mentioned token (a path, a username) keeps a line
+        tokens = [_tokens(line) for line in run]
+        common = Counter(t for found in tokens for t in found)
+        rare   = {t for t, n in common.items() if n <= max(1, len(run) // 10)} & mentioned
+        middle = range(RUN_KEEP, len(run) - 1)
+        kept   = [run[k] for k in middle if tokens[k] & rare][:MENTION_KEEP]
+        kept   = [run[k] for k in middle if run[k] in kept or _PROTECT_RE.search(run[k])]
+        hidden = len(middle) - len(kept)
+        out.extend(run[:RUN_KEEP])
+        out.extend(kept)
+        out.append(f"… [{hidden:,} more similar line(s)]")
+        out.append(run[-1])
+        stats["runs"] += 1
+        stats["lines_collapsed"] += hidden
+    return out
+
+
+# ─────────────────────────────────────────────
+# SEGMENTS
+# ─────────────────────────────────────────────
+
+def _segments(notes: str) -> list:
+    """Split notes into ("code", [lines]) fenced blocks — fence lines included — and
+    ("text", paragraph) prose paragraphs."""
+    segments, para, code = [], [], None
+
+    def flush():
+        if para:
+            segments.append(("text", "\n".join(para)))
+            para.clear()
+
+    for line in notes.split("\n"):
+        if code is not None:
+            code.append(line)
+            if _FENCE_RE.match(line) and len(code) > 1:
+                segments.append(("code", code))
+                code = None
+            continue
+        if _FENCE_RE.match(line):
+            flush()
+            code = [line]
+        elif not line.strip():
+            flush()
+        else:
+            para.append(line)
+    flush()
+    if code is not None:  # unterminated fence
+        segments.append(("code", code))
+    return segments
+
+
+def _is_line_paragraph(text: str) -> bool:
+    """Single-line paragraphs that aren't headings, lists, quotes or images may be tool output
+    pasted one line per Notion block — they are collapsed like lines of a code block."""
+    return "\n" not in text and not _KEEP_RE.match(text)
+
+
+def _mentioned_tokens(segments: list) -> set:
+    """Path / host / word tokens the prose mentions — evidence a tool-output line matters.
+    Paragraphs that are themselves part of a run of pasted output don't count as prose."""
+    tokens, pending = set(), []
+
+    def flush():
+        for i, j, shaped in _runs(pending):
+            if not _collapsible(pending[i:j], shaped, prose=True):
+                for line in pending[i:j]:
+                    tokens.update(_tokens(line))
+        pending.clear()
+
+    for kind, text in segments:
+        if kind == "text" and _is_line_paragraph(text):
+            pending.append(text)
+            continue
+        flush()
+        if kind == "text":
+            tokens.update(_tokens(text))
+    flush()
+    return tokens
+
+
+def _block_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+# ─────────────────────────────────────────────
+# ENTRY POINT
+# ─────────────────────────────────────────────
+
+def compress_notes(notes: str) -> tuple:
+    """Return (compressed notes, stats). Same input always gives the same output."""
+    stats = {"duplicates": 0, "runs": 0, "lines_collapsed": 0, "blobs": 0, "repeated_blocks": 0}
+    segments  = _segments(notes)
+    mentioned = _mentioned_tokens(segments)
+    out, seen_blocks, prose_run = [], set(), []
+
+    def flush_prose():
+        if prose_run:
+            out.extend(collapse_runs(prose_run, mentioned, stats, prose=True))
+            prose_run.clear()
+
+    for kind, value in segments:
+        if kind == "code":
+            flush_prose()
+            fence_open, body = value[0], value[1:]
+            fence_close = body.pop() if body and _FENCE_RE.match(body[-1]) else "```"
+            key = _block_key("\n".join(body))
+            if len("\n".join(body)) >= BLOCK_MIN and key in seen_blocks:
+                stats["repeated_blocks"] += 1
+                out.append("[repeat of an earlier code block elided]")
+                continue
+            seen_blocks.add(key)
+            body = collapse_runs(dedupe_lines(body, stats), mentioned, stats)
+            body = [elide_blobs(line, stats) for line in body]
+            out.append("\n".join([fence_open, *body, fence_close]))
+            continue
+
+        text = elide_blobs(value, stats)
+        key  = _block_key(value)
+        if len(value) >= BLOCK_MIN and key in seen_blocks:
+            stats["repeated_blocks"] += 1
+            continue
+        seen_blocks.add(key)
+        if _is_line_paragraph(text):
+            prose_run.append(text)
+            continue
+        flush_prose()
+        out.append(text)
+    flush_prose()
+
+    compressed = "\n\n".join(out)
+    stats.update(
+        chars_in=len(notes), chars_out=len(compressed),
+        tokens_in=estimate_tokens(notes), tokens_out=estimate_tokens(compressed),
+    )
+    return compressed, stats
+
+
+def describe(stats: dict) -> str:
+    """One-line report: sizes before/after, reduction and what was removed."""
+    saved  = 1 - stats["tokens_out"] / stats["tokens_in"] if stats["tokens_in"] else 0.0
+    detail = [f"{stats[k]:,} {label}" for k, label in (
+        ("duplicates", "duplicate line(s)"), ("lines_collapsed", "similar line(s)"),
+        ("blobs", "blob(s)"), ("repeated_blocks", "repeated block(s)"),
+    ) if stats[k]]
+    return (f"{stats['chars_in']:,} → {stats['chars_out']:,} chars, "
+            f"~{stats['tokens_in']:,} → ~{stats['tokens_out']:,} tokens ({saved:.0%} smaller)"
+            + (f" — removed {', '.join(detail)}" if detail else ""))
@@ -0,0 +1,387 @@
+"""
+Markdown → Notion block conversion for the CTF publisher.
+
+Single pass over the lines with a small tokenizer per line. Long text and
+code are split into rich-text segments that fit Notion's limits, nested list
+items become child blocks, pipe tables become table blocks, and inline
+**bold**, *italic*, `code` and [links](https://…) are kept as annotations.
+"""
+
+import re
+
+# ─────────────────────────────────────────────
+# NOTION LIMITS
+# ─────────────────────────────────────────────
+RICH_TEXT_LIMIT  = 2000   # characters per rich_text object
+RICH_TEXT_ITEMS  = 100    # rich_text objects per block
+CHILDREN_LIMIT   = 100    # children per block / blocks per append request
+MAX_NESTING      = 2      # child levels accepted in a single append request
+REQUEST_BLOCKS   = 1000   # blocks (including children) per append request
+REQUEST_CHARS    = 200_000  # text per append request — keeps the body well under the 500KB payload cap
+
+NOTION_CODE_LANGUAGES = {
+    "abap","abc","agda","arduino","ascii art","assembly","bash","basic","bnf",
+    "c","c#","c++","clojure","coffeescript","coq","css","dart","dhall","diff",
+    "docker","ebnf","elixir","elm","erlang","f#","flow","fortran","gherkin",
+    "glsl","go","graphql","groovy","haskell","hcl","html","idris","java",
+    "javascript","json","julia","kotlin","latex","less","lisp","livescript",
+    "llvm ir","lua","makefile","markdown","markup","matlab","mathematica",
+    "mermaid","nix","notion formula","objective-c","ocaml","pascal","perl",
+    "php","plain text","powershell","prolog","protobuf","purescript","python",
+    "r","racket","reason","ruby","rust","sass","scala","scheme","scss","shell",
+    "smalltalk","solidity","sql","swift","toml","typescript","vb.net","verilog",
+    "vhdl","visual basic","webassembly","xml","yaml","java/c/c++/c#"
+}
+
+CODE_LANGUAGE_ALIASES = {
+    "sh": "shell", "zsh": "shell", "console": "shell", "terminal": "shell",
+    "py": "python", "js": "javascript", "ts": "typescript", "ps1": "powershell",
+    "ps": "powershell", "cmd": "shell", "yml": "yaml", "text": "plain text",
+    "plain": "plain text", "txt": "plain text", "dockerfile": "docker", "cs": "c#",
+    "cpp": "c++", "rb": "ruby", "md": "markdown", "htm": "html",
+}
+
+# Each alternative stops at the next delimiter of its own kind, so scanning stays linear
+INLINE_RE = re.compile(
+    r"`(?P<code>[^`\n]+)`"
+    r"|\*\*(?P<bold>[^*\n]+)\*\*"
+    r"|\[(?P<ltext>[^\[\]\n]+)\]\((?P<lurl>[^()\s]+)\)"
+    r"|(?<![\w*])\*(?P<italic>[^*\s][^*\n]*)\*(?![\w*])"
+    r"|(?<![\w_])_(?P<uitalic>[^_\s][^_\n]*)_(?![\w_])"
+)
+
+FENCE_RE     = re.compile(r"^(\s*)(```+|~~~+)\s*([\w#+./ -]*)\s*$")
+HEADING_RE   = re.compile(r"^(#{1,6})\s+(.*?)(?:\s+#+)?\s*$")
+LIST_RE      = re.compile(r"^(\s*)([-*+]|\d+[.)])\s+(.*)$")
+TODO_RE      = re.compile(r"^\[( |x|X)\]\s+(.*)$")
+TABLE_SEP_RE = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+IMAGE_RE     = re.compile(r"^!\[([^\]]*)\]\(([^)\s]+)\)\s*$")
+HR_RE        = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+
+
+# ─────────────────────────────────────────────
+# RICH TEXT
+# ─────────────────────────────────────────────
+
+def split_text(text: str, limit: int = RICH_TEXT_LIMIT) -> list:
+    """Split text into pieces no longer than limit, preferring newline boundaries."""
+    pieces = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= limit // 2:
+            cut = limit
+        else:
+            cut += 1  # keep the newline with the first piece
+        pieces.append(text[:cut])
+        text = text[cut:]
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def text_item(content: str, annotations: dict = None, link: str = None) -> list:
+    """One logical run of text → one or more rich_text objects within the char limit."""
+    items = []
+    for piece in split_text(content):
+        item = {"type": "text", "text": {"content": piece}}
+        if link:
+            item["text"]["link"] = {"url": link}
+        if annotations:
+            item["annotations"] = dict(annotations)
+        items.append(item)
+    return items
+
+
+def parse_inline(text: str) -> list:
+    """Tokenize inline markdown into rich_text objects (bold / italic / code / links)."""
+    items = []
+    pos   = 0
+    for m in INLINE_RE.finditer(text):
+        if m.start() > pos:
+            items.extend(text_item(text[pos:m.start()]))
+        if m.group("code") is not None:
+            items.extend(text_item(m.group("code"), {"code": True}))
+        elif m.group("bold") is not None:
+            items.extend(text_item(m.group("bold"), {"bold": True}))
+        elif m.group("ltext") is not None:
+            url = m.group("lurl")
+            # Notion rejects relative links — keep the text, drop the link
+            items.extend(text_item(m.group("ltext"), link=url if url.startswith(("http://", "https://")) else None))
+        else:
+            items.extend(text_item(m.group("italic") or m.group("uitalic"), {"italic": True}))
+        pos = m.end()
+    if pos < len(text):
+        items.extend(text_item(text[pos:]))
+    return items
+
+
+def chunk_rich_text(items: list) -> list:
+    """Group rich_text objects into per-block arrays of at most RICH_TEXT_ITEMS."""
+    if not items:
+        return [[]]
+    return [items[i:i + RICH_TEXT_ITEMS] for i in range(0, len(items), RICH_TEXT_ITEMS)]
+
+
+# ─────────────────────────────────────────────
+# BLOCK BUILDERS
+# ─────────────────────────────────────────────
+
+def text_blocks(btype: str, items: list, **extra) -> list:
+    """Blocks of one type carrying the given rich text, split when over the item limit."""
+    return [
+        {"object": "block", "type": btype, btype: {"rich_text": chunk, **extra}}
+        for chunk in chunk_rich_text(items)
+    ]
+
+
+def code_blocks(code: str, lang: str) -> list:
+    lang = (lang or "").strip().lower()
+    lang = CODE_LANGUAGE_ALIASES.get(lang, lang)
+    items = text_item(code) or [{"type": "text", "text": {"content": ""}}]
+    return text_blocks("code", items, language=lang if lang in NOTION_CODE_LANGUAGES else "plain text")
+
+
+def table_blocks(rows: list) -> list:
+    """Pipe-table rows (first row = header) → table blocks of at most CHILDREN_LIMIT rows."""
+    width = len(rows[0])
+    cells = []
+    for row in rows:
+        row = (row + [""] * width)[:width]
+        cells.append({
+            "object": "block", "type": "table_row",
+            "table_row": {"cells": [chunk_rich_text(parse_inline(c))[0] for c in row]},
+        })
+    header, body = cells[0], cells[1:]
+    tables = []
+    step   = CHILDREN_LIMIT - 1  # header row is repeated in each split table
+    for i in range(0, max(len(body), 1), step):
+        tables.append({
+            "object": "block", "type": "table",
+            "table": {
+                "table_width":       width,
+                "has_column_header": True,
+                "has_row_header":    False,
+                "children":          [header] + body[i:i + step],
+            },
+        })
+    return tables
+
+
+def split_table_row(line: str) -> list:
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|") and not line.endswith("\\|"):
+        line = line[:-1]
+    return [c.strip().replace("\\|", "|") for c in re.split(r"(?<!\\)\|", line)]
+
+
+def image_blocks(alt: str, src: str) -> list:
+    if src.startswith(("http://", "https://")):
+        return [{"object": "block", "type": "image",
+                 "image": {"type": "external", "external": {"url": src},
+                           "caption": text_item(alt) if alt else []}}]
+    return [{"object": "block", "type": "paragraph",
+             "paragraph": {"rich_text": text_item(f"📸 {alt} ({src})", {"italic": True, "color": "gray"})}}]
+
+
+def _indent(line: str) -> int:
+    return len(line.expandtabs(4)) - len(line.expandtabs(4).lstrip(" "))
+
+
+# ─────────────────────────────────────────────
+# CONVERTER
+# ─────────────────────────────────────────────
+
+def markdown_to_notion_blocks(markdown: str) -> list:
+    """Convert markdown to a list of Notion blocks that can be appended as-is."""
+    blocks = []
+    lines  = markdown.split("\n")
+    n      = len(lines)
+    stack  = []   # open list items: (indent, block, depth)
+    i      = 0
+
+    def attach(new_blocks: list, indent: int):
+        # Content indented under an open list item becomes its child (up to MAX_NESTING levels)
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        if not stack or indent == 0:
+            stack.clear()
+            blocks.extend(new_blocks)
+            return 0
+        parent_indent, parent, depth = stack[-1]
+        while depth >= MAX_NESTING and len(stack) > 1:
+            stack.pop()
+            parent_indent, parent, depth = stack[-1]
+        if depth >= MAX_NESTING:
+            blocks.extend(new_blocks)
+            return 0
+        parent[parent["type"]].setdefault("children", []).extend(new_blocks)
+        return depth + 1
+
+    while i < n:
+        line     = lines[i]
+        stripped = line.strip()
+        indent   = _indent(line)
+
+        if not stripped:
+            i += 1
+            continue
+
+        fence = FENCE_RE.match(line)
+        if fence:
+            marker = fence.group(2)
+            code_lines = []
+            i += 1
+            while i < n and not lines[i].strip().startswith(marker):
+                code_lines.append(lines[i][indent:] if lines[i][:indent].isspace() else lines[i])
+                i += 1
+            attach(code_blocks("\n".join(code_lines), fence.group(3)), indent)
+            i += 1
+            continue
+
+        if stripped.startswith("<p align") or stripped.startswith("<sub>"):
+            blocks.append({"object": "block", "type": "callout",
+                "callout": {
+                    "rich_text": [{"type": "text", "text": {"content": "Writeup auto-generated by CTF Publisher ✅"}}],
+                    "icon":      {"type": "emoji", "emoji": "🤖"},
+                    "color":     "gray_background"
+                }})
+            while i < n and lines[i].strip() != "---":
+                i += 1
+            i += 1
+            stack.clear()
+            continue
+
+        heading = HEADING_RE.match(stripped) if indent < 4 else None
+        if heading:
+            level = min(len(heading.group(1)), 3)
+            attach(text_blocks(f"heading_{level}", parse_inline(heading.group(2))), 0)
+            i += 1
+            continue
+
+        if HR_RE.match(stripped):
+            attach([{"object": "block", "type": "divider", "divider": {}}], 0)
+            i += 1
+            continue
+
+        if stripped.startswith("|") and i + 1 < n and TABLE_SEP_RE.match(lines[i + 1]):
+            rows = [split_table_row(stripped)]
+            i += 2
+            while i < n and lines[i].strip().startswith("|"):
+                rows.append(split_table_row(lines[i]))
+                i += 1
+            attach(table_blocks(rows), 0)  # table rows are already one nesting level
+            continue
+
+        item = LIST_RE.match(line)
+        if item:
+            content = item.group(3)
+            todo    = TODO_RE.match(content) if item.group(2) in "-*+" else None
+            if todo:
+                new = text_blocks("to_do", parse_inline(todo.group(2)), checked=todo.group(1) != " ")
+            elif item.group(2) in "-*+":
+                new = text_blocks("bulleted_list_item", parse_inline(content))
+            else:
+                new = text_blocks("numbered_list_item", parse_inline(content))
+            depth = attach(new, indent)
+            stack.append((indent, new[-1], depth))
+            i += 1
+            continue
+
+        if stripped.startswith(">"):
+            quote_lines = []
+            while i < n and lines[i].strip().startswith(">"):
+                quote_lines.append(lines[i].strip()[1:].lstrip())
+                i += 1
+            attach(text_blocks("quote", parse_inline("\n".join(quote_lines))), indent)
+            continue
+
+        image = IMAGE_RE.match(stripped)
+        if image:
+            attach(image_blocks(image.group(1), image.group(2)), indent)
+            i += 1
+            continue
+
+        attach(text_blocks("paragraph", parse_inline(stripped)), indent)
+        i += 1
+
+    return blocks
+
+
+def count_blocks(blocks: list) -> int:
+    """Total blocks including nested children."""
+    total = 0
+    for block in blocks:
+        total += 1 + count_blocks(block.get(block["type"], {}).get("children", []))
+    return total
+
+
+def count_chars(blocks: list) -> int:
+    """Total rich-text characters including nested children and table cells."""
+    total = 0
+    for block in blocks:
+        inner  = block.get(block["type"], {})
+        total += sum(len(r["text"]["content"]) for r in inner.get("rich_text", []))
+        total += sum(len(r["text"]["content"]) for cell in inner.get("cells", []) for r in cell)
+        total += count_chars(inner.get("children", []))
+    return total
+
+
+def chunk_for_append(blocks: list, max_blocks: int = CHILDREN_LIMIT,
+                     max_total: int = REQUEST_BLOCKS, max_chars: int = REQUEST_CHARS) -> list:
+    """Split top-level blocks into append requests within Notion's per-request limits."""
+    chunks, current, current_total, current_chars = [], [], 0, 0
+    for block in blocks:
+        size  = count_blocks([block])
+        chars = count_chars([block])
+        if current and (len(current) >= max_blocks
+                        or current_total + size > max_total
+                        or current_chars + chars > max_chars):
+            chunks.append(current)
+            current, current_total, current_chars = [], 0, 0
+        current.append(block)
+        current_total += size
+        current_chars += chars
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# ─────────────────────────────────────────────
+# ORIGINAL NOTES PACKING
+# ─────────────────────────────────────────────
+
+def pack_notes_blocks(notes: str) -> list:
+    """Pack raw notes into as few blocks as Notion allows.
+
+    Fenced code stays a code block; every run of prose lines between fences is
+    merged into paragraphs holding up to RICH_TEXT_ITEMS × RICH_TEXT_LIMIT chars.
+    Blank lines are dropped, as they were when each line was its own paragraph.
+    """
+    blocks = []
+    prose  = []
+    lines  = notes.split("\n")
+    i      = 0
+
+    def flush():
+        if prose:
+            blocks.extend(text_blocks("paragraph", text_item("\n".join(prose))))
+            prose.clear()
+
+    while i < len(lines):
+        line  = lines[i]
+        fence = FENCE_RE.match(line)
+        if fence:
+            flush()
+            marker, code_lines = fence.group(2), []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(marker):
+                code_lines.append(lines[i])
+                i += 1
+            blocks.extend(code_blocks("\n".join(code_lines), fence.group(3)))
+        elif line.strip():
+            prose.append(line)
+        i += 1
+    flush()
+    return blocks
@@ -0,0 +1,135 @@
+"""
+Coalesced Notion page writes for the CTF publisher.
+Category, OS, page icon and the Published checkbox used to be four separate
+pages.update calls on the same page. They are queued on a PageUpdate and sent
+as one PATCH when the page is published. The queue is saved in the page
+checkpoint, so a run that dies before that point sends it on resume.
+
+Conflicts are resolved in favour of Notion: a property someone set by hand
+since it was detected is left alone. If the combined PATCH is rejected, each
+change is retried on its own so one bad field can't block Published.
+"""
+
+import time
+
+# Notion error codes (APIResponseError.code) worth a second attempt as-is
+RETRY_CODES = {"conflict_error", "rate_limited", "internal_server_error", "service_unavailable"}
+
+# Changes queued vs requests sent, across every page flushed this run
+RUN_TOTALS = {"pages": 0, "changes": 0, "calls": 0}
+
+
+def _plain(value):
+    """A property payload or page property reduced to a comparable value."""
+    if not isinstance(value, dict):
+        return value
+    kind = value.get("type") or next(iter(value), None)
+    inner = value.get(kind)
+    if isinstance(inner, dict):
+        return inner.get("name") or inner.get("url") or inner.get("emoji") or inner.get("external", {}).get("url")
+    return inner
+
+
+class PageUpdate:
+    def __init__(self, page_id: str, properties: dict = None, icon: dict = None):
+        self.page_id    = page_id
+        self.properties = dict(properties or {})
+        self.icon       = icon
+
+    @classmethod
+    def from_dict(cls, page_id: str, data: dict):
+        return cls(page_id, data.get("properties"), data.get("icon"))
+
+    def to_dict(self) -> dict:
+        return {"properties": self.properties, "icon": self.icon}
+
+    @property
+    def changes(self) -> list:
+        return list(self.properties) + (["icon"] if self.icon else [])
+
+    def __bool__(self) -> bool:
+        return bool(self.properties or self.icon)
+
+    # ── queueing ──
+
+    def set_select(self, name: str, value: str):
+        self.properties[name] = {"select": {"name": value}}
+
+    def set_checkbox(self, name: str, value: bool = True):
+        self.properties[name] = {"checkbox": value}
+
+    def set_icon(self, url: str):
+        self.icon = {"type": "external", "external": {"url": url}}
+
+    # ── commit ──
+
+    def drop_conflicts(self, current: dict) -> list:
+        """Drop queued properties the page already has — the same value (no-op) or a different
+        value set by hand since detection (Notion wins). `current` is the page's properties
+        from this run's query. Returns the names dropped because of a conflict."""
+        conflicts = []
+        for name, payload in list(self.properties.items()):
+            now = _plain(current.get(name)) if name in current else None
+            if now in (None, "", False):
+                continue
+            if now != _plain(payload):
+                conflicts.append(name)
+            del self.properties[name]
+        return conflicts
+
+    def _send(self, client, sleep, **body):
+        for attempt in range(3):
+            try:
+                RUN_TOTALS["calls"] += 1
+                return client.pages.update(page_id=self.page_id, **body)
+            except Exception as e:
+                if getattr(e, "code", "") not in RETRY_CODES or attempt == 2:
+                    raise
+                sleep(2 ** attempt)
+
+    def flush(self, client, sleep=time.sleep) -> dict:
+        """Send every queued change in one pages.update. Returns {"calls": n, "failed": {change: error}}.
+        The queue is emptied of whatever was applied."""
+        changes = self.changes
+        if not changes:
+            return {"calls": 0, "failed": {}}
+        calls_before = RUN_TOTALS["calls"]
+        RUN_TOTALS["pages"]   += 1
+        RUN_TOTALS["changes"] += len(changes)
+
+        body = {"properties": self.properties} if self.properties else {}
+        if self.icon:
+            body["icon"] = self.icon
+        try:
+            self._send(client, sleep, **body)
+            self.properties, self.icon = {}, None
+            return {"calls": RUN_TOTALS["calls"] - calls_before, "failed": {}}
+        except Exception as e:
+            # Only a validation error is worth splitting up — anything else would fail per field too
+            if len(changes) == 1 or getattr(e, "code", "") != "validation_error":
+                return {"calls": RUN_TOTALS["calls"] - calls_before, "failed": {c: str(e) for c in changes}}
+
+        # The combined write was rejected as invalid — apply changes one at a time, checkboxes last
+        failed = {}
+        for name in sorted(self.properties, key=lambda n: "checkbox" in self.properties[n]):
+            try:
+                self._send(client, sleep, properties={name: self.properties[name]})
+                del self.properties[name]
+            except Exception as e:
+                failed[name] = str(e)
+        if self.icon:
+            try:
+                self._send(client, sleep, icon=self.icon)
+                self.icon = None
+            except Exception as e:
+                failed["icon"] = str(e)
+        return {"calls": RUN_TOTALS["calls"] - calls_before, "failed": failed}
+
+
+def run_summary() -> str:
+    """Calls saved this run by coalescing — empty when no page was written."""
+    if not RUN_TOTALS["changes"]:
+        return ""
+    saved = RUN_TOTALS["changes"] - RUN_TOTALS["calls"]
+    return (f"{RUN_TOTALS['changes']} Notion page change(s) in {RUN_TOTALS['calls']} request(s) "
+            f"across {RUN_TOTALS['pages']} page(s) — {max(saved, 0)} call(s) saved")
@@ -0,0 +1,75 @@
+"""
+Which system prompt version produced each writeup.
+A prompt version is its name plus a short hash of its text, so editing
+SYSTEM_PROMPT_REDTEAM (or any other) makes every writeup formatted with the
+old text stale without anyone bumping a number by hand.
+
+The index is committed alongside the writeups (like icon_index.json), so a
+fresh CI checkout knows which writeups `reformat` still has to refresh.
+Writeups with no entry predate the index and count as stale.
+"""
+
+import json
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+
+INDEX_PATH = Path(__file__).parent / "prompt_versions.json"
+
+
+def prompt_version(name: str, prompt: str) -> str:
+    return f"{name}@{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]}"
+
+
+class PromptIndex:
+    def __init__(self, path: Path = INDEX_PATH):
+        self.path     = path
+        self.lock     = threading.Lock()
+        self.dirty    = False
+        self.writeups = {}
+        if path.exists():
+            try:
+                self.writeups = json.loads(path.read_text(encoding="utf-8")).get("writeups", {})
+            except (OSError, ValueError) as e:
+                print(f"   ⚠️  Could not read {path.name}: {e}")
+
+    def get(self, writeup_path: str) -> str:
+        """Prompt version that formatted a writeup (repo-relative path), "" if unknown."""
+        entry = self.writeups.get(writeup_path)
+        return entry["prompt"] if entry else ""
+
+    def put(self, writeup_path: str, version: str, source: str = "publish"):
+        with self.lock:
+            self.writeups[writeup_path] = {
+                "prompt":    version,
+                "source":    source,
+                "formatted": datetime.now().strftime("%Y-%m-%d"),
+            }
+            self.dirty = True
+
+    def snapshot(self, writeup_paths: list) -> dict:
+        with self.lock:
+            return {path: self.writeups.get(path) for path in writeup_paths}
+
+    def restore(self, snapshot: dict):
+        """Put entries back as snapshot() saw them — for a batch that could not be committed."""
+        with self.lock:
+            for path, entry in snapshot.items():
+                if entry is None:
+                    self.writeups.pop(path, None)
+                else:
+                    self.writeups[path] = entry
+            self.dirty = True
+
+    def stale(self, writeup_path: str, current: str) -> bool:
+        return self.get(writeup_path) != current
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {"writeups": dict(sorted(self.writeups.items()))}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+            self.dirty = False
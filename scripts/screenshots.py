@@ -0,0 +1,67 @@
+"""
+Screenshot downloads that start while the Notion page is still being read.
+Notion-hosted image URLs are signed and expire, so each one is handed to a
+small download pool the moment block extraction sees it, instead of waiting
+until the room description and icon have been fetched. The screenshots
+stage then only has to wait for downloads that are already running.
+"""
+
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+WORKERS = 4
+
+
+def screenshot_name(index: int) -> str:
+    return f"screenshot_{index:02d}.png"
+
+
+class ScreenshotDownloads:
+    def __init__(self, fetch, dest_folder: Path, workers: int = WORKERS):
+        """fetch(url) → response with .status_code / .content (the publisher's http client)."""
+        self.fetch   = fetch
+        self.dest    = dest_folder
+        self.pool    = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="screenshot")
+        self.futures = {}
+        self.lock    = threading.Lock()
+        self.round   = 0        # bumped by restart() — downloads of an earlier round never land
+
+    def submit(self, index: int, url: str):
+        """Start downloading image `index` (1-based) — called as soon as its block is seen."""
+        with self.lock:
+            if index not in self.futures:
+                self.futures[index] = self.pool.submit(self._download, index, url, self.round)
+
+    def restart(self):
+        """Forget every download submitted so far — the images seen until now turned out not to be
+        the page's screenshots. Queued ones are cancelled, running ones finish without saving."""
+        with self.lock:
+            self.round += 1
+            for future in self.futures.values():
+                future.cancel()
+            self.futures = {}
+
+    def _download(self, index: int, url: str, round: int) -> str:
+        filename = screenshot_name(index)
+        try:
+            resp = self.fetch(url)
+            if resp.status_code == 200:
+                with self.lock:
+                    if round != self.round:
+                        return ""
+                    (self.dest / filename).write_bytes(resp.content)
+                print(f"   ✅ {filename}")
+                return filename
+            print(f"   ⚠️  Could not download screenshot {index}: HTTP {resp.status_code}")
+        except Exception as e:
+            print(f"   ⚠️  Could not download screenshot {index}: {e}")
+        return ""
+
+    def wait(self) -> list:
+        """Filenames saved, in image order — blocks until every submitted download has finished."""
+        with self.lock:
+            futures = sorted(self.futures.items())
+        saved = [future.result() for _, future in futures]
+        self.pool.shutdown(wait=False)
+        return [name for name in saved if name]
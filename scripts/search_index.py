@@ -0,0 +1,347 @@
+"""
+Inverted search index over every published writeup.
+
+Terms are stored per field — tag, heading, tool, CVE and plain word — with
+delta-encoded posting lists in a gzip'd JSON file committed next to the
+writeups. Each publish re-indexes only the files whose content hash changed,
+and static JSON shards are written under writeups/.search/ so the GitBook
+site can fetch just the shard a query needs.
+
+  python scripts/search_index.py build                   (re)index every writeup on disk
+  python scripts/search_index.py query tag:suid nmap     AND-search; prefixes tag: heading: tool: cve:
+  python scripts/search_index.py shards [out_dir]        write the static JSON shards
+"""
+
+import re
+import sys
+import gzip
+import json
+import hashlib
+from pathlib import Path
+from datetime import datetime
+
+REPO_ROOT  = Path(__file__).parent.parent
+INDEX_PATH = Path(__file__).parent / "search_index.json.gz"
+SHARD_DIR  = REPO_ROOT / "writeups" / ".search"
+VERSION    = 1
+
+FIELDS       = {"tag": "t", "heading": "h", "tool": "x", "cve": "c", "word": "w"}
+FIELD_WEIGHT = {"t": 5, "c": 5, "x": 3, "h": 2, "w": 1}
+
+# Tools worth finding even when they only appear in prose
+KNOWN_TOOLS = {
+    "nmap", "rustscan", "masscan", "gobuster", "ffuf", "feroxbuster", "dirb", "dirsearch", "nikto",
+    "wpscan", "sqlmap", "hydra", "medusa", "john", "hashcat", "burp", "burpsuite", "metasploit",
+    "msfconsole", "msfvenom", "searchsploit", "netcat", "nc", "socat", "linpeas", "winpeas", "pspy",
+    "enum4linux", "smbclient", "smbmap", "crackmapexec", "netexec", "nxc", "evil-winrm", "bloodhound",
+    "sharphound", "impacket", "secretsdump", "psexec", "responder", "mimikatz", "rubeus", "certipy",
+    "kerbrute", "ldapsearch", "rpcclient", "chisel", "ligolo", "wireshark", "tshark", "tcpdump",
+    "volatility", "binwalk", "exiftool", "steghide", "stegseek", "zsteg", "foremost", "ghidra", "gdb",
+    "radare2", "pwntools", "ltrace", "strace", "cyberchef", "gtfobins", "sudo", "curl", "wget",
+}
+
+# Commands too common to say anything about a writeup
+SHELL_NOISE = {
+    "cd", "ls", "cat", "echo", "pwd", "id", "whoami", "cp", "mv", "rm", "mkdir", "chmod", "chown",
+    "touch", "grep", "head", "tail", "less", "more", "find", "export", "clear", "exit", "history",
+    "which", "file", "ll", "python", "python3", "bash", "sh", "vim", "nano", "su",
+}
+
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "was", "were", "from", "into", "then", "than",
+    "have", "has", "had", "are", "but", "not", "you", "your", "our", "its", "it's", "which", "when",
+    "what", "there", "their", "they", "them", "also", "just", "only", "using", "used", "use", "can",
+    "could", "would", "should", "will", "been", "being", "some", "any", "all", "out", "over", "after",
+    "before", "about", "back", "here", "how", "why", "now", "one", "two", "via", "got", "get",
+}
+
+CVE_RE     = re.compile(r"\bCVE-\d{4}-\d{4,7}\b", re.IGNORECASE)
+HEADING_RE = re.compile(r"^#{1,6}\s+(.+?)\s*#*\s*$", re.MULTILINE)
+FENCE_RE   = re.compile(r"^```[^\n]*\n(.*?)^```", re.MULTILINE | re.DOTALL)
+PROMPT_RE  = re.compile(r"^\S*\$\s+(?:sudo\s+(?:-\S+\s+)*)?([\w.\-]+)", re.MULTILINE)
+TAG_RE     = re.compile(r"#([a-z0-9][a-z0-9\-.]*)", re.IGNORECASE)
+WORD_RE    = re.compile(r"[a-z0-9][a-z0-9_\-.]*[a-z0-9]", re.IGNORECASE)
+HTML_RE    = re.compile(r"<[^>]+>|https?://\S+")
+META_RE    = re.compile(r"<b>([\w ]+):</b>\s*(.*?)\s*(?:<br>|$)", re.MULTILINE)
+
+
+# ─────────────────────────────────────────────
+# TERM EXTRACTION
+# ─────────────────────────────────────────────
+
+def normalise(term: str) -> str:
+    return term.strip().lower().strip(".-_")
+
+
+def words(text: str) -> set:
+    return {
+        w for w in (normalise(m) for m in WORD_RE.findall(text))
+        if len(w) >= 3 and len(w) <= 40 and w not in STOPWORDS and not w.replace(".", "").isdigit()
+    }
+
+
+def read_metadata(text: str) -> dict:
+    head = text[:4096].split("</p>", 1)[0]
+    return {key.lower(): value for key, value in META_RE.findall(head)}
+
+
+def extract_terms(text: str, extra_tags=()) -> dict:
+    """Field code → set of terms for one writeup."""
+    meta  = read_metadata(text)
+    tags  = {normalise(t) for t in TAG_RE.findall(meta.get("tags", ""))}
+    tags |= {normalise(t) for t in TAG_RE.findall(" ".join(extra_tags))}
+
+    headings = set()
+    for heading in HEADING_RE.findall(text):
+        headings |= words(heading)
+
+    tools = set()
+    for block in FENCE_RE.findall(text):
+        tools |= {normalise(cmd) for cmd in PROMPT_RE.findall(block)} - SHELL_NOISE
+    body   = HTML_RE.sub(" ", text)
+    plain  = words(body)
+    tools |= plain & KNOWN_TOOLS
+
+    return {
+        "t": tags,
+        "h": headings,
+        "x": {t for t in tools if t},
+        "c": {c.upper() for c in CVE_RE.findall(text)},
+        "w": plain,
+    }
+
+
+def title_of(text: str, path: Path) -> str:
+    anchor = re.search(r'<b>URL:</b>\s*<a href="[^"]*">(.*?)</a>', text[:4096])
+    if anchor and anchor.group(1).strip():
+        return anchor.group(1).strip()
+    heading = re.search(r"^# (.+)$", text, re.MULTILINE)
+    return heading.group(1).strip() if heading else path.stem.replace("-", " ")
+
+
+def writeup_files(root: Path) -> list:
+    """Every published writeup: writeups/**/<Room>/<Room>.md."""
+    return sorted(md for md in (root / "writeups").rglob("*.md")
+                  if md.stem == md.parent.name and md.parent.name != "writeups")
+
+
+# ─────────────────────────────────────────────
+# INDEX
+# ─────────────────────────────────────────────
+
+def encode_postings(ids: set) -> list:
+    out, prev = [], 0
+    for doc_id in sorted(ids):
+        out.append(doc_id - prev)
+        prev = doc_id
+    return out
+
+
+def decode_postings(deltas: list) -> set:
+    ids, total = set(), 0
+    for delta in deltas:
+        total += delta
+        ids.add(total)
+    return ids
+
+
+class SearchIndex:
+    def __init__(self, path: Path = INDEX_PATH, root: Path = REPO_ROOT):
+        self.path    = path
+        self.root    = root
+        self.docs    = {}    # id → {"path", "title", "platform", "difficulty", "date", "tags", "hash"}
+        self.terms   = {}    # "field:term" → set of doc ids
+        self.next_id = 0
+        self.dirty   = False
+        if path.exists():
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == VERSION:
+                    self.docs    = {int(k): v for k, v in data["docs"].items()}
+                    self.terms   = {k: decode_postings(v) for k, v in data["terms"].items()}
+                    self.next_id = data.get("next_id", max(self.docs, default=-1) + 1)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"   ⚠️  Could not read {path.name}: {e} — rebuilding")
+
+    def doc_id(self, rel_path: str):
+        return next((i for i, d in self.docs.items() if d["path"] == rel_path), None)
+
+    def remove(self, rel_path: str):
+        doc_id = self.doc_id(rel_path)
+        if doc_id is None:
+            return
+        del self.docs[doc_id]
+        for term in [t for t, ids in self.terms.items() if doc_id in ids]:
+            self.terms[term].discard(doc_id)
+            if not self.terms[term]:
+                del self.terms[term]
+        self.dirty = True
+
+    def index_file(self, md_path: Path, extra_tags=()) -> bool:
+        """(Re)index one writeup. Returns False when its content hash is unchanged."""
+        rel    = md_path.relative_to(self.root).as_posix()
+        raw    = md_path.read_bytes()
+        digest = hashlib.sha1(raw + " ".join(extra_tags).encode("utf-8")).hexdigest()
+        doc_id = self.doc_id(rel)
+        if doc_id is not None and self.docs[doc_id]["hash"] == digest:
+            return False
+        self.remove(rel)
+
+        text  = raw.decode("utf-8", errors="replace")
+        meta  = read_metadata(text)
+        terms = extract_terms(text, extra_tags)
+        parts = Path(rel).parts
+        doc_id, self.next_id = self.next_id, self.next_id + 1
+        self.docs[doc_id] = {
+            "path":       rel,
+            "title":      title_of(text, md_path),
+            "platform":   meta.get("platform") or (parts[1] if len(parts) > 2 else ""),
+            "difficulty": meta.get("difficulty", ""),
+            "date":       meta.get("date", ""),
+            "tags":       sorted(terms["t"]),
+            "hash":       digest,
+        }
+        for field, values in terms.items():
+            for value in values:
+                self.terms.setdefault(f"{field}:{value}", set()).add(doc_id)
+        self.dirty = True
+        return True
+
+    def sync(self, tags_for=None) -> tuple:
+        """Bring the index in line with writeups/ on disk. Returns (reindexed, removed)."""
+        files    = writeup_files(self.root)
+        on_disk  = {md.relative_to(self.root).as_posix() for md in files}
+        removed  = [d["path"] for d in list(self.docs.values()) if d["path"] not in on_disk]
+        for rel in removed:
+            self.remove(rel)
+        reindexed = sum(self.index_file(md, tags_for(md) if tags_for else ()) for md in files)
+        return reindexed, len(removed)
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """AND of every query token; bare tokens match any field. Ranked by field weight, then date."""
+        scores = None
+        for token in query.split():
+            field, value = "", token
+            prefix, _, rest = token.partition(":")
+            if rest and prefix.lower() in FIELDS:
+                field, value = prefix.lower(), rest
+            is_cve = bool(CVE_RE.fullmatch(value.strip()))
+            value  = value.strip().upper() if is_cve else normalise(value)
+            if field:
+                codes = [FIELDS[field]]
+            elif is_cve:
+                codes = ["c"]
+            else:
+                codes = list(FIELD_WEIGHT)
+            hits = {}
+            for code in codes:
+                for doc_id in self.terms.get(f"{code}:{value}", ()):
+                    hits[doc_id] = hits.get(doc_id, 0) + FIELD_WEIGHT[code]
+            scores = hits if scores is None else {d: s + hits[d] for d, s in scores.items() if d in hits}
+            if not scores:
+                return []
+        ranked = sorted((scores or {}).items(), key=lambda kv: (-kv[1], -self._date_key(kv[0])))
+        return [self.docs[doc_id] for doc_id, _ in ranked[:limit]]
+
+    def _date_key(self, doc_id: int) -> float:
+        try:
+            return datetime.strptime(self.docs[doc_id]["date"], "%b %d, %Y").timestamp()
+        except ValueError:
+            return 0.0
+
+    def save(self):
+        if not self.dirty:
+            return
+        data = {
+            "version": VERSION,
+            "next_id": self.next_id,
+            "docs":    {str(k): self.docs[k] for k in sorted(self.docs)},
+            "terms":   {t: encode_postings(self.terms[t]) for t in sorted(self.terms)},
+        }
+        payload = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # mtime=0 keeps the gzip bytes identical when the index content is
+        with open(self.path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write(payload)
+        self.dirty = False
+
+    # ── static shards for the GitBook site ──
+
+    @staticmethod
+    def shard_key(term: str) -> str:
+        """Shard by field + first character of the term: t-s.json holds every tag starting with "s"."""
+        field, _, value = term.partition(":")
+        first = value[:1] if value[:1].isalnum() else "_"
+        return f"{field}-{first.lower()}"
+
+    def write_shards(self, out_dir: Path = SHARD_DIR) -> int:
+        """docs.json + one small JSON per shard key. Only changed files are rewritten; returns how many."""
+        shards = {}
+        for term, ids in self.terms.items():
+            shards.setdefault(self.shard_key(term), {})[term.partition(":")[2]] = sorted(ids)
+        files = {
+            "docs.json": {str(k): {f: v for f, v in d.items() if f != "hash"} for k, d in sorted(self.docs.items())},
+            "manifest.json": {"version": VERSION, "fields": FIELDS, "shards": sorted(shards)},
+        }
+        files.update({f"{key}.json": dict(sorted(terms.items())) for key, terms in shards.items()})
+
+        out_dir.mkdir(parents=True, exist_ok=True)
+        written = 0
+        for name, content in files.items():
+            path = out_dir / name
+            text = json.dumps(content, separators=(",", ":"), ensure_ascii=False) + "\n"
+            if path.exists() and path.read_text(encoding="utf-8") == text:
+                continue
+            path.write_text(text, encoding="utf-8")
+            written += 1
+        for stale in out_dir.glob("*.json"):
+            if stale.name not in files:
+                stale.unlink()
+                written += 1
+        return written
+
+
+# ─────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────
+
+def readme_tags(root: Path = REPO_ROOT):
+    """Room folder → tags cell from the README tables, which carry the full build_tags_cell tags."""
+    from generate_readmes import existing_rows
+    known = {}
+    for readme in (root / "writeups").rglob("README.md"):
+        for folder, cells in existing_rows(readme).items():
+            if cells.get("Tags"):
+                known.setdefault(folder, set()).add(cells["Tags"])
+    return lambda md: sorted(known.get(md.parent.name, ()))
+
+
+def main(argv: list):
+    command = argv[0] if argv else "query"
+    index   = SearchIndex()
+    if command == "build":
+        reindexed, removed = index.sync(readme_tags())
+        index.save()
+        written = index.write_shards()
+        print(f"✅ Index: {len(index.docs)} writeup(s), {len(index.terms)} term(s) — "
+              f"{reindexed} reindexed, {removed} removed, {written} shard file(s) written")
+    elif command == "shards":
+        out = Path(argv[1]) if len(argv) > 1 else SHARD_DIR
+        print(f"✅ {index.write_shards(out)} shard file(s) written to {out}")
+    elif command == "query":
+        query = " ".join(argv[1:])
+        if not query:
+            print("Usage: search_index.py query <terms>   e.g. tag:suid tool:linpeas CVE-2021-4034")
+            return
+        results = index.search(query)
+        for doc in results:
+            print(f"{doc['date']:>13}  {doc['title']:<30} {doc['path']}")
+            print(f"{'':>15}{' '.join('#' + t for t in doc['tags'])}")
+        print(f"\n{len(results)} result(s)")
+    else:
+        print(f"⚠️  Unknown command '{command}' — choose from: build, query, shards")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
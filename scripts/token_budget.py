@@ -0,0 +1,176 @@
+"""
+Token budgeting for long notes.
+Estimates prompt size locally, splits oversized notes into parts on heading /
+paragraph / code-fence boundaries, stitches the formatted parts back into one
+writeup and joins max_tokens continuations without duplicating the overlap.
+"""
+
+import re
+
+# Word pieces + punctuation is a close, slightly pessimistic stand-in for Claude's
+# tokenizer on both prose and tool output (nmap/linpeas dumps are punctuation-heavy)
+_PIECE_RE   = re.compile(r"\w+|[^\w\s]")
+_HEADING_RE = re.compile(r"^#{1,6}\s")
+_FENCE_RE   = re.compile(r"^\s*```")
+_SECTION_RE = re.compile(r"^## (.+?)\s*$", re.MULTILINE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate Claude token count: ~1 token per 8 word characters or punctuation mark."""
+    if not text:
+        return 0
+    return sum(1 + len(piece) // 8 for piece in _PIECE_RE.findall(text))
+
+
+# ─────────────────────────────────────────────
+# SPLITTING
+# ─────────────────────────────────────────────
+
+def _units(notes: str) -> list:
+    """Split notes into (text, starts_section) units: whole code fences, paragraphs and headings."""
+    units, buf, fence = [], [], None
+
+    def flush():
+        if buf:
+            units.append(("\n".join(buf), False))
+            buf.clear()
+
+    for line in notes.split("\n"):
+        if fence is not None:
+            buf.append(line)
+            if _FENCE_RE.match(line):
+                flush()
+                fence = None
+            continue
+        if _FENCE_RE.match(line):
+            flush()
+            fence = line
+            buf.append(line)
+        elif _HEADING_RE.match(line):
+            flush()
+            units.append((line, True))
+        elif not line.strip():
+            flush()
+        else:
+            buf.append(line)
+    flush()
+    return units
+
+
+def _split_oversized(text: str, max_tokens: int) -> list:
+    """Line-split a single unit that alone exceeds the budget; code fences are re-opened per piece."""
+    lines = text.split("\n")
+    fence = lines[0] if _FENCE_RE.match(lines[0]) else None
+    if fence:
+        lines = lines[1:-1] if len(lines) > 1 and _FENCE_RE.match(lines[-1]) else lines[1:]
+    pieces, buf, size = [], [], 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if buf and size + cost > max_tokens:
+            pieces.append(buf)
+            buf, size = [], 0
+        buf.append(line)
+        size += cost
+    if buf:
+        pieces.append(buf)
+    if fence:
+        return ["\n".join([fence, *p, "```"]) for p in pieces]
+    return ["\n".join(p) for p in pieces]
+
+
+def split_notes(notes: str, max_tokens: int) -> list:
+    """Pack notes into parts of at most ~max_tokens, breaking at headings where possible."""
+    parts, current, size = [], [], 0
+
+    def flush():
+        nonlocal current, size
+        if current:
+            parts.append("\n\n".join(current))
+        current, size = [], 0
+
+    for text, starts_section in _units(notes):
+        cost = estimate_tokens(text) + 2
+        if cost > max_tokens:
+            flush()
+            parts.extend(_split_oversized(text, max_tokens))
+            continue
+        # Prefer to start a new part at a heading once the current one is reasonably full
+        if current and (size + cost > max_tokens or (starts_section and size > max_tokens * 0.6)):
+            flush()
+        current.append(text)
+        size += cost
+    flush()
+    return parts
+
+
+# ─────────────────────────────────────────────
+# STITCHING
+# ─────────────────────────────────────────────
+
+def stitch_sections(bodies: list) -> str:
+    """Merge formatted parts: sections with the same `## ` heading are concatenated in part order;
+    text before a part's first heading continues the previous part's last section."""
+    order, sections = [], {}
+    last = None
+    for body in bodies:
+        pieces = _SECTION_RE.split(body.strip())
+        lead, pairs = pieces[0].strip(), list(zip(pieces[1::2], pieces[2::2]))
+        if lead:
+            key = last or ""
+            if key not in sections:
+                if key:
+                    order.append(key)
+                else:
+                    order.insert(0, key)   # preamble before any heading stays first
+                sections[key] = {"heading": "", "chunks": []}
+            sections[key]["chunks"].append(lead)
+        for heading, content in pairs:
+            key = heading.strip().lower()
+            if key not in sections:
+                order.append(key)
+                sections[key] = {"heading": heading.strip(), "chunks": []}
+            if content.strip():
+                sections[key]["chunks"].append(content.strip())
+            last = key
+
+    out = []
+    for key in order:
+        section = sections[key]
+        text    = "\n\n".join(section["chunks"])
+        out.append(f"## {section['heading']}\n\n{text}" if section["heading"] else text)
+    return "\n\n".join(out)
+
+
+def outline(markdown: str, max_tokens: int) -> str:
+    """Headings, bold key-finding lines and the first line of each code block — a digest of a long
+    writeup small enough to summarise from."""
+    keep, in_fence, first = [], False, False
+    for line in markdown.split("\n"):
+        if _FENCE_RE.match(line):
+            in_fence, first = not in_fence, not in_fence
+            continue
+        if in_fence:
+            if first and line.strip():
+                keep.append(f"    {line.strip()}")
+                first = False
+            continue
+        if _HEADING_RE.match(line) or line.lstrip().startswith(("**", "> **", "- **")) or "**Result:**" in line:
+            keep.append(line)
+    digest, size = [], 0
+    for line in keep:
+        size += estimate_tokens(line) + 1
+        if size > max_tokens:
+            break
+        digest.append(line)
+    return "\n".join(digest)
+
+
+def join_continuation(text: str, more: str, max_overlap: int = 400, min_overlap: int = 16) -> str:
+    """Append a continuation, dropping any prefix of it that repeats the end of `text`."""
+    if not text:
+        return more
+    for k in range(min(max_overlap, len(more), len(text)), min_overlap - 1, -1):
+        if text.endswith(more[:k]):
+            return text + more[k:]
+    # Continuations usually resume mid-line; keep a line break if the model started a new block
+    return text + more if not more.startswith(("#", "```", "|", "- ")) else text.rstrip() + "\n" + more
@@ -0,0 +1,282 @@
+"""
+Run tracing for the CTF publisher.
+Timing spans per pipeline stage, nested spans per external call, optional
+cProfile / tracemalloc capture and a JSON + markdown report at the end of a run.
+
+Enable extras with environment variables:
+  CTF_PROFILE=1       capture a cProfile of the whole run (top functions in the report)
+  CTF_TRACEMALLOC=1   record Python heap usage per span via tracemalloc
+  CTF_TRACE_DIR=path  where run-<timestamp>.json / .prof are written
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import functools
+import threading
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# ─────────────────────────────────────────────
+# SPANS
+# ─────────────────────────────────────────────
+
+class Span:
+    __slots__ = ("name", "kind", "start", "end", "children", "error", "mem_peak", "mem_delta", "rss")
+
+    def __init__(self, name: str, kind: str):
+        self.name      = name
+        self.kind      = kind
+        self.start     = time.perf_counter()
+        self.end       = None
+        self.children  = []
+        self.error     = ""
+        self.mem_peak  = None   # bytes, tracemalloc only
+        self.mem_delta = None   # bytes, tracemalloc only
+        self.rss       = None   # max RSS in KiB at span end
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def to_dict(self) -> dict:
+        data = {
+            "name":        self.name,
+            "kind":        self.kind,
+            "duration_ms": round(self.duration * 1000, 2),
+        }
+        if self.error:
+            data["error"] = self.error
+        if self.mem_peak is not None:
+            data["mem_peak_kb"]  = round(self.mem_peak / 1024, 1)
+            data["mem_delta_kb"] = round(self.mem_delta / 1024, 1)
+        if self.rss is not None:
+            data["max_rss_kb"] = self.rss
+        if self.children:
+            data["children"] = [c.to_dict() for c in self.children]
+        return data
+
+
+class Tracer:
+    """Collects a tree of spans for one run. A worker thread's span attaches to
+    whatever span the main thread has open when the worker's own stack is empty,
+    so a pooled thread picks up the current parent every time it is reused.
+
+    tracemalloc has a single process-wide peak, so it is only reset when a
+    top-level stage starts on the main thread. A nested span records the peak
+    seen since its stage began (an upper bound for the call itself)."""
+
+    def __init__(self):
+        self.root       = Span("run", "run")
+        self.local      = threading.local()
+        self.lock       = threading.Lock()
+        self.profiler   = None
+        self.started_at = datetime.now()
+        self.main_stack = [self.root]
+        self.local.stack = self.main_stack
+
+    def _stack(self) -> list:
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str, kind: str = "stage"):
+        stack  = self._stack()
+        parent = stack[-1] if stack else self.main_stack[-1]
+        s      = Span(name, kind)
+        with self.lock:
+            parent.children.append(s)
+        stack.append(s)
+
+        mem_before = None
+        if tracemalloc.is_tracing():
+            mem_before = tracemalloc.get_traced_memory()[0]
+            if parent is self.root and stack is self.main_stack:
+                tracemalloc.reset_peak()
+        try:
+            yield s
+        except BaseException as e:
+            s.error = f"{type(e).__name__}: {e}"[:200]
+            raise
+        finally:
+            s.end = time.perf_counter()
+            if mem_before is not None:
+                current, peak = tracemalloc.get_traced_memory()
+                s.mem_peak  = peak
+                s.mem_delta = current - mem_before
+            if resource is not None:
+                s.rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            stack.pop()
+
+
+TRACER = Tracer()
+
+
+def span(name: str, kind: str = "stage"):
+    """Context manager: `with span("01 Read notes"):`"""
+    return TRACER.span(name, kind)
+
+
+def traced(kind: str, name: str = None):
+    """Decorator wrapping every call of a function in a span of the given kind
+    (notion / claude / http / git / fs)."""
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(label, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ─────────────────────────────────────────────
+# RUN LIFECYCLE
+# ─────────────────────────────────────────────
+
+def start_run():
+    """Reset the tracer and start optional profilers."""
+    global TRACER
+    TRACER = Tracer()
+    if os.environ.get("CTF_TRACEMALLOC"):
+        tracemalloc.start()
+    if os.environ.get("CTF_PROFILE"):
+        TRACER.profiler = cProfile.Profile()
+        TRACER.profiler.enable()
+
+
+def _summarise(span_: Span, totals: dict, by_kind: dict, in_call: bool = False):
+    """Aggregate call count and total time per (kind, name) across the tree.
+    by_kind only counts outermost external calls so nested spans aren't double-counted."""
+    for child in span_.children:
+        external = child.kind != "stage"
+        if external:
+            key   = (child.kind, child.name)
+            entry = totals.setdefault(key, {"calls": 0, "total_ms": 0.0})
+            entry["calls"]    += 1
+            entry["total_ms"] += child.duration * 1000
+            if not in_call:
+                by_kind[child.kind] = by_kind.get(child.kind, 0.0) + child.duration * 1000
+        _summarise(child, totals, by_kind, in_call or external)
+
+
+def build_report() -> dict:
+    TRACER.root.end = time.perf_counter()
+    totals  = {}
+    by_kind = {}
+    _summarise(TRACER.root, totals, by_kind)
+    by_kind = {k: round(v, 2) for k, v in by_kind.items()}
+
+    report = {
+        "started_at":  TRACER.started_at.isoformat(timespec="seconds"),
+        "duration_ms": round(TRACER.root.duration * 1000, 2),
+        "by_kind_ms":  by_kind,
+        "calls": [
+            {"kind": k, "name": n, "calls": v["calls"], "total_ms": round(v["total_ms"], 2)}
+            for (k, n), v in sorted(totals.items(), key=lambda kv: -kv[1]["total_ms"])
+        ],
+        "spans": TRACER.root.to_dict().get("children", []),
+    }
+    if tracemalloc.is_tracing():
+        report["tracemalloc_peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    return report
+
+
+def _stage_rows(spans: list, depth: int = 0) -> list:
+    rows = []
+    for s in spans:
+        if s["kind"] != "stage":
+            continue
+        ext = {}
+        for c in s.get("children", []):
+            if c["kind"] != "stage":
+                ext[c["kind"]] = ext.get(c["kind"], 0.0) + c["duration_ms"]
+        ext_str = ", ".join(f"{k} {v / 1000:.2f}s" for k, v in sorted(ext.items(), key=lambda kv: -kv[1]))
+        mem     = s.get("mem_peak_kb")
+        rss     = s.get("max_rss_kb")
+        rows.append(
+            f"| {'&nbsp;&nbsp;' * depth}{s['name']} | {s['duration_ms'] / 1000:.2f}s | "
+            f"{ext_str or '—'} | {f'{mem:,.0f} KiB' if mem is not None else '—'} | "
+            f"{f'{rss / 1024:,.0f} MiB' if rss is not None else '—'} |"
+            + (" ❌" if s.get("error") else "")
+        )
+        rows.extend(_stage_rows(s.get("children", []), depth + 1))
+    return rows
+
+
+def report_markdown(report: dict) -> str:
+    lines = [
+        "## ⏱️ CTF Publisher run report",
+        "",
+        f"Total: **{report['duration_ms'] / 1000:.2f}s** · "
+        + " · ".join(f"{k}: {v / 1000:.2f}s" for k, v in sorted(report["by_kind_ms"].items(), key=lambda kv: -kv[1])),
+        "",
+        "| Stage | Wall time | External calls | Heap peak | Max RSS |",
+        "|-------|-----------|----------------|-----------|---------|",
+    ]
+    lines.extend(_stage_rows(report["spans"]) or ["| *No stages ran* | | | | |"])
+    if report["calls"]:
+        lines += [
+            "",
+            "| Call | Kind | Count | Total |",
+            "|------|------|-------|-------|",
+        ]
+        lines.extend(
+            f"| `{c['name']}` | {c['kind']} | {c['calls']} | {c['total_ms'] / 1000:.2f}s |"
+            for c in report["calls"][:20]
+        )
+    if report.get("profile_top"):
+        lines += ["", "<details><summary>cProfile — top functions</summary>", "", "```", report["profile_top"], "```", "</details>"]
+    return "\n".join(lines) + "\n"
+
+
+def finish_run(trace_dir: Path) -> dict:
+    """Stop profilers, write run-<ts>.json (+ .prof) to trace_dir and append the
+    markdown table to $GITHUB_STEP_SUMMARY when running in Actions."""
+    report = build_report()
+    stamp  = TRACER.started_at.strftime("%Y%m%d-%H%M%S")
+
+    try:
+        trace_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        print(f"   ⚠️  Could not create trace dir: {e}")
+        return report
+
+    if TRACER.profiler is not None:
+        TRACER.profiler.disable()
+        prof_path = trace_dir / f"run-{stamp}.prof"
+        TRACER.profiler.dump_stats(str(prof_path))
+        buf = io.StringIO()
+        pstats.Stats(TRACER.profiler, stream=buf).sort_stats("cumulative").print_stats(15)
+        report["profile_top"] = buf.getvalue().strip()
+        report["profile_file"] = str(prof_path)
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+    json_path = trace_dir / f"run-{stamp}.json"
+    json_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\n⏱️  Run report: {json_path} ({report['duration_ms'] / 1000:.2f}s total)")
+
+    summary_file = os.environ.get("GITHUB_STEP_SUMMARY")
+    if summary_file:
+        try:
+            with open(summary_file, "a", encoding="utf-8") as f:
+                f.write(report_markdown(report))
+        except OSError as e:
+            print(f"   ⚠️  Could not write job summary: {e}", file=sys.stderr)
+    return report
@@ -0,0 +1,215 @@
+"""
+Link and asset validator for the writeups tree.
+Every markdown file under writeups/ (writeups and READMEs) is parsed once for
+relative links — markdown links and images, <img src> and <a href> — and each
+target is checked against an in-memory index of the repo's files. SUMMARY.md
+is checked too: the working-tree copy if there is one, else the gitbook
+branch's copy against that branch's file list.
+
+Parsing runs in a process pool and its results are cached by file mtime and
+size, so a re-run only re-parses files that changed; resolving every link
+again against the fresh index is a set lookup each.
+
+  python scripts/validate_links.py [--no-cache] [--summary-ref gitbook]
+"""
+
+import os
+import re
+import sys
+import json
+import subprocess
+from pathlib import Path
+from urllib.parse import unquote
+from concurrent.futures import ProcessPoolExecutor
+
+REPO_ROOT  = Path(__file__).parent.parent
+CACHE_PATH = REPO_ROOT / ".ctf-cache" / "links.json"
+VERSION    = 1
+
+POOL_MIN_FILES = 64      # fewer changed files than this are parsed in-process (pool start-up costs more)
+CHUNK_SIZE     = 32
+
+_FENCE_RE   = re.compile(r"^\s*(```|~~~)")
+_INLINE_RE  = re.compile(r"`[^`\n]*`")
+_MD_LINK_RE = re.compile(r"(!?)\[[^\]\n]*\]\(\s*(<[^>\n]+>|[^)\s]+)(?:\s+\"[^\"\n]*\")?\s*\)")
+_HTML_RE    = re.compile(r"<(img|a)\b[^>]*?\b(src|href)=\"([^\"]+)\"", re.IGNORECASE)
+_SCHEME_RE  = re.compile(r"^[a-z][a-z0-9+.-]*:", re.IGNORECASE)
+_SKIP_DIRS  = {".git", ".ctf-cache", ".search", "node_modules", "__pycache__"}
+
+
+# ─────────────────────────────────────────────
+# PARSING (runs in worker processes)
+# ─────────────────────────────────────────────
+
+def extract_links(text: str) -> list:
+    """[line, kind, target] for every relative link outside code; kind is image / link / img / a."""
+    links, fence = [], None
+    for number, line in enumerate(text.split("\n"), start=1):
+        marker = _FENCE_RE.match(line)
+        if fence:
+            if marker and marker.group(1) == fence:
+                fence = None
+            continue
+        if marker:
+            fence = marker.group(1)
+            continue
+        if "](" not in line and "src=" not in line and "href=" not in line:
+            continue
+        line = _INLINE_RE.sub("", line)
+        for bang, target in _MD_LINK_RE.findall(line):
+            links.append([number, "image" if bang else "link", target.strip("<>")])
+        for tag, _, target in _HTML_RE.findall(line):
+            links.append([number, tag.lower(), target])
+    return [link for link in links if link[2] and not link[2].startswith("#") and not _SCHEME_RE.match(link[2])]
+
+
+def _parse_files(root: str, paths: list) -> list:
+    out = []
+    for path in paths:
+        try:
+            text = Path(root, path).read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            text = ""
+        out.append((path, extract_links(text)))
+    return out
+
+
+# ─────────────────────────────────────────────
+# FILE INDEX
+# ─────────────────────────────────────────────
+
+def scan(root: Path) -> tuple:
+    """(files, dirs, markdown) — repo-relative posix paths; markdown maps path → (mtime_ns, size)
+    for every .md under writeups/."""
+    files, dirs, markdown = set(), set(), {}
+    for current, subdirs, names in os.walk(root):
+        subdirs[:] = [d for d in subdirs if d not in _SKIP_DIRS]
+        rel = os.path.relpath(current, root).replace(os.sep, "/")
+        rel = "" if rel == "." else rel + "/"
+        dirs.add(rel.rstrip("/"))
+        for name in names:
+            path = rel + name
+            files.add(path)
+            if name.endswith(".md") and path.startswith("writeups/"):
+                st = os.stat(os.path.join(current, name))
+                markdown[path] = (st.st_mtime_ns, st.st_size)
+    return files, dirs, markdown
+
+
+def resolve(source: str, target: str) -> str:
+    """Repo-relative path a link in `source` points at ('' if it escapes the repo)."""
+    target = unquote(target.split("#", 1)[0].split("?", 1)[0])
+    base   = "" if target.startswith("/") else source.rsplit("/", 1)[0] if "/" in source else ""
+    parts  = []
+    for part in f"{base}/{target}".split("/"):
+        if part in ("", "."):
+            continue
+        if part == "..":
+            if not parts:
+                return ""
+            parts.pop()
+        else:
+            parts.append(part)
+    return "/".join(parts)
+
+
+def check_links(source: str, links: list, files: set, dirs: set, lower: dict) -> list:
+    """Broken links of one file: (source, line, target, reason)."""
+    broken = []
+    for line, kind, target in links:
+        path = resolve(source, target)
+        if not path:
+            broken.append((source, line, target, "points outside the repo"))
+        elif path in files or path in dirs:
+            continue
+        elif path.lower() in lower:
+            broken.append((source, line, target, f"case differs: {lower[path.lower()]}"))
+        else:
+            what = "missing image" if kind in ("image", "img") else "missing file"
+            broken.append((source, line, target, what))
+    return broken
+
+
+# ─────────────────────────────────────────────
+# VALIDATION
+# ─────────────────────────────────────────────
+
+def _load_cache(path: Path) -> dict:
+    try:
+        cache = json.loads(path.read_text(encoding="utf-8"))
+        return cache["files"] if cache.get("version") == VERSION else {}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def validate(root: Path = REPO_ROOT, cache_path: Path = CACHE_PATH, summary_ref: str = "gitbook") -> dict:
+    """Check every writeup/README link and SUMMARY.md. Returns {"broken", "files", "parsed", "links"}."""
+    files, dirs, markdown = scan(root)
+    lower  = {p.lower(): p for p in files | dirs}
+    cache  = _load_cache(cache_path) if cache_path else {}
+    stale  = [p for p, stamp in markdown.items() if cache.get(p, {}).get("stamp") != list(stamp)]
+
+    if len(stale) >= POOL_MIN_FILES:
+        chunks = [stale[i:i + CHUNK_SIZE] for i in range(0, len(stale), CHUNK_SIZE)]
+        with ProcessPoolExecutor() as pool:
+            parsed = [item for chunk in pool.map(_parse_files, [str(root)] * len(chunks), chunks) for item in chunk]
+    else:
+        parsed = _parse_files(str(root), stale)
+    for path, links in parsed:
+        cache[path] = {"stamp": list(markdown[path]), "links": links}
+
+    cache  = {p: entry for p, entry in cache.items() if p in markdown}
+    broken = []
+    for path in sorted(markdown):
+        broken += check_links(path, cache[path]["links"], files, dirs, lower)
+    total = sum(len(entry["links"]) for entry in cache.values())
+
+    summary = check_summary(root, files, dirs, lower, summary_ref)
+    broken += summary
+
+    if cache_path:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_text(json.dumps({"version": VERSION, "files": cache}), encoding="utf-8")
+        except OSError as e:
+            print(f"⚠️  Could not save link cache: {e}")
+    return {"broken": broken, "files": len(markdown), "parsed": len(stale), "links": total}
+
+
+def check_summary(root: Path, files: set, dirs: set, lower: dict, ref: str) -> list:
+    """SUMMARY.md entries: the working-tree file against the working tree, else the gitbook
+    branch's SUMMARY.md against that branch's own file list (two git calls, no checkout)."""
+    local = root / "SUMMARY.md"
+    if local.exists():
+        return check_links("SUMMARY.md", extract_links(local.read_text(encoding="utf-8")), files, dirs, lower)
+    if not ref:
+        return []
+    show = subprocess.run(["git", "show", f"{ref}:SUMMARY.md"], cwd=root, capture_output=True)
+    if show.returncode != 0:
+        return []
+    listing = subprocess.run(["git", "ls-tree", "-r", "-z", "--name-only", ref], cwd=root, capture_output=True)
+    ref_files = set(listing.stdout.decode("utf-8", "surrogateescape").split("\0")) - {""}
+    ref_dirs  = {p.rsplit("/", i)[0] for p in ref_files for i in range(1, p.count("/") + 1)}
+    ref_lower = {p.lower(): p for p in ref_files | ref_dirs}
+    text = show.stdout.decode("utf-8", "replace")
+    return [(f"{ref}:SUMMARY.md", line, target, reason)
+            for _, line, target, reason in check_links("SUMMARY.md", extract_links(text), ref_files, ref_dirs, ref_lower)]
+
+
+def report(result: dict) -> str:
+    lines = [f"{source}:{line}  {target}  — {reason}" for source, line, target, reason in result["broken"]]
+    lines.append(f"{'❌' if result['broken'] else '✅'} {len(result['broken'])} broken link(s) — "
+                 f"{result['links']:,} link(s) in {result['files']:,} file(s), {result['parsed']:,} re-parsed")
+    return "\n".join(lines)
+
+
+def main(argv: list) -> int:
+    cache_path  = None if "--no-cache" in argv else CACHE_PATH
+    summary_ref = argv[argv.index("--summary-ref") + 1] if "--summary-ref" in argv else "gitbook"
+    result = validate(REPO_ROOT, cache_path, summary_ref)
+    print(report(result))
+    return 1 if result["broken"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
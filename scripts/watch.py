@@ -0,0 +1,117 @@
+"""
+Change detection for the publisher's watch mode.
+Instead of a daily cold start that re-queries the whole database, a long-
+running process keeps the queue of Completed-but-unpublished pages warm and
+asks Notion only for pages edited since the last poll (`last_edited_time`
+filter). Notion rounds that timestamp to the minute, so each poll overlaps
+the previous one a little and repeats are dropped by (page, edit time).
+
+A localhost HTTP endpoint stands in for a Notion webhook: POST /notify wakes
+the loop for an immediate poll, GET /status reports the queue.
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OVERLAP = timedelta(minutes=2)   # last_edited_time is minute-granular; re-ask for a short window
+
+
+def _iso(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _checkbox(page: dict, name: str) -> bool:
+    return bool(page.get("properties", {}).get(name, {}).get("checkbox"))
+
+
+class NotionWatcher:
+    def __init__(self, query):
+        """query(filter) → every page of the database matching a Notion filter (paginated)."""
+        self.query  = query
+        self.queue  = {}      # page id → page, in the order pages joined the queue
+        self.seen   = {}      # page id → last_edited_time already handled
+        self.cursor = None
+        self.lock   = threading.Lock()
+
+    def _apply(self, pages: list) -> list:
+        changed = []
+        with self.lock:
+            for page in pages:
+                edited = page.get("last_edited_time", "")
+                if self.seen.get(page["id"]) == edited:
+                    continue
+                self.seen[page["id"]] = edited
+                if _checkbox(page, "Completed") and not _checkbox(page, "Published"):
+                    self.queue[page["id"]] = page
+                    changed.append(page)
+                else:
+                    self.queue.pop(page["id"], None)
+        return changed
+
+    def poll(self) -> list:
+        """Pages that became (or changed while) queued since the last poll. The first poll
+        loads the whole queue; later ones only ask for recently edited pages."""
+        started = datetime.now(timezone.utc)
+        if self.cursor is None:
+            pages = self.query({"and": [
+                {"property": "Completed", "checkbox": {"equals": True}},
+                {"property": "Published", "checkbox": {"equals": False}},
+            ]})
+        else:
+            pages = self.query({"timestamp": "last_edited_time",
+                                "last_edited_time": {"on_or_after": _iso(self.cursor - OVERLAP)}})
+        self.cursor = started
+        return self._apply(pages)
+
+    def pages(self) -> list:
+        with self.lock:
+            return list(self.queue.values())
+
+    def drop(self, page_id: str):
+        with self.lock:
+            self.queue.pop(page_id, None)
+
+
+class WebhookServer:
+    """POST /notify → wake the watch loop; GET /status → JSON from status()."""
+
+    def __init__(self, port: int, wake: threading.Event, status):
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.rstrip("/") != "/notify":
+                    self.send_error(404)
+                    return
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                wake.set()
+                self.send_response(202)
+                self.end_headers()
+
+            def do_GET(self):
+                if self.path.rstrip("/") != "/status":
+                    self.send_error(404)
+                    return
+                body = json.dumps(status(), indent=2).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="webhook", daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
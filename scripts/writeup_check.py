@@ -0,0 +1,167 @@
+"""
+Structural checks for formatted writeups.
+A writeup is checked against the STRUCTURE list of the system prompt that
+produced it: the metadata block must be the one we sent, required sections
+must be present and non-empty, code fences must be closed and every saved
+screenshot must still be referenced.
+
+Problems are reported per section so the publisher can regenerate just the
+broken sections with a small prompt and splice them back in, instead of
+re-running the whole format call. A broken metadata block is fixed locally.
+"""
+
+import re
+
+_STRUCTURE_RE = re.compile(r"^STRUCTURE\b.*?$(.*?)^[A-Z ]+:", re.MULTILINE | re.DOTALL)
+_HEADING_RE   = re.compile(r"^## (.+?)\s*$")
+_FENCE_RE     = re.compile(r"^\s*(```|~~~)")
+_IMAGE_RE     = re.compile(r"screenshot_\d+\.\w+")
+_WORD_RE      = re.compile(r"[a-z0-9][a-z0-9._/-]{2,}")
+
+
+def prompt_sections(system_prompt: str) -> list:
+    """`## ` headings of a system prompt's STRUCTURE block, in order, without trailing notes
+    like "(omit if not applicable)"."""
+    block = _STRUCTURE_RE.search(system_prompt)
+    if not block:
+        return []
+    headings = []
+    for line in block.group(1).split("\n"):
+        m = _HEADING_RE.match(line.strip())
+        if m:
+            headings.append(re.sub(r"\s*\(.*\)$", "", m.group(1)).strip())
+    return headings
+
+
+def _key(heading: str) -> str:
+    """Heading compared without emoji or case — Claude sometimes drops or swaps the emoji."""
+    return re.sub(r"[^a-z0-9&/ ]", "", heading.lower()).strip()
+
+
+# ─────────────────────────────────────────────
+# PARSING
+# ─────────────────────────────────────────────
+
+def _fenced(lines: list) -> set:
+    """Indices of lines inside closed code fences, markers included. An opener that is never
+    closed fences nothing — a cut-off code block must not swallow the headings after it."""
+    inside, start, marker = set(), None, None
+    for i, line in enumerate(lines):
+        m = _FENCE_RE.match(line)
+        if not m:
+            continue
+        if start is None:
+            start, marker = i, m.group(1)
+        elif m.group(1) == marker:
+            inside.update(range(start, i + 1))
+            start = None
+    return inside
+
+
+def split_sections(markdown: str) -> tuple:
+    """(lead, [[heading, body], ...]) — lead is everything before the first `## ` outside code."""
+    lines  = markdown.split("\n")
+    fenced = _fenced(lines)
+    lead, sections = [], []
+    for i, line in enumerate(lines):
+        heading = None if i in fenced else _HEADING_RE.match(line)
+        if heading:
+            sections.append([heading.group(1), []])
+        elif sections:
+            sections[-1][1].append(line)
+        else:
+            lead.append(line)
+    return "\n".join(lead), [[h, "\n".join(body).strip()] for h, body in sections]
+
+
+def join_sections(lead: str, sections: list) -> str:
+    parts = [lead.strip()] if lead.strip() else []
+    parts += [f"## {heading}\n\n{body}".rstrip() for heading, body in sections]
+    return "\n\n".join(parts) + "\n"
+
+
+def _unclosed_fence(body: str) -> bool:
+    lines = body.split("\n")
+    return any(_FENCE_RE.match(line) for i, line in enumerate(lines) if i not in _fenced(lines))
+
+
+# ─────────────────────────────────────────────
+# CHECKS
+# ─────────────────────────────────────────────
+
+def check(markdown: str, structure: list, required: tuple, metadata_block: str, screenshots: list) -> list:
+    """Problems found, each {"kind", "section", "detail"}. Kinds: metadata, missing, empty, fence, images."""
+    problems = []
+    lead, sections = split_sections(markdown)
+    if metadata_block and metadata_block.strip() not in lead:
+        problems.append({"kind": "metadata", "section": "", "detail": "metadata block missing or altered"})
+
+    present = {_key(h): (h, body) for h, body in sections}
+    for heading in required:
+        if _key(heading) not in present:
+            problems.append({"kind": "missing", "section": heading, "detail": "required section missing"})
+    known = {_key(h) for h in structure}
+    for heading, body in sections:
+        if _key(heading) not in known:
+            continue
+        if not body:
+            problems.append({"kind": "empty", "section": heading, "detail": "section has no content"})
+        elif _unclosed_fence(body):
+            problems.append({"kind": "fence", "section": heading, "detail": "code block never closed"})
+
+    dropped = sorted(set(screenshots) - set(_IMAGE_RE.findall(markdown)))
+    if dropped:
+        problems.append({"kind": "images", "section": "", "detail": ", ".join(dropped), "images": dropped})
+    return problems
+
+
+def fix_metadata(markdown: str, metadata_block: str) -> str:
+    """Put the expected metadata block back at the top, dropping any preamble or mangled block before
+    the first section (the block always ends with its own --- rule)."""
+    lead, sections = split_sections(markdown)
+    rest = lead
+    close = lead.find("</p>")
+    if close >= 0:
+        rule = lead.find("---", close)
+        rest = lead[rule + 3:] if rule >= 0 else lead[close + 4:]
+    return join_sections(metadata_block.strip() + "\n\n" + rest.strip(), sections)
+
+
+def image_homes(notes: str, images: list, sections: list, candidates: list) -> dict:
+    """Heading → images for dropped screenshots: each goes to the candidate section sharing the most
+    words with the notes paragraph that referenced it."""
+    words = {h: set(_WORD_RE.findall(body.lower())) for h, body in sections if h in candidates}
+    homes = {}
+    if not words:
+        return homes
+    for image in images:
+        near = set(_WORD_RE.findall(notes_excerpt(notes, image).lower()))
+        best = max(words, key=lambda h: len(words[h] & near))
+        homes.setdefault(best, []).append(image)
+    return homes
+
+
+def notes_excerpt(notes: str, image: str, paragraphs_before: int = 2) -> str:
+    """The notes paragraphs leading up to a screenshot reference."""
+    paragraphs = re.split(r"\n\s*\n", notes)
+    at = next((i for i, p in enumerate(paragraphs) if image in p), -1)
+    return "\n\n".join(paragraphs[max(0, at - paragraphs_before):at + 1]) if at >= 0 else ""
+
+
+def splice(markdown: str, heading: str, section: str, structure: list) -> str:
+    """Replace the section with this heading, or insert it at its place in the prompt's order.
+    `section` may or may not start with its own `## ` line."""
+    _, new = split_sections(section.strip())
+    body   = new[0][1] if new else section.strip()
+    lead, sections = split_sections(markdown)
+    for entry in sections:
+        if _key(entry[0]) == _key(heading):
+            entry[1] = body
+            return join_sections(lead, sections)
+
+    order = [_key(h) for h in structure]
+    rank  = order.index(_key(heading)) if _key(heading) in order else len(order)
+    at    = next((i for i, (h, _) in enumerate(sections) if _key(h) in order and order.index(_key(h)) > rank),
+                 len(sections))
+    sections.insert(at, [heading, body])
+    return join_sections(lead, sections)